@@ -0,0 +1,299 @@
+"""
+Controle de admissão e descarte de carga
+
+Cada rota pertence a uma classe de prioridade:
+
+- critical: health checks, `/books/<id>`, categorias e raiz; nunca descartadas
+- standard: buscas, estatísticas e demais rotas
+- heavy: `/ml/train`, `/ml/training-data`, `/ml/features` e a listagem completa
+  de `/books`
+- stream: conexões SSE de `/events/stream`; longas e ociosas na maior parte do
+  tempo, não contam como requisições em andamento e só têm limite de conexões
+
+Rotas pesadas têm limite de concorrência e rate limit (token bucket) próprios.
+Quando há muitas requisições em andamento no processo, ou quando a requisição
+esperou demais na fila (header `X-Request-Start` do proxy), as classes de menor
+prioridade são recusadas primeiro com 503/429 e `Retry-After`.
+
+Todo o estado (requisições em andamento, execuções por rota, token buckets) é
+do processo. Os limites de `ROUTE_POLICIES` valem para o host: cada processo
+aplica a sua parte, dividindo rate, burst e concorrência por
+`ADMISSION_WORKERS` (o `gunicorn.conf.py` passa o número de workers). Nos
+workers sync, que atendem uma requisição por vez, os limites de concorrência e
+de requisições em andamento nunca chegam a ser atingidos: ali só o descarte
+pelo tempo de fila e o rate limit (dividido entre os workers) têm efeito. Os
+limites de concorrência só protegem workers com várias requisições
+simultâneas (gthread, ASGI).
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', 'true').lower() == 'true'
+
+# Processos que atendem requisições no host; os limites por rota são divididos entre eles
+ADMISSION_WORKERS = max(1, int(os.environ.get('ADMISSION_WORKERS', 1)))
+
+# Requisições simultâneas por processo a partir das quais se descarta carga
+ADMISSION_MAX_INFLIGHT = int(os.environ.get('ADMISSION_MAX_INFLIGHT', 64))
+
+# Tempo máximo de espera na fila (ms) antes de descartar, por classe
+ADMISSION_QUEUE_BUDGET_MS = {
+    'heavy': float(os.environ.get('ADMISSION_HEAVY_QUEUE_MS', 1000)),
+    'standard': float(os.environ.get('ADMISSION_STANDARD_QUEUE_MS', 5000)),
+}
+
+# Fração de ADMISSION_MAX_INFLIGHT a partir da qual cada classe é recusada
+SHED_THRESHOLDS = {
+    'heavy': 0.5,
+    'standard': 0.9,
+}
+
+# Conexões SSE simultâneas por processo
+ADMISSION_MAX_STREAMS = int(os.environ.get('ADMISSION_MAX_STREAMS', 100))
+
+# Chave do environ WSGI indicando que a admissão já foi feita (ex.: camada ASGI)
+ADMITTED_ENVIRON_KEY = 'books_api.admitted'
+
+BOOK_DETAIL_PATH = re.compile(r'^/api/v1/books/\d+$')
+
+
+@dataclass
+class RoutePolicy:
+    """Limites de admissão de uma rota (no host)"""
+    priority: str = 'standard'
+    max_concurrent: Optional[int] = None
+    rate: Optional[float] = None
+    burst: Optional[float] = None
+
+    def per_process(self, workers: int) -> 'RoutePolicy':
+        """Parte dos limites que cabe a um de `workers` processos"""
+        if workers <= 1 or self.priority == 'stream':
+            return self
+        return RoutePolicy(
+            self.priority,
+            max_concurrent=None if self.max_concurrent is None else max(1, math.ceil(self.max_concurrent / workers)),
+            rate=None if self.rate is None else self.rate / workers,
+            burst=None if self.burst is None else max(1.0, self.burst / workers),
+        )
+
+
+ROUTE_POLICIES = {
+    '/api/v1/ml/train': RoutePolicy('heavy', max_concurrent=1, rate=0.5, burst=2),
+    '/api/v1/ml/training-data': RoutePolicy('heavy', max_concurrent=2, rate=5, burst=10),
+    '/api/v1/ml/features': RoutePolicy('heavy', max_concurrent=2, rate=5, burst=10),
+    '/api/v1/books': RoutePolicy('heavy', max_concurrent=8, rate=100, burst=200),
+    '/api/v1/events/stream': RoutePolicy('stream', max_concurrent=ADMISSION_MAX_STREAMS),
+}
+
+CRITICAL_PREFIXES = ('/api/v1/health', '/api/v1/categories')
+
+CRITICAL_POLICY = RoutePolicy('critical')
+STANDARD_POLICY = RoutePolicy('standard')
+
+
+def get_policy(path: str) -> RoutePolicy:
+    """Retorna a política de admissão para o caminho"""
+    policy = ROUTE_POLICIES.get(path)
+    if policy is not None:
+        return policy
+    if path == '/' or path.startswith(CRITICAL_PREFIXES) or BOOK_DETAIL_PATH.match(path):
+        return CRITICAL_POLICY
+    return STANDARD_POLICY
+
+
+def parse_request_start(value: Optional[str]) -> Optional[float]:
+    """Converte o header X-Request-Start (`t=<segundos>` ou microssegundos) em epoch"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        timestamp = float(value)
+    except ValueError:
+        return None
+    # Alguns proxies enviam milissegundos ou microssegundos
+    while timestamp > 1e11:
+        timestamp /= 1000.0
+    return timestamp
+
+
+class TokenBucket:
+    """Token bucket thread-safe"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> Tuple[bool, float]:
+        """Consome um token; retorna (sucesso, segundos até o próximo token)"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True, 0.0
+            return False, (1 - self.tokens) / self.rate
+
+
+@dataclass
+class Rejection:
+    """Recusa de admissão"""
+    status: int
+    message: str
+    retry_after: int
+
+    def to_dict(self) -> Dict[str, object]:
+        return {'error': self.message, 'retry_after': self.retry_after}
+
+
+class Ticket:
+    """Permissão de execução; deve ser liberada ao final da requisição"""
+
+    def __init__(self, controller: 'AdmissionController', path: str, policy: RoutePolicy):
+        self.controller = controller
+        self.path = path
+        self.policy = policy
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """Decide, por rota, se uma requisição pode ser executada"""
+
+    def __init__(self, max_inflight: int = ADMISSION_MAX_INFLIGHT,
+                 queue_budget_ms: Dict[str, float] = None, workers: int = ADMISSION_WORKERS):
+        self.max_inflight = max_inflight
+        self.workers = max(1, workers)
+        self.queue_budget_ms = queue_budget_ms or dict(ADMISSION_QUEUE_BUDGET_MS)
+        self.inflight = 0
+        self.route_inflight: Dict[str, int] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.rejected: Dict[str, int] = {}
+        # Callback opcional chamado com (prioridade, status) a cada recusa
+        self.listener: Optional[Callable[[str, int], None]] = None
+        self._lock = threading.Lock()
+
+    def admit(self, path: str, request_start: Optional[str] = None):
+        """Retorna (Ticket, None) se admitida ou (None, Rejection) se recusada"""
+        policy = get_policy(path).per_process(self.workers)
+        if policy.priority == 'critical':
+            with self._lock:
+                self.inflight += 1
+            return Ticket(self, path, policy), None
+
+        rejection = self._check_queue_time(policy, request_start)
+        if rejection is None:
+            rejection = self._check_rate(path, policy)
+        if rejection is None:
+            rejection = self._try_reserve(path, policy)
+        if rejection is not None:
+            with self._lock:
+                self.rejected[policy.priority] = self.rejected.get(policy.priority, 0) + 1
+            if self.listener is not None:
+                self.listener(policy.priority, rejection.status)
+            return None, rejection
+        return Ticket(self, path, policy), None
+
+    def _check_queue_time(self, policy: RoutePolicy, request_start: Optional[str]) -> Optional[Rejection]:
+        started_at = parse_request_start(request_start)
+        budget = self.queue_budget_ms.get(policy.priority)
+        if started_at is None or budget is None:
+            return None
+        waited_ms = (time.time() - started_at) * 1000.0
+        if waited_ms > budget:
+            return Rejection(503, 'Servidor sobrecarregado, tente novamente', 1)
+        return None
+
+    def _check_rate(self, path: str, policy: RoutePolicy) -> Optional[Rejection]:
+        if not policy.rate:
+            return None
+        bucket = self.buckets.get(path)
+        if bucket is None:
+            with self._lock:
+                bucket = self.buckets.setdefault(
+                    path, TokenBucket(policy.rate, policy.burst or policy.rate)
+                )
+        allowed, wait = bucket.try_acquire()
+        if not allowed:
+            return Rejection(429, 'Limite de requisições excedido', max(1, math.ceil(wait)))
+        return None
+
+    def _try_reserve(self, path: str, policy: RoutePolicy) -> Optional[Rejection]:
+        threshold = SHED_THRESHOLDS.get(policy.priority, 1.0) * self.max_inflight
+        streaming = policy.priority == 'stream'
+        with self._lock:
+            if not streaming and self.inflight >= threshold:
+                return Rejection(503, 'Servidor sobrecarregado, tente novamente', 1)
+            current = self.route_inflight.get(path, 0)
+            if policy.max_concurrent is not None and current >= policy.max_concurrent:
+                return Rejection(503, 'Limite de execuções simultâneas atingido', 1)
+            self.route_inflight[path] = current + 1
+            if not streaming:
+                self.inflight += 1
+        return None
+
+    def _release(self, ticket: Ticket):
+        with self._lock:
+            if ticket.policy.priority != 'stream':
+                self.inflight -= 1
+            if ticket.policy.priority != 'critical':
+                self.route_inflight[ticket.path] -= 1
+
+    def stats(self) -> Dict[str, object]:
+        """Retorna o estado atual do controle de admissão"""
+        with self._lock:
+            return {
+                'enabled': ADMISSION_CONTROL,
+                'inflight': self.inflight,
+                'max_inflight': self.max_inflight,
+                'workers': self.workers,
+                'route_inflight': {k: v for k, v in self.route_inflight.items() if v},
+                'rejected': dict(self.rejected)
+            }
+
+
+admission_controller = AdmissionController()
+
+
+def init_admission(app, controller: AdmissionController = None):
+    """Registra o controle de admissão na aplicação Flask"""
+    from flask import g, jsonify, request
+
+    controller = controller or admission_controller
+    if not ADMISSION_CONTROL:
+        return controller
+
+    @app.before_request
+    def _admission_check():
+        if request.environ.get(ADMITTED_ENVIRON_KEY):
+            return None
+        ticket, rejection = controller.admit(request.path, request.headers.get('X-Request-Start'))
+        if rejection is not None:
+            response = jsonify(rejection.to_dict())
+            response.status_code = rejection.status
+            response.headers['Retry-After'] = str(rejection.retry_after)
+            return response
+        g.admission_ticket = ticket
+
+    @app.teardown_request
+    def _admission_release(exc=None):
+        ticket = g.pop('admission_ticket', None)
+        if ticket is not None:
+            ticket.release()
+
+    return controller
@@ -0,0 +1,441 @@
+"""
+Adaptador ASGI para a Books API
+
+As rotas de leitura (livros, categorias, estatísticas e health) são atendidas
+por handlers nativos, sem passar pela pilha WSGI. As demais rotas são
+encaminhadas para a aplicação Flask; as rotas de ML mais pesadas usam um pool
+separado para não bloquear as demais.
+
+Nada bloqueante roda no event loop: os handlers nativos (recarga do CSV, cache
+SQLite, singleflight) e a serialização JSON rodam no pool de threads, assim
+como a aplicação Flask, cuja resposta é enviada bloco a bloco conforme o
+iterável WSGI produz (as exportações binárias não são montadas em memória).
+O loop só envia.
+
+O stream SSE de eventos também é nativo: cada conexão é uma corrotina
+aguardando uma fila, sem ocupar thread do pool enquanto está ociosa.
+"""
+
+import asyncio
+import contextvars
+import io
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from . import events
+from .admission import ADMISSION_CONTROL, ADMITTED_ENVIRON_KEY, admission_controller
+from .metrics import REQUESTS_IN_FLIGHT, observe_request
+
+# Threads para rotas encaminhadas ao Flask
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))
+
+# Threads reservadas para rotas pesadas (treino e dataset de ML)
+ASGI_HEAVY_THREADS = int(os.environ.get('ASGI_HEAVY_THREADS', 2))
+
+# Rotas cujo processamento é CPU-bound e vai para o pool pesado
+HEAVY_PATHS = (
+    '/api/v1/ml/train',
+    '/api/v1/ml/training-data',
+    '/api/v1/ml/features',
+)
+
+JSON_HEADERS = [
+    (b'content-type', b'application/json'),
+    (b'access-control-allow-origin', b'*'),
+]
+
+EVENTS_STREAM_PATH = '/api/v1/events/stream'
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+    (b'access-control-allow-origin', b'*'),
+]
+
+BOOK_DETAIL_PATH = re.compile(r'^/api/v1/books/(\d+)$')
+BOOK_DETAIL_ROUTE = '/api/v1/books/<int:book_id>'
+
+
+class FallThrough(Exception):
+    """Sinaliza que a requisição deve ser atendida pela aplicação Flask"""
+
+
+def _first(query: Dict[str, List[str]], name: str) -> Optional[str]:
+    """Retorna o primeiro valor de um parâmetro de query string"""
+    values = query.get(name)
+    return values[0] if values else None
+
+
+def _float_arg(query: Dict[str, List[str]], name: str) -> Optional[float]:
+    """Converte parâmetro para float; valores inválidos ficam a cargo do Flask"""
+    value = _first(query, name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise FallThrough()
+
+
+class BooksASGIApp:
+    """Aplicação ASGI com caminho assíncrono para as rotas de leitura"""
+
+    def __init__(self, wsgi_app: Callable, book_repo, stats_overview_model=None):
+        self.wsgi_app = wsgi_app
+        self.book_repo = book_repo
+        self.stats_overview_model = stats_overview_model
+        self.executor = ThreadPoolExecutor(
+            max_workers=ASGI_THREADS, thread_name_prefix='asgi-wsgi'
+        )
+        self.heavy_executor = ThreadPoolExecutor(
+            max_workers=ASGI_HEAVY_THREADS, thread_name_prefix='asgi-heavy'
+        )
+        self.routes = {
+            '/api/v1/books': self.list_books,
+            '/api/v1/books/search': self.search_books,
+            '/api/v1/books/top-rated': self.top_rated_books,
+            '/api/v1/books/price-range': self.books_by_price_range,
+            '/api/v1/categories': self.list_categories,
+            '/api/v1/stats/overview': self.stats_overview,
+            '/api/v1/stats/categories': self.stats_categories,
+            '/api/v1/health': self.health_check,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        if not ADMISSION_CONTROL:
+            await self._dispatch(scope, receive, send)
+            return
+
+        request_start = None
+        for name, value in scope.get('headers', []):
+            if name == b'x-request-start':
+                request_start = value.decode('latin1')
+        ticket, rejection = admission_controller.admit(scope['path'], request_start)
+        if rejection is not None:
+            await self._send_json(
+                send, rejection.status, rejection.to_dict(),
+                extra_headers=[(b'retry-after', str(rejection.retry_after).encode('latin1'))]
+            )
+            return
+        try:
+            await self._dispatch(scope, receive, send)
+        finally:
+            ticket.release()
+
+    async def _dispatch(self, scope, receive, send):
+        if scope['method'] == 'GET' and scope['path'] == EVENTS_STREAM_PATH and events.EVENTS_STREAMING:
+            await self.stream_events(scope, receive, send)
+            return
+        if scope['method'] in ('GET', 'HEAD'):
+            handler, params = self._resolve(scope['path'])
+            if handler is not None:
+                start = time.perf_counter()
+                REQUESTS_IN_FLIGHT.inc()
+                try:
+                    query = parse_qs(scope['query_string'].decode('latin1'))
+                    loop = asyncio.get_running_loop()
+                    status, body = await loop.run_in_executor(
+                        self.executor, self._render, handler, query, params
+                    )
+                except FallThrough:
+                    pass
+                else:
+                    size = await self._send_body(send, status, body, scope['method'] == 'HEAD')
+                    route = BOOK_DETAIL_ROUTE if params else scope['path']
+                    observe_request(scope['method'], route, status,
+                                    time.perf_counter() - start, size)
+                    return
+                finally:
+                    REQUESTS_IN_FLIGHT.dec()
+
+        # Rotas encaminhadas são medidas pelo middleware de métricas do Flask
+        await self._call_wsgi(scope, receive, send)
+
+    def _resolve(self, path: str) -> Tuple[Optional[Callable], tuple]:
+        """Localiza o handler assíncrono para o caminho, se houver"""
+        handler = self.routes.get(path)
+        if handler is not None:
+            return handler, ()
+        match = BOOK_DETAIL_PATH.match(path)
+        if match:
+            return self.get_book, (int(match.group(1)),)
+        return None, ()
+
+    def _render(self, handler, query, params) -> Tuple[int, bytes]:
+        """Executa o handler e serializa a resposta (no pool de threads)"""
+        status, payload = handler(query, *params)
+        return status, self._encode_json(payload)
+
+    # Handlers nativos das rotas de leitura (executados por _render)
+
+    def list_books(self, query):
+        return 200, [book.to_dict() for book in self.book_repo.get_all_books()]
+
+    def get_book(self, query, book_id):
+        book = self.book_repo.get_book_by_id(book_id)
+        if book is None:
+            # Mensagem de erro padronizada pelo flask_restx
+            raise FallThrough()
+        return 200, book.to_dict()
+
+    def search_books(self, query):
+        books = self.book_repo.search_books(
+            title=_first(query, 'title'), category=_first(query, 'category')
+        )
+        return 200, [book.to_dict() for book in books]
+
+    def top_rated_books(self, query):
+        return 200, [book.to_dict() for book in self.book_repo.get_top_rated_books(limit=20)]
+
+    def books_by_price_range(self, query):
+        books = self.book_repo.get_books_by_price_range(
+            min_price=_float_arg(query, 'min'), max_price=_float_arg(query, 'max')
+        )
+        return 200, [book.to_dict() for book in books]
+
+    def list_categories(self, query):
+        return 200, {'categories': self.book_repo.get_all_categories()}
+
+    def stats_overview(self, query):
+        stats = self.book_repo.get_stats_overview()
+        if self.stats_overview_model is not None:
+            from flask_restx import marshal
+            stats = marshal(stats, self.stats_overview_model)
+        return 200, stats
+
+    def stats_categories(self, query):
+        return 200, self.book_repo.get_stats_by_categories()
+
+    def health_check(self, query):
+        try:
+            total_books = len(self.book_repo.get_all_books())
+            return 200, {
+                'status': 'healthy',
+                'message': 'API está funcionando corretamente',
+                'data_connection': 'ok',
+                'total_books_loaded': total_books,
+                'version': '1.0'
+            }
+        except Exception as e:
+            return 500, {
+                'status': 'unhealthy',
+                'message': f'Erro na API: {str(e)}',
+                'data_connection': 'error',
+                'version': '1.0'
+            }
+
+    async def stream_events(self, scope, receive, send):
+        """Stream SSE até o cliente desconectar ou EVENTS_STREAM_TIMEOUT"""
+        query = parse_qs(scope['query_string'].decode('latin1'))
+        last_event_id = None
+        for name, value in scope.get('headers', []):
+            if name == b'last-event-id':
+                last_event_id = events.parse_last_event_id(value.decode('latin1'))
+        if last_event_id is None:
+            last_event_id = events.parse_last_event_id(_first(query, 'last_event_id'))
+        types = events.parse_types(_first(query, 'types'))
+
+        loop = asyncio.get_running_loop()
+        pending: asyncio.Queue = asyncio.Queue()
+
+        def deliver(event):
+            # Chamado pela thread que publicou o evento (ou pela de polling)
+            try:
+                loop.call_soon_threadsafe(pending.put_nowait, event)
+            except RuntimeError:
+                pass
+
+        backlog = events.event_bus.subscribe(deliver, last_event_id)
+        # Eventos publicados durante a assinatura chegam no backlog e na fila
+        sent_up_to = backlog[-1].id if backlog else 0
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        deadline = loop.time() + events.EVENTS_STREAM_TIMEOUT
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+            chunks = ['retry: 3000\n\n']
+            chunks += [event.to_sse() for event in backlog if events.matches(event, types)]
+            await send({'type': 'http.response.body', 'body': ''.join(chunks).encode('utf-8'),
+                        'more_body': True})
+            while not disconnected.done():
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                getter = asyncio.ensure_future(pending.get())
+                done, _ = await asyncio.wait(
+                    {getter, disconnected}, timeout=min(events.EVENTS_KEEPALIVE, remaining),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter not in done:
+                    getter.cancel()
+                    if not done:
+                        await send({'type': 'http.response.body', 'more_body': True,
+                                    'body': events.KEEPALIVE_MESSAGE.encode('utf-8')})
+                    continue
+                event = getter.result()
+                if event.id > sent_up_to and events.matches(event, types):
+                    await send({'type': 'http.response.body', 'more_body': True,
+                                'body': event.to_sse().encode('utf-8')})
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        except OSError:
+            # Cliente desconectou no meio de um envio
+            pass
+        finally:
+            events.event_bus.unsubscribe(deliver)
+            disconnected.cancel()
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+    # Infraestrutura ASGI
+
+    @staticmethod
+    def _encode_json(payload: Any) -> bytes:
+        return (json.dumps(payload) + '\n').encode('utf-8')
+
+    async def _send_json(self, send, status: int, payload: Any, head_only: bool = False,
+                         extra_headers: List[Tuple[bytes, bytes]] = ()):
+        """Resposta JSON pequena, serializada no próprio loop (ex.: rejeição da admissão)"""
+        return await self._send_body(send, status, self._encode_json(payload), head_only, extra_headers)
+
+    async def _send_body(self, send, status: int, body: bytes, head_only: bool = False,
+                         extra_headers: List[Tuple[bytes, bytes]] = ()):
+        headers = JSON_HEADERS + [(b'content-length', str(len(body)).encode('latin1'))]
+        headers += list(extra_headers)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b'' if head_only else body})
+        return len(body)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                self.heavy_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _call_wsgi(self, scope, receive, send):
+        """Executa a aplicação Flask em thread e envia a resposta bloco a bloco"""
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.extend(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+
+        environ = self._build_environ(scope, bytes(body))
+        executor = self.heavy_executor if scope['path'].startswith(HEAVY_PATHS) else self.executor
+        loop = asyncio.get_running_loop()
+        # Um único contexto para a resposta inteira: geradores com
+        # stream_with_context guardam o contexto da requisição em contextvars
+        context = contextvars.copy_context()
+        status, headers, chunks, result = await loop.run_in_executor(
+            executor, context.run, self._start_wsgi, environ
+        )
+        try:
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            while True:
+                # Cada bloco é gerado no pool; o loop só envia
+                chunk = await loop.run_in_executor(executor, context.run, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(executor, context.run, result.close)
+
+    def _start_wsgi(self, environ):
+        """Chama a aplicação WSGI e lê o primeiro bloco (start_response já chamado)
+
+        Retorna (status, headers, blocos, iterável); o iterável deve ser fechado.
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        result = self.wsgi_app(environ, start_response)
+        iterator = iter(result)
+        try:
+            first = next(iterator, b'')
+        except BaseException:
+            if hasattr(result, 'close'):
+                result.close()
+            raise
+        return response['status'], response['headers'], itertools.chain([first], iterator), result
+
+    @staticmethod
+    def _build_environ(scope, body: bytes) -> Dict[str, Any]:
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+            'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+            'QUERY_STRING': scope['query_string'].decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            # Admissão já decidida na camada ASGI
+            ADMITTED_ENVIRON_KEY: ADMISSION_CONTROL,
+        }
+        for raw_name, raw_value in scope.get('headers', []):
+            name = raw_name.decode('latin1').upper().replace('-', '_')
+            value = raw_value.decode('latin1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+                continue
+            if name == 'CONTENT_LENGTH':
+                continue
+            key = 'HTTP_' + name
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+
+def create_asgi_app(flask_app=None):
+    """Cria a aplicação ASGI a partir da aplicação Flask da API"""
+    from . import routes
+
+    return BooksASGIApp(
+        flask_app or routes.app,
+        routes.book_repo,
+        stats_overview_model=routes.stats_overview_model,
+    )
@@ -0,0 +1,138 @@
+"""
+Micro-batching de chamadas concorrentes
+
+Várias threads com cargas pequenas (ex.: predições de uma linha) entregam o
+trabalho a uma fila; uma thread do processo junta o que chegar dentro de uma
+janela curta, ou até um tamanho máximo de lote, chama o handler uma vez com o
+lote inteiro e devolve a cada chamador o seu resultado. Vale entre as threads
+de um processo, como nos workers gthread e no pool de threads do modo ASGI; em
+um worker sync de uma thread cada lote tem uma requisição só.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+
+class _Pending:
+    """Carga aguardando o lote"""
+
+    __slots__ = ('payload', 'size', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, payload: Any, size: int):
+        self.payload = payload
+        self.size = size
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class MicroBatcher:
+    """Agrupa as cargas de chamadas concorrentes em uma chamada ao handler
+
+    `handler(payloads)` recebe a lista de cargas e devolve a lista de
+    resultados na mesma ordem. O tamanho do lote é a soma de `size` das cargas
+    (ex.: linhas); uma carga que sozinha atinge `max_size` roda direto na
+    thread do chamador.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], List[Any]], window: float = 0.005,
+                 max_size: int = 64):
+        self.handler = handler
+        self.window = window
+        self.max_size = max_size
+        self._queue: Deque[_Pending] = deque()
+        self._queued_size = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self.batches = 0
+        self.items = 0
+        # Callback opcional chamado por lote com (tamanho, esperas na fila em s)
+        self.listener: Optional[Callable[[int, List[float]], None]] = None
+
+    def submit(self, payload: Any, size: int = 1) -> Any:
+        """Entrega a carga ao próximo lote e aguarda o seu resultado"""
+        pending = _Pending(payload, size)
+        if size >= self.max_size:
+            self._run([pending])
+        else:
+            self._ensure_thread()
+            with self._cond:
+                self._queue.append(pending)
+                self._queued_size += size
+                self._cond.notify()
+            pending.done.wait()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _ensure_thread(self):
+        # A thread não sobrevive ao fork dos workers: cada processo cria a sua
+        if self._thread is not None and self._thread_pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is None or self._thread_pid != os.getpid():
+                self._thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def _next_batch(self) -> List[_Pending]:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            # A janela conta a partir da carga mais antiga
+            deadline = self._queue[0].enqueued + self.window
+            while self._queued_size < self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, size = [], 0
+            while self._queue and (not batch or size + self._queue[0].size <= self.max_size):
+                pending = self._queue.popleft()
+                self._queued_size -= pending.size
+                size += pending.size
+                batch.append(pending)
+            return batch
+
+    def _loop(self):
+        while True:
+            self._run(self._next_batch())
+
+    def _run(self, batch: List[_Pending]):
+        started = time.monotonic()
+        try:
+            results = self.handler([pending.payload for pending in batch])
+            for pending, result in zip(batch, results):
+                pending.result = result
+        except BaseException as e:
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+        size = sum(pending.size for pending in batch)
+        self.batches += 1
+        self.items += size
+        if self.listener is not None:
+            try:
+                self.listener(size, [started - pending.enqueued for pending in batch])
+            except Exception:
+                pass
+
+    def stats(self):
+        """Contadores de lotes"""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'window_ms': self.window * 1000,
+            'max_size': self.max_size,
+        }
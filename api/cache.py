@@ -0,0 +1,114 @@
+"""
+Cache LRU em memória para resultados de consultas
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Tamanho máximo (número de entradas) e TTL padrão em segundos
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 1024))
+QUERY_CACHE_TTL = float(os.environ.get('QUERY_CACHE_TTL', 300))
+
+# Sentinela para diferenciar "não encontrado" de um valor None armazenado
+MISSING = object()
+
+
+def normalize_param(value: Any) -> Any:
+    """Normaliza um parâmetro de consulta para compor a chave do cache"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # Buscas são case-insensitive e string vazia equivale a "sem filtro"
+        return value.lower() or None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+
+def make_key(operation: str, version: str, **params) -> Tuple[Hashable, ...]:
+    """Monta a chave do cache a partir da operação, versão dos dados e parâmetros"""
+    normalized = tuple(sorted((name, normalize_param(value)) for name, value in params.items()))
+    return (operation, version, normalized)
+
+
+class QueryCache:
+    """Cache LRU thread-safe limitado por tamanho e TTL"""
+
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Callback opcional chamado com 'hit', 'miss' ou 'eviction' (ex.: métricas)
+        self.listener: Optional[Callable[[str], None]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Retorna o valor em cache ou `default`"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                value = default
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = entry[1]
+
+        if self.listener is not None:
+            self.listener('miss' if entry is None else 'hit')
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Armazena um valor, descartando o menos usado se necessário"""
+        if not self.enabled:
+            return
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+
+        if evicted and self.listener is not None:
+            for _ in range(evicted):
+                self.listener('eviction')
+
+    def clear(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna contadores do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,307 @@
+"""
+Eventos do ciclo de vida dos dados (Server-Sent Events)
+
+Tipos publicados:
+
+- scrape.started / scrape.progress / scrape.finished: execução do scraping
+- dataset.activated: nova versão dos dados carregada (com o resumo do delta)
+- model.trained: modelo de ML retreinado
+
+Com `EVENTS_PATH` definido (o `gunicorn.conf.py` faz isso), os eventos são
+gravados em um SQLite local e cada processo tem uma única thread que busca os
+novos eventos e os repassa aos seus assinantes, então um cliente conectado a
+qualquer worker recebe eventos publicados por todos. Sem `EVENTS_PATH`, o
+barramento é só do processo.
+
+Cada conexão SSE é apenas um assinante (callback) no barramento: no modo ASGI
+uma conexão ociosa é uma corrotina aguardando; com workers gthread ela ocupa
+uma thread, por isso as conexões são encerradas após `EVENTS_STREAM_TIMEOUT` e
+o EventSource do cliente reconecta com `Last-Event-ID` sem perder eventos. Nos
+workers sync uma conexão prenderia o processo inteiro: com
+`EVENTS_STREAMING=false` (o `gunicorn.conf.py` define nesse modo) o stream
+responde 503 e os clientes consultam `GET /api/v1/events`.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .shared_cache import check_private_file, ensure_private_dir
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PATH = os.environ.get('EVENTS_PATH', '')
+# Eventos mantidos para reenvio a clientes que reconectam (Last-Event-ID)
+EVENTS_HISTORY = int(os.environ.get('EVENTS_HISTORY', 200))
+EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', 0.5))
+# Intervalo entre comentários de keep-alive e duração máxima de uma conexão
+EVENTS_KEEPALIVE = float(os.environ.get('EVENTS_KEEPALIVE', 15))
+EVENTS_STREAM_TIMEOUT = float(os.environ.get('EVENTS_STREAM_TIMEOUT', 300))
+# Serve o stream SSE; desligado nos workers sync (cada conexão prenderia um worker)
+EVENTS_STREAMING = os.environ.get('EVENTS_STREAMING', 'true').lower() == 'true'
+# Intervalo sugerido aos clientes que consultam GET /api/v1/events
+EVENTS_POLL_HINT = float(os.environ.get('EVENTS_POLL_HINT', 5))
+
+EVENT_TYPES = (
+    'scrape.started',
+    'scrape.progress',
+    'scrape.finished',
+    'dataset.activated',
+    'model.trained',
+)
+
+KEEPALIVE_MESSAGE = ': keepalive\n\n'
+
+
+@dataclass
+class Event:
+    """Evento publicado no barramento"""
+    id: int
+    type: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'type': self.type, 'data': self.data, 'timestamp': self.timestamp}
+
+    def to_sse(self) -> str:
+        """Formato text/event-stream"""
+        payload = json.dumps(dict(self.data, timestamp=self.timestamp))
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+def parse_types(value: Optional[str]) -> Optional[List[str]]:
+    """Converte `scrape.*,model.trained` em lista de filtros (None = todos)"""
+    if not value:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()] or None
+
+
+def matches(event: Event, types: Optional[List[str]]) -> bool:
+    if not types:
+        return True
+    for pattern in types:
+        if pattern.endswith('*') and event.type.startswith(pattern[:-1]):
+            return True
+        if event.type == pattern:
+            return True
+    return False
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class EventBus:
+    """Barramento de eventos com histórico e assinantes por callback"""
+
+    def __init__(self, path: str = EVENTS_PATH, history: int = EVENTS_HISTORY,
+                 poll_interval: float = EVENTS_POLL_INTERVAL):
+        self.path = path
+        self.history = history
+        self.poll_interval = poll_interval
+        self._recent: deque = deque(maxlen=history)
+        self._subscribers: List[Callable[[Event], None]] = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._local = threading.local()
+        self._last_seen = 0
+        self._poller: Optional[threading.Thread] = None
+        self._poller_pid: Optional[int] = None
+        if self.path:
+            self._last_seen = self._max_id()
+
+    # Armazenamento compartilhado (SQLite)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        # Mesmas verificações do cache compartilhado: diretório privado e
+        # arquivos do usuário da aplicação (UnsafeCachePath, um OSError)
+        ensure_private_dir(os.path.dirname(os.path.abspath(self.path)))
+        for suffix in ('', '-wal', '-shm'):
+            check_private_file(self.path + suffix)
+        conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' type TEXT NOT NULL,'
+            ' data TEXT NOT NULL,'
+            ' timestamp REAL NOT NULL)'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _max_id(self) -> int:
+        try:
+            row = self._connect().execute('SELECT MAX(id) FROM events').fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Barramento de eventos indisponível: {e}")
+            return 0
+        return row[0] or 0
+
+    def _fetch_after(self, after_id: int) -> List[Event]:
+        rows = self._connect().execute(
+            'SELECT id, type, data, timestamp FROM events WHERE id > ? ORDER BY id',
+            (after_id,)
+        ).fetchall()
+        return [Event(row[0], row[1], json.loads(row[2]), row[3]) for row in rows]
+
+    def _ensure_poller(self):
+        """Inicia (uma vez por processo) a thread que busca eventos de outros workers"""
+        if self._poller is not None and self._poller_pid == os.getpid():
+            return
+        with self._lock:
+            if self._poller is not None and self._poller_pid == os.getpid():
+                return
+            # Parte do fim atual: o histórico anterior chega aos assinantes só
+            # pelo backlog de `subscribe` (Last-Event-ID), nunca como evento novo
+            self._last_seen = self._max_id()
+            self._poller_pid = os.getpid()
+            self._poller = threading.Thread(target=self._poll, name='events-poller', daemon=True)
+            self._poller.start()
+
+    def _poll(self):
+        while True:
+            try:
+                events = self._fetch_after(self._last_seen)
+            except (sqlite3.Error, OSError) as e:
+                logger.debug(f"Falha ao buscar eventos: {e}")
+                events = []
+            for event in events:
+                self._last_seen = event.id
+                self._dispatch(event)
+            time.sleep(self.poll_interval)
+
+    # API pública
+
+    def publish(self, event_type: str, data: Dict[str, Any] = None) -> Optional[Event]:
+        """Publica um evento; falhas de armazenamento não interrompem o chamador"""
+        data = data or {}
+        timestamp = time.time()
+        if self.path:
+            # Antes de gravar: a thread de polling precisa começar antes deste evento
+            self._ensure_poller()
+            try:
+                conn = self._connect()
+                cursor = conn.execute(
+                    'INSERT INTO events (type, data, timestamp) VALUES (?, ?, ?)',
+                    (event_type, json.dumps(data), timestamp)
+                )
+                event_id = cursor.lastrowid
+                if event_id % 100 == 0:
+                    conn.execute('DELETE FROM events WHERE id <= ?', (event_id - self.history,))
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Falha ao publicar evento {event_type}: {e}")
+                return None
+            # A entrega local é feita pela thread de polling, como para os demais workers
+            return Event(event_id, event_type, data, timestamp)
+
+        with self._lock:
+            event = Event(self._next_id, event_type, data, timestamp)
+            self._next_id += 1
+        self._dispatch(event)
+        return event
+
+    def _dispatch(self, event: Event):
+        with self._lock:
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.debug(f"Assinante de eventos falhou: {e}")
+
+    def recent(self, after_id: Optional[int] = None, limit: int = None) -> List[Event]:
+        """Eventos recentes com id > after_id (todos os do histórico se None)"""
+        if self.path:
+            try:
+                rows = self._connect().execute(
+                    'SELECT id, type, data, timestamp FROM events WHERE id > ? '
+                    'ORDER BY id DESC LIMIT ?',
+                    (after_id or 0, limit or self.history)
+                ).fetchall()
+            except (sqlite3.Error, OSError):
+                return []
+            return [Event(row[0], row[1], json.loads(row[2]), row[3]) for row in reversed(rows)]
+
+        with self._lock:
+            events = [event for event in self._recent if after_id is None or event.id > after_id]
+        return events[-limit:] if limit else events
+
+    def subscribe(self, callback: Callable[[Event], None],
+                  last_event_id: Optional[int] = None) -> List[Event]:
+        """Registra um assinante; retorna os eventos perdidos desde last_event_id"""
+        if self.path:
+            self._ensure_poller()
+        with self._lock:
+            self._subscribers.append(callback)
+        return self.recent(last_event_id) if last_event_id is not None else []
+
+    def unsubscribe(self, callback: Callable[[Event], None]):
+        with self._lock:
+            try:
+                self._subscribers.remove(callback)
+            except ValueError:
+                pass
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+event_bus = EventBus()
+
+
+def publish(event_type: str, data: Dict[str, Any] = None) -> Optional[Event]:
+    """Publica no barramento global"""
+    return event_bus.publish(event_type, data)
+
+
+def stream_events(bus: EventBus = None, types: Optional[List[str]] = None,
+                  last_event_id: Optional[int] = None,
+                  keepalive: float = None, timeout: float = None) -> Iterable[str]:
+    """Gerador síncrono de mensagens SSE (workers WSGI)"""
+    import queue
+
+    bus = bus or event_bus
+    keepalive = EVENTS_KEEPALIVE if keepalive is None else keepalive
+    timeout = EVENTS_STREAM_TIMEOUT if timeout is None else timeout
+    pending: 'queue.Queue[Event]' = queue.Queue()
+    backlog = bus.subscribe(pending.put, last_event_id)
+    # Eventos publicados durante a assinatura chegam no backlog e na fila
+    sent_up_to = backlog[-1].id if backlog else 0
+    deadline = time.monotonic() + timeout
+    try:
+        # Abre o stream imediatamente e sugere o intervalo de reconexão
+        yield 'retry: 3000\n\n'
+        for event in backlog:
+            if matches(event, types):
+                yield event.to_sse()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = pending.get(timeout=min(keepalive, remaining))
+            except queue.Empty:
+                yield KEEPALIVE_MESSAGE
+                continue
+            if event.id > sent_up_to and matches(event, types):
+                yield event.to_sse()
+    finally:
+        bus.unsubscribe(pending.put)
@@ -0,0 +1,64 @@
+"""
+Rotas de eventos do ciclo de vida dos dados (Server-Sent Events)
+"""
+
+from flask_restx import Namespace, Resource, reqparse
+from flask import Response, request, stream_with_context
+from . import events
+from .events import EVENT_TYPES, event_bus, matches, parse_last_event_id, parse_types, stream_events
+
+# Namespace para eventos
+events_ns = Namespace('api/v1/events', description='Eventos de scraping, dados e modelo (SSE)')
+
+# Caminho do stream; o adaptador ASGI tem um handler nativo para ele
+STREAM_PATH = '/api/v1/events/stream'
+
+events_parser = reqparse.RequestParser()
+events_parser.add_argument('types', type=str,
+                           help=f"Tipos separados por vírgula (aceita prefixo, ex.: scrape.*): {', '.join(EVENT_TYPES)}")
+events_parser.add_argument('last_event_id', type=int,
+                           help='Último evento recebido (alternativa ao header Last-Event-ID)')
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    # Desliga o buffer do nginx para o stream chegar evento a evento
+    'X-Accel-Buffering': 'no',
+}
+
+
+@events_ns.route('')
+class EventsList(Resource):
+    @events_ns.expect(events_parser)
+    @events_ns.doc('list_events')
+    def get(self):
+        """Eventos recentes (para quem não mantém uma conexão SSE aberta)"""
+        args = events_parser.parse_args()
+        types = parse_types(args['types'])
+        events = [
+            event.to_dict() for event in event_bus.recent(args['last_event_id'])
+            if matches(event, types)
+        ]
+        return {'events': events, 'total': len(events)}
+
+
+@events_ns.route('/stream')
+class EventsStream(Resource):
+    @events_ns.expect(events_parser)
+    @events_ns.doc('stream_events')
+    @events_ns.produces(['text/event-stream'])
+    def get(self):
+        """Stream SSE: scrape.started/progress/finished, dataset.activated e model.trained"""
+        if not events.EVENTS_STREAMING:
+            # Workers sync: uma conexão aberta ocuparia o worker inteiro
+            return {
+                'error': 'Stream indisponível neste deploy; consulte GET /api/v1/events',
+                'poll_url': '/api/v1/events',
+                'poll_interval_seconds': events.EVENTS_POLL_HINT,
+            }, 503, {'Retry-After': str(int(events.EVENTS_POLL_HINT))}
+        args = events_parser.parse_args()
+        last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID'))
+        if last_event_id is None:
+            last_event_id = args['last_event_id']
+        stream = stream_events(types=parse_types(args['types']), last_event_id=last_event_id)
+        return Response(stream_with_context(stream), mimetype='text/event-stream',
+                        headers=SSE_HEADERS)
@@ -0,0 +1,158 @@
+"""
+Transformação de features ajustada no treino e reaplicada na inferência
+
+O `FeatureTransformer` guarda tudo o que a engenharia de features aprende com
+os dados de treino: o limiar de preço de `is_expensive` (quantil 0.75 do
+dataset), o vocabulário dos encoders categóricos e a média/escala do
+StandardScaler. Na predição o mesmo objeto transforma as entradas sem pandas,
+em uma chamada vetorizada, e o resultado de cada linha não depende das demais
+linhas do lote. O transformador é salvo junto com o modelo no registro.
+"""
+
+import math
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+NUMERICAL_FEATURES = ['price', 'rating']
+ENGINEERED_FEATURES = ['title_length', 'title_word_count', 'price_per_rating', 'is_expensive', 'is_high_rated']
+CATEGORICAL_FEATURES = ['category', 'availability']
+INTEGER_FEATURES = {
+    'rating', 'title_length', 'title_word_count', 'is_expensive', 'is_high_rated',
+    *(f'{col}_encoded' for col in CATEGORICAL_FEATURES),
+}
+
+# Quantil do preço acima do qual um livro é "caro"
+EXPENSIVE_QUANTILE = 0.75
+# Código das categorias não vistas no treino
+UNKNOWN_CATEGORY = 0
+
+
+def _number(value: Any) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _category(value: Any) -> str:
+    # Mesmo texto que `astype(str)` do pandas gera para valores ausentes
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'nan'
+    return str(value)
+
+
+def _text_stats(title: Any):
+    if not isinstance(title, str):
+        return math.nan, math.nan
+    return len(title), len(title.split())
+
+
+class FeatureTransformer:
+    """Engenharia de features + normalização com parâmetros do treino"""
+
+    def __init__(self, price_threshold: Optional[float] = None,
+                 categories: Optional[Dict[str, Dict[str, int]]] = None,
+                 mean: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None):
+        # None: limiar calculado sobre o próprio lote (modelos salvos antes do transformador)
+        self.price_threshold = price_threshold
+        self.categories = categories if categories is not None else {}
+        self.mean = mean
+        self.scale = scale
+
+    @property
+    def feature_names(self) -> List[str]:
+        return (
+            NUMERICAL_FEATURES + ENGINEERED_FEATURES +
+            [f'{col}_encoded' for col in CATEGORICAL_FEATURES if col in self.categories]
+        )
+
+    @property
+    def integer_columns(self) -> List[bool]:
+        return [name in INTEGER_FEATURES for name in self.feature_names]
+
+    @classmethod
+    def fit(cls, records: Sequence[Mapping[str, Any]]) -> 'FeatureTransformer':
+        """Aprende o limiar de preço e o vocabulário categórico dos registros"""
+        prices = np.array([_number(record.get('price')) for record in records], dtype=np.float64)
+        threshold = float(np.nanquantile(prices, EXPENSIVE_QUANTILE)) if len(prices) else math.nan
+        categories = {}
+        for col in CATEGORICAL_FEATURES:
+            if any(col in record for record in records):
+                # Ordem do LabelEncoder: valores únicos ordenados
+                values = sorted({_category(record.get(col)) for record in records})
+                categories[col] = {value: code for code, value in enumerate(values)}
+        return cls(threshold, categories)
+
+    def with_scaler(self, scaler) -> 'FeatureTransformer':
+        """Cópia com a média/escala de um StandardScaler ajustado"""
+        return FeatureTransformer(self.price_threshold, self.categories,
+                                  np.array(scaler.mean_, dtype=np.float64),
+                                  np.array(scaler.scale_, dtype=np.float64))
+
+    @classmethod
+    def from_legacy(cls, scaler, label_encoders: Dict[str, Any]) -> 'FeatureTransformer':
+        """Transformador equivalente aos artefatos antigos (scaler + LabelEncoders)"""
+        categories = {
+            col: {str(value): code for code, value in enumerate(encoder.classes_)}
+            for col, encoder in label_encoders.items()
+        }
+        return cls(None, categories).with_scaler(scaler)
+
+    def engineer(self, records: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        """Features brutas (sem normalização) dos registros, uma linha por registro
+
+        `title`, `price` e `rating` são obrigatórios; categorias ausentes ou
+        não vistas no treino recebem o código 0.
+        """
+        names = self.feature_names
+        values = np.empty((len(records), len(names)), dtype=np.float64)
+        try:
+            price = np.array([_number(record['price']) for record in records], dtype=np.float64)
+            rating = np.array([_number(record['rating']) for record in records], dtype=np.float64)
+            titles = [_text_stats(record['title']) for record in records]
+        except KeyError as e:
+            raise ValueError(f'Campo obrigatório ausente: {e.args[0]}') from None
+
+        threshold = self.price_threshold
+        if threshold is None:
+            threshold = np.nanquantile(price, EXPENSIVE_QUANTILE) if len(price) else math.nan
+
+        values[:, 0] = price
+        values[:, 1] = rating
+        values[:, 2:4] = np.array(titles, dtype=np.float64).reshape(len(records), 2)
+        values[:, 4] = price / (rating + 1)
+        values[:, 5] = price > threshold
+        values[:, 6] = rating >= 4
+        for col in CATEGORICAL_FEATURES:
+            if col not in self.categories:
+                continue
+            codes = self.categories[col]
+            values[:, names.index(f'{col}_encoded')] = [
+                codes.get(_category(record.get(col)), UNKNOWN_CATEGORY) for record in records
+            ]
+
+        values[np.isnan(values)] = 0
+        return values
+
+    def transform(self, data: Union[np.ndarray, Mapping[str, Any], Sequence[Mapping[str, Any]]]) -> np.ndarray:
+        """Features normalizadas de registros (dicts) ou de uma matriz de features brutas"""
+        if self.mean is None:
+            raise ValueError('Transformador sem normalização ajustada')
+        if isinstance(data, np.ndarray):
+            values = np.array(data, dtype=np.float64, ndmin=2)
+            if values.shape[1] != len(self.mean):
+                raise ValueError(f'Esperadas {len(self.mean)} features, recebidas {values.shape[1]}')
+        else:
+            if isinstance(data, Mapping):
+                data = [data]
+            values = self.engineer(data)
+        # Mesmas operações do StandardScaler.transform
+        values -= self.mean
+        values /= self.scale
+        return values
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Parâmetros ajustados (para os metadados do modelo)"""
+        return {
+            'price_threshold': self.price_threshold,
+            'categories': {col: list(codes) for col, codes in self.categories.items()},
+            'feature_names': self.feature_names,
+        }
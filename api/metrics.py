@@ -0,0 +1,194 @@
+"""
+Métricas Prometheus da Books API
+
+Registra latência e tamanho de resposta por rota, requisições em andamento,
+eventos dos caches e duração das operações do repositório. Com a variável
+`PROMETHEUS_MULTIPROC_DIR` definida (o `gunicorn.conf.py` faz isso), os
+valores de todos os workers são agregados no endpoint `/metrics`.
+"""
+
+import functools
+import os
+import time
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+OPERATION_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# Rótulo usado quando a requisição não casa com nenhuma rota
+UNMATCHED_ROUTE = '<unmatched>'
+
+REQUEST_LATENCY = Histogram(
+    'books_api_request_duration_seconds',
+    'Latência das requisições HTTP por rota',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'books_api_response_size_bytes',
+    'Tamanho das respostas HTTP por rota',
+    ['method', 'route'],
+    buckets=SIZE_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'books_api_requests_in_flight',
+    'Requisições HTTP em andamento',
+    multiprocess_mode='livesum',
+)
+CACHE_EVENTS = Counter(
+    'books_api_cache_events_total',
+    'Eventos dos caches de consulta (hit, miss, eviction, error, leader, shared) por camada',
+    ['tier', 'event'],
+)
+ADMISSION_REJECTIONS = Counter(
+    'books_api_admission_rejections_total',
+    'Requisições recusadas pelo controle de admissão',
+    ['priority', 'status'],
+)
+REPOSITORY_OPERATION_LATENCY = Histogram(
+    'books_api_repository_operation_duration_seconds',
+    'Duração das operações do BookRepository',
+    ['operation'],
+    buckets=OPERATION_BUCKETS,
+)
+ML_BATCH_SIZE = Histogram(
+    'books_api_ml_batch_size_rows',
+    'Linhas por lote do micro-batcher de predições',
+    buckets=BATCH_SIZE_BUCKETS,
+)
+ML_BATCH_QUEUE_DELAY = Histogram(
+    'books_api_ml_batch_queue_seconds',
+    'Espera de cada requisição na fila do micro-batcher de predições',
+    buckets=OPERATION_BUCKETS,
+)
+
+# Operações públicas do repositório que são cronometradas
+REPOSITORY_OPERATIONS = (
+    'load_books',
+    'get_all_books',
+    'get_book_by_id',
+    'search_books',
+    'get_all_categories',
+    'get_books_by_price_range',
+    'get_top_rated_books',
+    'get_stats_overview',
+    'get_stats_by_categories',
+    'get_changes',
+)
+
+
+def observe_request(method: str, route: str, status: int, duration: float,
+                    size: Optional[int] = None):
+    """Registra uma requisição concluída"""
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(duration)
+    if size is not None:
+        RESPONSE_SIZE.labels(method, route).observe(size)
+
+
+def cache_listener(tier: str) -> Callable[[str], None]:
+    """Cria o callback de eventos para um cache"""
+    children = {}
+
+    def listener(event: str):
+        child = children.get(event)
+        if child is None:
+            child = children[event] = CACHE_EVENTS.labels(tier, event)
+        child.inc()
+
+    return listener
+
+
+def admission_listener(priority: str, status: int):
+    """Callback de recusas do controle de admissão"""
+    ADMISSION_REJECTIONS.labels(priority, str(status)).inc()
+
+
+def batch_listener(size: int, delays):
+    """Callback dos lotes do micro-batcher de predições"""
+    ML_BATCH_SIZE.observe(size)
+    for delay in delays:
+        ML_BATCH_QUEUE_DELAY.observe(delay)
+
+
+def _timed(operation: str, func: Callable) -> Callable:
+    histogram = REPOSITORY_OPERATION_LATENCY.labels(operation)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def instrument_repository(repo):
+    """Cronometra as operações do repositório e conecta os caches às métricas"""
+    for operation in REPOSITORY_OPERATIONS:
+        setattr(repo, operation, _timed(operation, getattr(repo, operation)))
+    repo.cache.listener = cache_listener('local')
+    repo.singleflight.listener = cache_listener('singleflight')
+    if repo.shared_cache is not None:
+        repo.shared_cache.listener = cache_listener('shared')
+    return repo
+
+
+def generate_metrics() -> bytes:
+    """Gera o texto de exposição, agregando os workers em modo multiprocesso"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def init_metrics(app):
+    """Registra o middleware de métricas e o endpoint /metrics na aplicação Flask"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _metrics_record(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+            size = None if response.is_streamed else response.calculate_content_length()
+            observe_request(request.method, route, response.status_code,
+                            time.perf_counter() - start, size)
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc=None):
+        if g.pop('metrics_start', None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
+
+    @app.route('/metrics')
+    def metrics():
+        """Métricas no formato de exposição do Prometheus"""
+        return Response(generate_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+    return app
@@ -0,0 +1,242 @@
+"""
+Exportação binária das features e do dataset de treino
+
+Em vez de listas JSON (`.tolist()`), `/ml/features` e `/ml/training-data`
+podem responder direto dos arrays NumPy, sem perda de precisão, em:
+
+- npy: um único array (`numpy.load`)
+- npz: vários arrays nomeados (`numpy.load`), incluindo `feature_names`
+- arrow: Arrow IPC stream (`pyarrow.ipc.open_stream`)
+- parquet: arquivo Parquet (`pandas.read_parquet`)
+
+O formato vem de `?format=` ou do header `Accept`; sem nenhum dos dois a
+resposta continua em JSON. Arrow e Parquet dependem do pyarrow (opcional):
+sem ele, esses formatos respondem 406. As respostas são geradas em blocos,
+sem montar o arquivo inteiro em memória.
+"""
+
+import io
+import os
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+# Linhas por bloco (record batch do Arrow / row group do Parquet)
+ML_EXPORT_BATCH_ROWS = int(os.environ.get('ML_EXPORT_BATCH_ROWS', 65536))
+
+# Tamanho dos blocos de bytes dos arrays .npy
+CHUNK_SIZE = 1 << 20
+
+MIMETYPES = {
+    'json': 'application/json',
+    'npy': 'application/x-npy',
+    'npz': 'application/x-npz',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+FORMAT_BY_MIMETYPE = {mimetype: name for name, mimetype in MIMETYPES.items()}
+EXTENSIONS = {'npy': 'npy', 'npz': 'npz', 'arrow': 'arrows', 'parquet': 'parquet'}
+
+# Formatos por recurso; o dataset de treino tem vários arrays, então não há npy
+FEATURES_FORMATS = ('json', 'npy', 'npz', 'arrow', 'parquet')
+TRAINING_DATA_FORMATS = ('json', 'npz', 'arrow', 'parquet')
+
+
+class UnsupportedFormat(ValueError):
+    """Formato pedido não disponível para o recurso (406)"""
+
+
+def negotiate_format(format_arg: Optional[str], accept_mimetypes, available: Iterable[str]) -> str:
+    """Escolhe o formato de resposta a partir de ?format= ou do header Accept"""
+    available = list(available)
+    if format_arg:
+        name = format_arg.lower()
+        if name not in available:
+            raise UnsupportedFormat(f"Formato '{format_arg}' não suportado")
+        return name
+    # JSON primeiro: */* e Accept ausente continuam em JSON
+    best = accept_mimetypes.best_match([MIMETYPES[name] for name in available])
+    return FORMAT_BY_MIMETYPE.get(best, 'json')
+
+
+def pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def require_pyarrow(format_name: str):
+    if not pyarrow_available():
+        raise UnsupportedFormat(f"Formato '{format_name}' requer o pacote pyarrow")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Arquivo somente-escrita que acumula os bytes para o gerador da resposta"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _array_chunks(array: np.ndarray) -> Iterator[bytes]:
+    """Corpo de um array .npy (dados C-contíguos), em blocos"""
+    data = memoryview(np.ascontiguousarray(array)).cast('B')
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE].tobytes()
+
+
+def check_exportable(array: np.ndarray):
+    """Recusa arrays de objetos: o .npy guardaria um pickle, sem bytes fixos por item"""
+    if array.dtype.hasobject:
+        raise ValueError(f'Array com dtype {array.dtype} não pode ser exportado em binário')
+
+
+def iter_npy(array: np.ndarray) -> Iterator[bytes]:
+    """Arquivo .npy: cabeçalho seguido dos dados
+    
+    O dtype é validado já na chamada, antes de qualquer byte ser enviado.
+    """
+    check_exportable(array)
+    return _iter_npy(array)
+
+
+def _iter_npy(array: np.ndarray) -> Iterator[bytes]:
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, np.lib.format.header_data_from_array_1_0(
+        np.ascontiguousarray(array)
+    ))
+    yield header.getvalue()
+    yield from _array_chunks(array)
+
+
+def iter_npz(arrays: Dict[str, np.ndarray]) -> Iterator[bytes]:
+    """Arquivo .npz (zip sem compressão, como numpy.savez), escrito em fluxo"""
+    for array in arrays.values():
+        check_exportable(array)
+    return _iter_npz(arrays)
+
+
+def _iter_npz(arrays: Dict[str, np.ndarray]) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, array in arrays.items():
+            with archive.open(f'{name}.npy', mode='w', force_zip64=True) as member:
+                for chunk in iter_npy(array):
+                    member.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _arrow_table(columns: Dict[str, np.ndarray], start: int, stop: int):
+    import pyarrow as pa
+
+    return pa.table({name: pa.array(values[start:stop]) for name, values in columns.items()})
+
+
+def iter_arrow(columns: Dict[str, np.ndarray], batch_rows: int = None) -> Iterator[bytes]:
+    """Arrow IPC stream, um record batch por bloco de linhas"""
+    import pyarrow as pa
+
+    batch_rows = batch_rows or ML_EXPORT_BATCH_ROWS
+    rows = len(next(iter(columns.values()))) if columns else 0
+    sink = _ChunkSink()
+    schema = _arrow_table(columns, 0, 0).schema
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema) as writer:
+        for start in range(0, rows, batch_rows):
+            writer.write_table(_arrow_table(columns, start, start + batch_rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_parquet(columns: Dict[str, np.ndarray], batch_rows: int = None) -> Iterator[bytes]:
+    """Arquivo Parquet, um row group por bloco de linhas"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    batch_rows = batch_rows or ML_EXPORT_BATCH_ROWS
+    rows = len(next(iter(columns.values()))) if columns else 0
+    sink = _ChunkSink()
+    schema = _arrow_table(columns, 0, 0).schema
+    with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema) as writer:
+        for start in range(0, rows, batch_rows):
+            writer.write_table(_arrow_table(columns, start, start + batch_rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def feature_columns(matrix) -> Dict[str, np.ndarray]:
+    """Colunas da matriz de features, com as inteiras em int64"""
+    return {
+        name: matrix.values[:, index].astype(np.int64) if integer else matrix.values[:, index]
+        for index, (name, integer) in enumerate(zip(matrix.feature_names, matrix.integer_columns))
+    }
+
+
+def features_export(matrix, format_name: str) -> Iterator[bytes]:
+    """Matriz de features no formato pedido"""
+    if format_name == 'npy':
+        return iter_npy(matrix.values)
+    if format_name == 'npz':
+        return iter_npz({
+            'features': matrix.values,
+            'feature_names': np.array(matrix.feature_names),
+        })
+    require_pyarrow(format_name)
+    columns = feature_columns(matrix)
+    return iter_arrow(columns) if format_name == 'arrow' else iter_parquet(columns)
+
+
+def training_data_export(split: Dict[str, np.ndarray], feature_names: List[str],
+                         target_column: str, format_name: str) -> Iterator[bytes]:
+    """Dataset de treino normalizado no formato pedido
+
+    Em Arrow/Parquet é uma tabela só, com as features, o target e a coluna
+    `split` (train/test).
+    """
+    if format_name == 'npz':
+        return iter_npz({
+            'X_train': split['X_train'],
+            'X_test': split['X_test'],
+            'y_train': split['y_train'],
+            'y_test': split['y_test'],
+            'feature_names': np.array(feature_names),
+        })
+    require_pyarrow(format_name)
+    features = np.concatenate([split['X_train'], split['X_test']])
+    columns = {name: features[:, index] for index, name in enumerate(feature_names)}
+    columns[target_column] = np.concatenate([split['y_train'], split['y_test']])
+    columns['split'] = np.array(['train'] * len(split['X_train']) + ['test'] * len(split['X_test']))
+    return iter_arrow(columns) if format_name == 'arrow' else iter_parquet(columns)
+
+
+def binary_response(chunks: Iterator[bytes], format_name: str, filename: str):
+    """Resposta Flask em streaming com o mimetype do formato"""
+    from flask import Response, stream_with_context
+
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}.{EXTENSIONS[format_name]}"',
+        'Vary': 'Accept',
+    }
+    return Response(stream_with_context(chunks), mimetype=MIMETYPES[format_name], headers=headers)
+
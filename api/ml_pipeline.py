@@ -4,27 +4,238 @@ Pipeline ML-Ready para preparação de dados e integração com modelos
 
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score
-import joblib
+import hashlib
+import itertools
 import os
-from typing import Dict, List, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Any, Optional
 import logging
 
+from .cache import MISSING, QueryCache
+from .features import FeatureTransformer
+from .tree_eval import FlatForest
+
 logger = logging.getLogger(__name__)
 
+N_ESTIMATORS = 100
+# Árvores por bloco quando o treino reporta progresso
+PROGRESS_TREES_STEP = 10
+
+# Lotes a partir deste número de linhas avaliam as árvores em threads (0 desativa);
+# a travessia das árvores do scikit-learn libera o GIL
+ML_PREDICT_PARALLEL_MIN_ROWS = int(os.environ.get('ML_PREDICT_PARALLEL_MIN_ROWS', 2000))
+ML_PREDICT_THREADS = int(os.environ.get('ML_PREDICT_THREADS', min(4, os.cpu_count() or 1)))
+# Lotes até este número de linhas usam o FlatForest (menor custo fixo por chamada);
+# acima, a travessia em Cython do scikit-learn é mais rápida
+ML_FLAT_FOREST_MAX_ROWS = int(os.environ.get('ML_FLAT_FOREST_MAX_ROWS', 32))
+# Com o forest mapeado do registro, lotes grandes também usam o FlatForest, em
+# blocos de até ML_FLAT_FOREST_CHUNK_ROWS linhas. ML_LOAD_ESTIMATOR=true lê o
+# estimador do scikit-learn no worker que receber um lote grande: mais rápido,
+# mas cada worker passa a ter a própria cópia do modelo na memória
+ML_FLAT_FOREST_CHUNK_ROWS = int(os.environ.get('ML_FLAT_FOREST_CHUNK_ROWS', 4096))
+ML_LOAD_ESTIMATOR = os.environ.get('ML_LOAD_ESTIMATOR', 'false').lower() == 'true'
+
+# Geração de cada modelo servido (ServedModel.generation)
+_model_generations = itertools.count(1)
+
+_predict_executor = None
+_predict_executor_lock = threading.Lock()
+
+
+def _get_predict_executor() -> ThreadPoolExecutor:
+    global _predict_executor
+    if _predict_executor is None:
+        with _predict_executor_lock:
+            if _predict_executor is None:
+                _predict_executor = ThreadPoolExecutor(
+                    max_workers=ML_PREDICT_THREADS, thread_name_prefix='ml-predict'
+                )
+    return _predict_executor
+
+
+def forest_predict(model, X: np.ndarray, n_threads: Optional[int] = None):
+    """Média e desvio padrão das árvores do forest em uma única passada
+    
+    As saídas de cada árvore vão para uma matriz (árvores x linhas)
+    pré-alocada; a média soma as linhas na ordem dos estimadores, como o
+    `RandomForestRegressor.predict`, então o resultado é idêntico ao dele.
+    """
+    estimators = model.estimators_
+    if X.shape[1] != model.n_features_in_:
+        raise ValueError(f'Esperadas {model.n_features_in_} features, recebidas {X.shape[1]}')
+    # Mesma conversão que o forest faz antes de repassar às árvores
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    per_tree = np.empty((len(estimators), X.shape[0]), dtype=np.float64)
+    
+    def fill(indices):
+        for index in indices:
+            per_tree[index] = estimators[index].predict(X, check_input=False)
+    
+    if n_threads is None:
+        parallel = ML_PREDICT_PARALLEL_MIN_ROWS and X.shape[0] >= ML_PREDICT_PARALLEL_MIN_ROWS
+        n_threads = ML_PREDICT_THREADS if parallel else 1
+    n_threads = max(1, min(n_threads, len(estimators)))
+    if n_threads == 1:
+        fill(range(len(estimators)))
+    else:
+        # Cada thread preenche linhas distintas da matriz: sem lock
+        executor = _get_predict_executor()
+        chunks = np.array_split(np.arange(len(estimators)), n_threads)
+        for future in [executor.submit(fill, chunk) for chunk in chunks]:
+            future.result()
+    
+    # Soma sequencial explícita: `sum(axis=0)` usa soma pairwise quando há uma linha só
+    mean = per_tree[0].copy()
+    for row in per_tree[1:]:
+        mean += row
+    mean /= len(estimators)
+    return mean, per_tree.std(axis=0)
+
+
+@dataclass
+class FeatureMatrix:
+    """Features de uma versão dos dados: matriz NumPy tipada e encoders ajustados"""
+    dataset_version: Optional[str]
+    values: np.ndarray
+    feature_names: List[str]
+    integer_columns: List[bool]
+    # Limiar de preço e vocabulário categórico aprendidos destes dados (sem scaler)
+    transformer: FeatureTransformer
+    
+    @property
+    def label_encoders(self) -> Dict[str, Dict[str, int]]:
+        return self.transformer.categories
+    
+    @property
+    def shape(self):
+        return self.values.shape
+    
+    def records(self) -> List[Dict[str, Any]]:
+        """Linhas como dicionários (formato da resposta JSON de /ml/features)"""
+        columns = [
+            self.values[:, index].astype(np.int64).tolist() if integer else self.values[:, index].tolist()
+            for index, integer in enumerate(self.integer_columns)
+        ]
+        return [dict(zip(self.feature_names, row)) for row in zip(*columns)]
+    
+    def statistics(self) -> Dict[str, Dict[str, float]]:
+        values = self.values
+        return {
+            'mean': dict(zip(self.feature_names, values.mean(axis=0).tolist())),
+            'std': dict(zip(self.feature_names, values.std(axis=0, ddof=1).tolist())),
+            'min': dict(zip(self.feature_names, values.min(axis=0).tolist())),
+            'max': dict(zip(self.feature_names, values.max(axis=0).tolist())),
+        }
+
+
+@dataclass(frozen=True)
+class ServedModel:
+    """Modelo em uso: trocado inteiro, em uma única atribuição
+    
+    Quem lê `pipeline.served` uma vez tem estimador, forest, transformer e
+    versão do mesmo modelo, mesmo que outra thread ative um modelo novo.
+    """
+    model: Any = None
+    # Mesmo forest em tabelas de nós planas, para lotes pequenos
+    flat_forest: Optional[FlatForest] = None
+    # Engenharia de features + normalização ajustadas com o modelo
+    transformer: Optional[FeatureTransformer] = None
+    # Lê o estimador sob demanda quando o forest vem mapeado do registro
+    loader: Optional[Callable] = None
+    # Versão do registro de modelos (None = treinado só em memória)
+    version: Optional[str] = None
+    # Identifica o modelo (inclusive os sem versão) nas chaves do cache de predições
+    generation: int = 0
+    
+    @property
+    def trained(self) -> bool:
+        return self.model is not None or self.flat_forest is not None
+
+
 class MLPipeline:
     """Pipeline para preparação de dados e treinamento de modelos ML"""
     
-    def __init__(self, books_data: List[Dict]):
+    def __init__(self, books_data: List[Dict], dataset_version: Optional[str] = None,
+                 prediction_cache: Optional[QueryCache] = None):
         self.books_data = books_data
         self.df = pd.DataFrame(books_data) if books_data else pd.DataFrame()
-        self.scaler = StandardScaler()
-        self.label_encoders = {}
-        self.model = None
-        self.model_trained = False
+        self.dataset_version = dataset_version
+        self._served = ServedModel()
+        self._served_lock = threading.Lock()
+        # Predições por (modelo, vetor de features); trocar o modelo invalida
+        self.prediction_cache = prediction_cache
+        # Matriz de features calculada uma vez por versão dos dados
+        self._feature_matrix: Optional[FeatureMatrix] = None
+        self._feature_lock = threading.Lock()
+    
+    @property
+    def served(self) -> ServedModel:
+        """Modelo em uso (imutável)"""
+        return self._served
+    
+    @property
+    def model(self):
+        return self._served.model
+    
+    @property
+    def flat_forest(self) -> Optional[FlatForest]:
+        return self._served.flat_forest
+    
+    @property
+    def transformer(self) -> Optional[FeatureTransformer]:
+        return self._served.transformer
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._served.version
+    
+    @property
+    def model_trained(self) -> bool:
+        return self._served.trained
+    
+    @property
+    def feature_names(self) -> List[str]:
+        transformer = self._served.transformer
+        return transformer.feature_names if transformer else []
+    
+    def set_data(self, books_data: List[Dict], dataset_version: Optional[str] = None):
+        """Troca os dados (nova versão); o modelo treinado é mantido"""
+        with self._feature_lock:
+            self.books_data = books_data
+            self.df = pd.DataFrame(books_data) if books_data else pd.DataFrame()
+            self.dataset_version = dataset_version
+            self._feature_matrix = None
+    
+    def get_feature_matrix(self) -> FeatureMatrix:
+        """Retorna a matriz de features da versão atual, calculando-a uma única vez"""
+        matrix = self._feature_matrix
+        if matrix is not None:
+            return matrix
+        with self._feature_lock:
+            if self._feature_matrix is None:
+                self._feature_matrix = self._build_feature_matrix(self.books_data, self.dataset_version)
+            return self._feature_matrix
+    
+    @staticmethod
+    def _build_feature_matrix(books_data: List[Dict], dataset_version: Optional[str]) -> FeatureMatrix:
+        """Engenharia de features e encoding sobre todos os livros"""
+        transformer = FeatureTransformer.fit(books_data)
+        values = transformer.engineer(books_data)
+        values.setflags(write=False)
+        return FeatureMatrix(
+            dataset_version=dataset_version,
+            values=values,
+            feature_names=transformer.feature_names,
+            integer_columns=transformer.integer_columns,
+            transformer=transformer,
+        )
         
     def prepare_features(self) -> Dict[str, Any]:
         """Prepara features para ML"""
@@ -32,93 +243,78 @@ class MLPipeline:
             return {'error': 'Nenhum dado disponível'}
         
         try:
-            # Cria uma cópia para não modificar os dados originais
-            ml_df = self.df.copy()
-            
-            # Features numéricas
-            numerical_features = ['price', 'rating']
-            
-            # Features categóricas
-            categorical_features = ['category', 'availability']
-            
-            # Engenharia de features
-            ml_df['title_length'] = ml_df['title'].str.len()
-            ml_df['title_word_count'] = ml_df['title'].str.split().str.len()
-            ml_df['price_per_rating'] = ml_df['price'] / (ml_df['rating'] + 1)  # +1 para evitar divisão por zero
-            ml_df['is_expensive'] = (ml_df['price'] > ml_df['price'].quantile(0.75)).astype(int)
-            ml_df['is_high_rated'] = (ml_df['rating'] >= 4).astype(int)
-            
-            # Encoding de variáveis categóricas
-            for col in categorical_features:
-                if col in ml_df.columns:
-                    le = LabelEncoder()
-                    ml_df[f'{col}_encoded'] = le.fit_transform(ml_df[col].astype(str))
-                    self.label_encoders[col] = le
-            
-            # Features finais
-            feature_columns = (
-                numerical_features + 
-                ['title_length', 'title_word_count', 'price_per_rating', 'is_expensive', 'is_high_rated'] +
-                [f'{col}_encoded' for col in categorical_features if col in ml_df.columns]
-            )
-            
-            features_df = ml_df[feature_columns].fillna(0)
+            matrix = self.get_feature_matrix()
             
             return {
-                'features': features_df.to_dict('records'),
-                'feature_names': feature_columns,
-                'shape': features_df.shape,
-                'statistics': {
-                    'mean': features_df.mean().to_dict(),
-                    'std': features_df.std().to_dict(),
-                    'min': features_df.min().to_dict(),
-                    'max': features_df.max().to_dict()
-                }
+                'features': matrix.records(),
+                'feature_names': matrix.feature_names,
+                'shape': matrix.shape,
+                'statistics': matrix.statistics()
             }
             
         except Exception as e:
             logger.error(f"Erro ao preparar features: {e}")
             return {'error': f'Erro ao preparar features: {str(e)}'}
     
+    def _split_training_data(self, target_column: str, scaler: StandardScaler) -> Dict[str, Any]:
+        """Divide a matriz de features em treino/teste e normaliza (arrays NumPy)"""
+        matrix = self.get_feature_matrix()
+        
+        # Target
+        if target_column not in self.df.columns:
+            return {'error': f'Coluna target {target_column} não encontrada'}
+        # Texto (category, title) não serve de target para regressão e viraria
+        # um array de objetos, que não pode ser exportado em binário
+        if not pd.api.types.is_numeric_dtype(self.df[target_column]):
+            return {'error': f'Coluna target {target_column} não é numérica'}
+        
+        target = self.df[target_column].fillna(0).to_numpy()
+        
+        # Split train/test
+        X_train, X_test, y_train, y_test = train_test_split(
+            matrix.values, target, test_size=0.2, random_state=42
+        )
+        
+        # Normalização
+        return {
+            'matrix': matrix,
+            'X_train': scaler.fit_transform(X_train),
+            'X_test': scaler.transform(X_test),
+            'y_train': y_train,
+            'y_test': y_test,
+            'target': target,
+        }
+    
+    def get_training_arrays(self, target_column: str = 'rating') -> Dict[str, Any]:
+        """Dataset de treino como arrays NumPy (exportação binária)"""
+        if self.df.empty:
+            return {'error': 'Nenhum dado disponível'}
+        return self._split_training_data(target_column, StandardScaler())
+    
     def prepare_training_data(self, target_column: str = 'rating') -> Dict[str, Any]:
         """Prepara dados para treinamento de modelo"""
         if self.df.empty:
             return {'error': 'Nenhum dado disponível'}
         
         try:
-            features_result = self.prepare_features()
-            if 'error' in features_result:
-                return features_result
-            
-            features_df = pd.DataFrame(features_result['features'])
-            
-            # Target
-            if target_column not in self.df.columns:
-                return {'error': f'Coluna target {target_column} não encontrada'}
-            
-            target = self.df[target_column].fillna(0)
-            
-            # Split train/test
-            X_train, X_test, y_train, y_test = train_test_split(
-                features_df, target, test_size=0.2, random_state=42
-            )
-            
-            # Normalização
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
+            # Scaler próprio: o do modelo em uso só muda ao treinar
+            split = self._split_training_data(target_column, StandardScaler())
+            if 'error' in split:
+                return split
             
+            target = split['target']
             return {
-                'X_train': X_train_scaled.tolist(),
-                'X_test': X_test_scaled.tolist(),
-                'y_train': y_train.tolist(),
-                'y_test': y_test.tolist(),
-                'feature_names': features_result['feature_names'],
+                'X_train': split['X_train'].tolist(),
+                'X_test': split['X_test'].tolist(),
+                'y_train': split['y_train'].tolist(),
+                'y_test': split['y_test'].tolist(),
+                'feature_names': split['matrix'].feature_names,
                 'target_column': target_column,
-                'train_size': len(X_train),
-                'test_size': len(X_test),
+                'train_size': len(split['X_train']),
+                'test_size': len(split['X_test']),
                 'target_statistics': {
                     'mean': float(target.mean()),
-                    'std': float(target.std()),
+                    'std': float(target.std(ddof=1)),
                     'min': float(target.min()),
                     'max': float(target.max())
                 }
@@ -128,25 +324,63 @@ class MLPipeline:
             logger.error(f"Erro ao preparar dados de treinamento: {e}")
             return {'error': f'Erro ao preparar dados de treinamento: {str(e)}'}
     
-    def train_model(self, target_column: str = 'rating') -> Dict[str, Any]:
-        """Treina um modelo de exemplo (Random Forest)"""
+    @staticmethod
+    def _fit_forest(X_train, y_train, progress: Optional[Callable] = None) -> RandomForestRegressor:
+        """Ajusta o Random Forest; com `progress`, em blocos de árvores
+        
+        Com warm_start cada bloco acrescenta árvores com as mesmas sementes de
+        um ajuste único, então o modelo final é idêntico.
+        """
+        model = RandomForestRegressor(n_estimators=N_ESTIMATORS, random_state=42)
+        if progress is None:
+            return model.fit(X_train, y_train)
+        
+        model.set_params(warm_start=True)
+        for trees in range(PROGRESS_TREES_STEP, N_ESTIMATORS + PROGRESS_TREES_STEP, PROGRESS_TREES_STEP):
+            model.set_params(n_estimators=min(trees, N_ESTIMATORS))
+            model.fit(X_train, y_train)
+            progress('training', trees_built=len(model.estimators_), trees_total=N_ESTIMATORS)
+        model.set_params(warm_start=False)
+        return model
+    
+    def train_model(self, target_column: str = 'rating',
+                    progress: Optional[Callable] = None) -> Dict[str, Any]:
+        """Treina um modelo de exemplo (Random Forest)
+        
+        `progress(stage, **info)` é chamado a cada etapa (preparing, training,
+        evaluating); o resultado inclui a duração de cada uma em `timings`.
+        """
+        if self.df.empty:
+            return {'error': 'Nenhum dado disponível'}
+        
+        report = progress or (lambda stage, **info: None)
+        timings = {}
+        
         try:
-            training_data = self.prepare_training_data(target_column)
-            if 'error' in training_data:
-                return training_data
-            
-            X_train = np.array(training_data['X_train'])
-            y_train = np.array(training_data['y_train'])
-            X_test = np.array(training_data['X_test'])
-            y_test = np.array(training_data['y_test'])
+            report('preparing')
+            started = time.perf_counter()
+            scaler = StandardScaler()
+            split = self._split_training_data(target_column, scaler)
+            if 'error' in split:
+                return split
+            
+            X_train = split['X_train']
+            y_train = split['y_train']
+            X_test = split['X_test']
+            y_test = split['y_test']
+            timings['prepare_seconds'] = time.perf_counter() - started
             
             # Treina modelo Random Forest
-            self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.model.fit(X_train, y_train)
+            report('training', trees_built=0, trees_total=N_ESTIMATORS)
+            started = time.perf_counter()
+            model = self._fit_forest(X_train, y_train, progress)
+            timings['fit_seconds'] = time.perf_counter() - started
             
             # Predições
-            y_pred_train = self.model.predict(X_train)
-            y_pred_test = self.model.predict(X_test)
+            report('evaluating')
+            started = time.perf_counter()
+            y_pred_train = model.predict(X_train)
+            y_pred_test = model.predict(X_test)
             
             # Métricas
             train_mse = mean_squared_error(y_train, y_pred_train)
@@ -156,11 +390,13 @@ class MLPipeline:
             
             # Feature importance
             feature_importance = dict(zip(
-                training_data['feature_names'],
-                self.model.feature_importances_
+                split['matrix'].feature_names,
+                model.feature_importances_
             ))
+            timings['evaluate_seconds'] = time.perf_counter() - started
             
-            self.model_trained = True
+            # Modelo, scaler e encoders ajustados juntos passam a servir as predições
+            self._serve_model(model, split['matrix'].transformer.with_scaler(scaler), None)
             
             return {
                 'model_trained': True,
@@ -174,7 +410,8 @@ class MLPipeline:
                 'feature_importance': feature_importance,
                 'model_type': 'RandomForestRegressor',
                 'training_samples': len(X_train),
-                'test_samples': len(X_test)
+                'test_samples': len(X_test),
+                'timings': {name: round(seconds, 4) for name, seconds in timings.items()}
             }
             
         except Exception as e:
@@ -183,79 +420,192 @@ class MLPipeline:
     
     def predict(self, input_data: List[Dict]) -> Dict[str, Any]:
         """Faz predições usando o modelo treinado"""
-        if not self.model_trained or self.model is None:
-            return {'error': 'Modelo não foi treinado. Execute /api/v1/ml/train primeiro'}
+        return self.predict_many([input_data])[0]
+    
+    def predict_many(self, inputs: List[List[Dict]]) -> List[Dict[str, Any]]:
+        """Predições de vários lotes de entrada com uma única passada pelo forest
         
+        Cada lote recebe o seu resultado (ou erro), como em `predict`.
+        """
+        # Uma única leitura: uma ativação concorrente não mistura modelos nem
+        # grava predições de um modelo na chave de cache de outro
+        served = self._served
+        model, flat_forest, transformer = served.model, served.flat_forest, served.transformer
+        model_key = (served.version, served.generation)
+        if not served.trained:
+            return [{'error': 'Modelo não foi treinado. Execute /api/v1/ml/train primeiro'}] * len(inputs)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(inputs)
+        # As features de uma linha não dependem das demais: tudo em uma chamada
         try:
-            # Converte input para DataFrame
-            input_df = pd.DataFrame(input_data)
-            
-            # Prepara features da mesma forma que no treinamento
-            # Engenharia de features
-            input_df['title_length'] = input_df['title'].str.len()
-            input_df['title_word_count'] = input_df['title'].str.split().str.len()
-            input_df['price_per_rating'] = input_df['price'] / (input_df['rating'] + 1)
-            input_df['is_expensive'] = (input_df['price'] > input_df['price'].quantile(0.75)).astype(int)
-            input_df['is_high_rated'] = (input_df['rating'] >= 4).astype(int)
-            
-            # Encoding categórico
-            categorical_features = ['category', 'availability']
-            for col in categorical_features:
-                if col in input_df.columns and col in self.label_encoders:
-                    try:
-                        input_df[f'{col}_encoded'] = self.label_encoders[col].transform(input_df[col].astype(str))
-                    except ValueError:
-                        # Valor não visto durante treinamento - usa valor padrão
-                        input_df[f'{col}_encoded'] = 0
-            
-            # Features finais
-            numerical_features = ['price', 'rating']
-            feature_columns = (
-                numerical_features + 
-                ['title_length', 'title_word_count', 'price_per_rating', 'is_expensive', 'is_high_rated'] +
-                [f'{col}_encoded' for col in categorical_features if col in input_df.columns]
-            )
-            
-            features_df = input_df[feature_columns].fillna(0)
-            
-            # Normalização
-            features_scaled = self.scaler.transform(features_df)
-            
-            # Predição
-            predictions = self.model.predict(features_scaled)
-            
-            # Confiança (baseada na variância das árvores)
-            if hasattr(self.model, 'estimators_'):
-                tree_predictions = np.array([tree.predict(features_scaled) for tree in self.model.estimators_])
-                confidence = 1 / (1 + np.std(tree_predictions, axis=0))
-            else:
-                confidence = [0.5] * len(predictions)
-            
-            results = []
-            for i, pred in enumerate(predictions):
-                results.append({
-                    'prediction': float(pred),
-                    'confidence': float(confidence[i]),
-                    'input_data': input_data[i] if i < len(input_data) else None
-                })
-            
-            return {
-                'predictions': results,
-                'model_type': 'RandomForestRegressor',
-                'total_predictions': len(results)
-            }
-            
+            features_scaled = transformer.transform([row for input_data in inputs for row in input_data])
+            ready = list(range(len(inputs)))
+        except Exception:
+            # Alguma entrada inválida: transforma lote a lote para isolar o erro
+            features, ready = [], []
+            for index, input_data in enumerate(inputs):
+                try:
+                    features.append(transformer.transform(input_data))
+                    ready.append(index)
+                except Exception as e:
+                    logger.error(f"Erro ao fazer predições: {e}")
+                    results[index] = {'error': f'Erro ao fazer predições: {str(e)}'}
+            if not ready:
+                return results
+            features_scaled = np.concatenate(features)
+        
+        try:
+            if (model is None and served.loader is not None and ML_LOAD_ESTIMATOR
+                    and len(features_scaled) > ML_FLAT_FOREST_MAX_ROWS):
+                # Lote grande com opt-in: o scikit-learn é mais rápido que o FlatForest
+                model = served.loader()
+            predictions, confidence = self._predict_rows(model, flat_forest, model_key, features_scaled)
         except Exception as e:
             logger.error(f"Erro ao fazer predições: {e}")
-            return {'error': f'Erro ao fazer predições: {str(e)}'}
+            for index in ready:
+                results[index] = {'error': f'Erro ao fazer predições: {str(e)}'}
+            return results
+        
+        offset = 0
+        for index in ready:
+            input_data = inputs[index]
+            rows = slice(offset, offset + len(input_data))
+            offset = rows.stop
+            batch_results = [
+                {'prediction': prediction, 'confidence': row_confidence, 'input_data': row}
+                for prediction, row_confidence, row in zip(
+                    predictions[rows].tolist(), confidence[rows].tolist(), input_data
+                )
+            ]
+            results[index] = {
+                'predictions': batch_results,
+                'model_type': 'RandomForestRegressor',
+                'total_predictions': len(batch_results)
+            }
+        return results
+    
+    def _predict_rows(self, model, flat_forest, model_key, features_scaled: np.ndarray):
+        """Predição e confiança por linha; só as linhas fora do cache passam pelo modelo"""
+        cache = self.prediction_cache
+        if cache is None or not cache.enabled:
+            return self._model_predict(model, flat_forest, features_scaled)
+        
+        features_scaled = np.ascontiguousarray(features_scaled, dtype=np.float64)
+        keys = [
+            (model_key, hashlib.blake2b(row.tobytes(), digest_size=16).digest())
+            for row in features_scaled
+        ]
+        predictions = np.empty(len(keys))
+        confidence = np.empty(len(keys))
+        misses = []
+        for index, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is MISSING:
+                misses.append(index)
+            else:
+                predictions[index], confidence[index] = cached
+        
+        if misses:
+            pending = features_scaled if len(misses) == len(keys) else features_scaled[misses]
+            computed, computed_confidence = self._model_predict(model, flat_forest, pending)
+            predictions[misses] = computed
+            confidence[misses] = computed_confidence
+            for index, value, row_confidence in zip(misses, computed.tolist(), computed_confidence.tolist()):
+                cache.set(keys[index], (value, row_confidence))
+        return predictions, confidence
+    
+    @staticmethod
+    def _model_predict(model, flat_forest, features_scaled: np.ndarray):
+        # Predição e confiança (baseada na dispersão entre as árvores)
+        if flat_forest is not None and (model is None or len(features_scaled) <= ML_FLAT_FOREST_MAX_ROWS):
+            predictions, spread = flat_forest.predict(features_scaled, return_std=True,
+                                                      chunk_rows=ML_FLAT_FOREST_CHUNK_ROWS)
+            return predictions, 1 / (1 + spread)
+        if hasattr(model, 'estimators_'):
+            predictions, spread = forest_predict(model, features_scaled)
+            return predictions, 1 / (1 + spread)
+        predictions = model.predict(features_scaled)
+        return predictions, np.full(len(predictions), 0.5)
+    
+    def export_artifacts(self, served: Optional[ServedModel] = None) -> Dict[str, Any]:
+        """Artefatos do modelo treinado (ou de `served`) para o registro de modelos"""
+        served = served or self._served
+        return {
+            'model': served.model,
+            'flat_forest': served.flat_forest,
+            'transformer': served.transformer,
+            'feature_names': served.transformer.feature_names if served.transformer else [],
+        }
+    
+    def load_artifacts(self, artifacts: Dict[str, Any], version: Optional[str] = None):
+        """Passa a servir um modelo salvo no registro
+        
+        Com `flat_forest` (arrays mapeados do disco) o estimador do
+        scikit-learn só é lido por `model_loader`, no primeiro lote grande e
+        apenas com ML_LOAD_ESTIMATOR=true.
+        """
+        transformer = artifacts.get('transformer')
+        if transformer is None:
+            # Versões salvas antes do FeatureTransformer
+            transformer = FeatureTransformer.from_legacy(artifacts['scaler'], artifacts['label_encoders'])
+        self._serve_model(artifacts.get('model'), transformer, version,
+                          artifacts.get('flat_forest'), artifacts.get('model_loader'))
+    
+    def _serve_model(self, model, transformer: FeatureTransformer, version: Optional[str],
+                     flat_forest: Optional[FlatForest] = None, model_loader: Optional[Callable] = None):
+        served = ServedModel(
+            model=model,
+            flat_forest=flat_forest if flat_forest is not None else self._flatten(model),
+            transformer=transformer,
+            loader=model_loader,
+            version=version,
+            generation=next(_model_generations),
+        )
+        with self._served_lock:
+            self._served = served
+        # As chaves antigas já não casam (outra geração); libera a memória delas
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+    
+    def assign_version(self, served: ServedModel, version: str) -> bool:
+        """Registra a versão de um modelo treinado em memória, se ele ainda está em uso"""
+        with self._served_lock:
+            if self._served is not served:
+                return False
+            self._served = replace(served, version=version)
+            return True
+    
+    @staticmethod
+    def _flatten(model) -> Optional[FlatForest]:
+        if not hasattr(model, 'estimators_'):
+            return None
+        try:
+            return FlatForest.from_sklearn(model)
+        except ValueError as e:
+            logger.warning(f"Forest não convertido para tabelas planas: {e}")
+            return None
+    
+    def export_flat_forest(self, directory: Optional[str] = None) -> FlatForest:
+        """Forest do modelo servido em tabelas de nós planas (gravadas em `directory`)"""
+        flat_forest = self._served.flat_forest
+        if flat_forest is None:
+            raise ValueError('Nenhum Random Forest treinado')
+        if directory is not None:
+            flat_forest.save(directory)
+        return flat_forest
     
     def get_model_info(self) -> Dict[str, Any]:
         """Retorna informações sobre o modelo"""
+        served = self._served
         return {
-            'model_trained': self.model_trained,
-            'model_type': 'RandomForestRegressor' if self.model else None,
+            'model_trained': served.trained,
+            'model_version': served.version,
+            'model_type': 'RandomForestRegressor' if served.trained else None,
+            'memory_mapped': isinstance(getattr(served.flat_forest, 'threshold', None), np.memmap),
+            # Cópia própria do estimador do scikit-learn neste worker
+            'estimator_loaded': served.model is not None or bool(served.loader and served.loader.loaded),
             'data_available': not self.df.empty,
             'total_samples': len(self.df) if not self.df.empty else 0,
             'features_available': list(self.df.columns) if not self.df.empty else [],
-            'label_encoders': list(self.label_encoders.keys())
+            'label_encoders': list(served.transformer.categories) if served.transformer else []
         }
\ No newline at end of file
@@ -2,17 +2,57 @@
 Rotas ML-Ready para pipeline de Machine Learning
 """
 
-from flask_restx import Namespace, Resource, fields
+import logging
+import os
+import threading
+
+from flask_restx import Namespace, Resource, fields, marshal
 from flask import request
+from .batching import MicroBatcher
+from .cache import QueryCache
+from .events import publish as publish_event
+from .model_registry import ActiveModelWatcher, ModelNotFound, model_registry
 from .models import BookRepository
-from .ml_pipeline import MLPipeline
+from .singleflight import SingleFlight
+from .training_jobs import JobNotFound, TrainingQueueFull, training_metadata, training_queue
 # Autenticação removida - API pública
+# O MLPipeline (pandas, NumPy, scikit-learn, joblib) é importado só no primeiro
+# uso, para não pesar no cold start das rotas de livros
+
+logger = logging.getLogger(__name__)
+
+# Importa e monta o pipeline em segundo plano logo após o boot do worker
+ML_WARMUP = os.environ.get('ML_WARMUP', 'false').lower() == 'true'
+
+# Micro-batching de /ml/predictions (opt-in): requisições concorrentes dentro
+# da janela, até o máximo de linhas, viram uma passada só pelo forest
+ML_BATCHING = os.environ.get('ML_BATCHING', 'false').lower() == 'true'
+ML_BATCH_WINDOW_MS = float(os.environ.get('ML_BATCH_WINDOW_MS', 5))
+ML_BATCH_MAX_SIZE = int(os.environ.get('ML_BATCH_MAX_SIZE', 64))
+
+# Cache LRU de predições por linha, chaveado pelo vetor de features e pelo
+# modelo servido (0 desativa)
+ML_PREDICTION_CACHE_SIZE = int(os.environ.get('ML_PREDICTION_CACHE_SIZE', 4096))
+ML_PREDICTION_CACHE_TTL = float(os.environ.get('ML_PREDICTION_CACHE_TTL', 3600))
 
 # Namespace para ML
 ml_ns = Namespace('api/v1/ml', description='Endpoints para Machine Learning')
 
 # Instância global do pipeline (em produção, usar cache ou banco)
 ml_pipeline_instance = None
+ml_book_repo = None
+_ml_pipeline_lock = threading.Lock()
+
+# Versão ativa do registro de modelos, verificada no máximo 1x por intervalo
+active_model_watcher = ActiveModelWatcher(model_registry)
+_model_load_lock = threading.Lock()
+# Última versão ativa adotada por este worker
+_synced_model_version = None
+
+# Requisições simultâneas de features/training-data compartilham um cálculo
+ml_singleflight = SingleFlight()
+
+ml_prediction_cache = QueryCache(max_size=ML_PREDICTION_CACHE_SIZE, ttl=ML_PREDICTION_CACHE_TTL)
 
 # Modelos para documentação Swagger
 prediction_input_model = ml_ns.model('PredictionInput', {
@@ -44,79 +84,261 @@ training_response_model = ml_ns.model('TrainingResponse', {
 })
 
 def get_ml_pipeline():
-    """Obtém instância do pipeline ML"""
-    global ml_pipeline_instance
+    """Obtém instância do pipeline ML, acompanhando a versão atual dos dados"""
+    global ml_pipeline_instance, ml_book_repo
+    
+    pipeline = ml_pipeline_instance
+    if pipeline is None:
+        with _ml_pipeline_lock:
+            if ml_pipeline_instance is None:
+                from .ml_pipeline import MLPipeline
+                
+                # Carrega dados dos livros
+                if ml_book_repo is None:
+                    ml_book_repo = BookRepository()
+                else:
+                    ml_book_repo.refresh_if_stale()
+                books = ml_book_repo.get_all_books()
+                books_data = [book.to_dict() for book in books]
+                pipeline = MLPipeline(books_data, ml_book_repo.dataset_version, ml_prediction_cache)
+                # Modelo ativo no registro (sobrevive a restarts e reciclagem de workers)
+                sync_active_model(pipeline, force=True)
+                ml_pipeline_instance = pipeline
+            return ml_pipeline_instance
     
-    if ml_pipeline_instance is None:
-        # Carrega dados dos livros
-        book_repo = BookRepository()
-        books = book_repo.get_all_books()
-        books_data = [book.to_dict() for book in books]
-        ml_pipeline_instance = MLPipeline(books_data)
+    # Dados novos em disco (ex.: após scraping): a matriz de features é refeita
+    # uma vez para a nova versão, o modelo treinado é mantido
+    ml_book_repo.refresh_if_stale()
+    if pipeline.dataset_version != ml_book_repo.dataset_version:
+        with _ml_pipeline_lock:
+            if pipeline.dataset_version != ml_book_repo.dataset_version:
+                pipeline.set_data(
+                    [book.to_dict() for book in ml_book_repo.get_all_books()],
+                    ml_book_repo.dataset_version
+                )
+    sync_active_model(pipeline)
+    return pipeline
+
+def sync_active_model(pipeline, force: bool = False):
+    """Carrega no pipeline a versão ativa do registro quando o ponteiro muda"""
+    global _synced_model_version
+    
+    version = active_model_watcher.active_version(force)
+    if version is None or version == pipeline.model_version:
+        return
+    if not force and version == _synced_model_version:
+        # Já adotada; o pipeline pode ter um modelo mais novo só em memória
+        return
+    with _model_load_lock:
+        if version == pipeline.model_version:
+            return
+        try:
+            pipeline.load_artifacts(model_registry.load(version), version)
+            _synced_model_version = version
+            logger.info(f"Modelo {version} carregado do registro")
+        except Exception as e:
+            logger.warning(f"Falha ao carregar o modelo {version}: {e}")
+
+def register_trained_model(pipeline, result):
+    """Salva o modelo recém-treinado como nova versão ativa; retorna a versão"""
+    global _synced_model_version
+    
+    served = pipeline.served
+    try:
+        metadata = model_registry.save(pipeline.export_artifacts(served), training_metadata(pipeline, result))
+    except Exception as e:
+        logger.warning(f"Falha ao salvar o modelo no registro: {e}")
+        return None
+    if pipeline.assign_version(served, metadata['version']):
+        _synced_model_version = metadata['version']
+    active_model_watcher.active_version(force=True)
+    return metadata['version']
+
+def training_job_finished(job):
+    """Ao fim de um job: este worker adota o novo modelo e o evento é publicado"""
+    if job['status'] != 'succeeded':
+        return
+    # Os demais workers trocam na próxima verificação do registro
+    pipeline = ml_pipeline_instance
+    if pipeline is not None:
+        sync_active_model(pipeline, force=True)
+    publish_event('model.trained', {
+        'target': job['target'],
+        'model_type': job.get('model_type'),
+        'model_version': job['model_version'],
+        'metrics': job.get('metrics') or {},
+        'job_id': job['job_id']
+    })
+
+training_queue.listener = training_job_finished
+
+def predict_batch(inputs):
+    """Handler do micro-batcher: um lote de entradas de /ml/predictions"""
+    return get_ml_pipeline().predict_many(inputs)
+
+prediction_batcher = (
+    MicroBatcher(predict_batch, window=ML_BATCH_WINDOW_MS / 1000, max_size=ML_BATCH_MAX_SIZE)
+    if ML_BATCHING else None
+)
+
+def start_ml_warmup() -> threading.Thread:
+    """Importa a stack de ML e monta o pipeline em uma thread de fundo"""
+    def warmup():
+        try:
+            get_ml_pipeline()
+            logger.info("Pipeline ML pré-carregado")
+        except Exception as e:
+            logger.warning(f"Falha no pré-carregamento do pipeline ML: {e}")
     
-    return ml_pipeline_instance
+    thread = threading.Thread(target=warmup, name='ml-warmup', daemon=True)
+    thread.start()
+    return thread
+
+def negotiated_format(available):
+    """Formato pedido em ?format= ou Accept; levanta UnsupportedFormat (406)"""
+    from .ml_export import negotiate_format
+    return negotiate_format(request.args.get('format'), request.accept_mimetypes, available)
+
+def unsupported_format(error, available):
+    return {'error': str(error), 'formats': list(available)}, 406
 
 @ml_ns.route('/features')
 class MLFeatures(Resource):
-    @ml_ns.marshal_with(features_response_model)
-    @ml_ns.doc('get_ml_features')
+    @ml_ns.response(200, 'Success', features_response_model)
+    @ml_ns.doc('get_ml_features', params={'format': 'json (padrão), npy, npz, arrow ou parquet'})
+    @ml_ns.produces(['application/json', 'application/x-npy', 'application/x-npz',
+                     'application/vnd.apache.arrow.stream', 'application/vnd.apache.parquet'])
     # @ml_permission_required - removido
     def get(self):
         """Retorna dados formatados para features de ML"""
+        from .ml_export import FEATURES_FORMATS, UnsupportedFormat, binary_response, features_export
+        
         try:
+            format_name = negotiated_format(FEATURES_FORMATS)
             pipeline = get_ml_pipeline()
-            result = pipeline.prepare_features()
+            
+            if format_name != 'json':
+                if pipeline.df.empty:
+                    return marshal({'error': 'Nenhum dado disponível'}, features_response_model), 400
+                chunks = features_export(pipeline.get_feature_matrix(), format_name)
+                return binary_response(chunks, format_name, 'features')
+            
+            result = ml_singleflight.do(('features', id(pipeline), pipeline.dataset_version), pipeline.prepare_features)
             
             if 'error' in result:
-                return {'error': result['error']}, 400
+                return marshal({'error': result['error']}, features_response_model), 400
             
-            return result, 200
+            return marshal(result, features_response_model), 200
             
+        except UnsupportedFormat as e:
+            return unsupported_format(e, FEATURES_FORMATS)
         except Exception as e:
-            return {'error': f'Erro interno: {str(e)}'}, 500
+            return marshal({'error': f'Erro interno: {str(e)}'}, features_response_model), 500
 
 @ml_ns.route('/training-data')
 class MLTrainingData(Resource):
-    @ml_ns.marshal_with(training_response_model)
-    @ml_ns.doc('get_training_data')
+    @ml_ns.response(200, 'Success', training_response_model)
+    @ml_ns.doc('get_training_data', params={
+        'target': 'Coluna target (padrão: rating)',
+        'format': 'json (padrão), npz, arrow ou parquet'
+    })
+    @ml_ns.produces(['application/json', 'application/x-npz',
+                     'application/vnd.apache.arrow.stream', 'application/vnd.apache.parquet'])
     # @ml_permission_required - removido
     def get(self):
         """Retorna dataset preparado para treinamento"""
+        from .ml_export import TRAINING_DATA_FORMATS, UnsupportedFormat, binary_response, training_data_export
+        
         try:
             target = request.args.get('target', 'rating')
+            format_name = negotiated_format(TRAINING_DATA_FORMATS)
             
             pipeline = get_ml_pipeline()
-            result = pipeline.prepare_training_data(target)
+            
+            if format_name != 'json':
+                split = pipeline.get_training_arrays(target)
+                if 'error' in split:
+                    return marshal({'error': split['error']}, training_response_model), 400
+                chunks = training_data_export(split, split['matrix'].feature_names, target, format_name)
+                return binary_response(chunks, format_name, f'training-data-{target}')
+            
+            result = ml_singleflight.do(
+                ('training-data', id(pipeline), pipeline.dataset_version, target),
+                lambda: pipeline.prepare_training_data(target)
+            )
             
             if 'error' in result:
-                return {'error': result['error']}, 400
+                return marshal({'error': result['error']}, training_response_model), 400
             
-            return result, 200
+            return marshal(result, training_response_model), 200
             
+        except UnsupportedFormat as e:
+            return unsupported_format(e, TRAINING_DATA_FORMATS)
         except Exception as e:
-            return {'error': f'Erro interno: {str(e)}'}, 500
+            return marshal({'error': f'Erro interno: {str(e)}'}, training_response_model), 500
 
 @ml_ns.route('/train')
 class MLTrain(Resource):
     @ml_ns.doc('train_model')
+    @ml_ns.response(202, 'Job de treino enfileirado')
+    @ml_ns.response(503, 'Fila de treino cheia')
     # @ml_permission_required - removido
     def post(self):
-        """Treina um modelo de exemplo com os dados"""
+        """Enfileira o treino de um modelo; {"wait": true} treina na própria requisição"""
         try:
-            data = request.get_json() or {}
+            data = request.get_json(silent=True) or {}
             target = data.get('target', 'rating')
             
+            if not data.get('wait'):
+                data_path = ml_book_repo.csv_file_path if ml_book_repo is not None else None
+                job = training_queue.submit(target, data_path)
+                return dict(job, status_url=f"/api/v1/ml/jobs/{job['job_id']}"), 202
+            
+            # Modo síncrono (desenvolvimento/testes): sujeito ao timeout do worker
             pipeline = get_ml_pipeline()
             result = pipeline.train_model(target)
             
             if 'error' in result:
                 return {'error': result['error']}, 400
             
+            result['model_version'] = register_trained_model(pipeline, result)
+            publish_event('model.trained', {
+                'target': target,
+                'model_type': result.get('model_type'),
+                'model_version': result['model_version'],
+                'metrics': result.get('metrics', {})
+            })
             return result, 200
             
+        except TrainingQueueFull as e:
+            return {'error': str(e)}, 503
         except Exception as e:
             return {'error': f'Erro interno: {str(e)}'}, 500
 
+@ml_ns.route('/jobs')
+class MLJobsList(Resource):
+    @ml_ns.doc('list_training_jobs', params={'limit': 'Máximo de jobs (padrão: 20)'})
+    # @ml_permission_required - removido
+    def get(self):
+        """Lista os jobs de treino mais recentes"""
+        try:
+            limit = request.args.get('limit', 20, type=int)
+            jobs = training_queue.store.list_jobs(max(1, min(limit, 100)))
+            return {'jobs': jobs, 'total': len(jobs), 'pending': training_queue.pending()}, 200
+        except Exception as e:
+            return {'error': f'Erro interno: {str(e)}'}, 500
+
+@ml_ns.route('/jobs/<string:job_id>')
+class MLJobDetail(Resource):
+    @ml_ns.doc('get_training_job')
+    # @ml_permission_required - removido
+    def get(self, job_id):
+        """Status, progresso, tempos e métricas de um job de treino"""
+        try:
+            return training_queue.store.get(job_id), 200
+        except JobNotFound:
+            return {'error': f'Job {job_id} não encontrado'}, 404
+
 @ml_ns.route('/predictions')
 class MLPredictions(Resource):
     @ml_ns.expect(prediction_input_model)
@@ -136,8 +358,10 @@ class MLPredictions(Resource):
             if not isinstance(input_data, list):
                 return {'error': 'Campo "data" deve ser uma lista'}, 400
             
-            pipeline = get_ml_pipeline()
-            result = pipeline.predict(input_data)
+            if prediction_batcher is not None and input_data:
+                result = prediction_batcher.submit(input_data, size=len(input_data))
+            else:
+                result = get_ml_pipeline().predict(input_data)
             
             if 'error' in result:
                 return {'error': result['error']}, 400
@@ -162,6 +386,71 @@ class MLModelInfo(Resource):
         except Exception as e:
             return {'error': f'Erro interno: {str(e)}'}, 500
 
+@ml_ns.route('/models')
+class MLModelsList(Resource):
+    @ml_ns.doc('list_models')
+    # @ml_permission_required - removido
+    def get(self):
+        """Lista as versões de modelo salvas no registro"""
+        try:
+            versions = model_registry.list_versions()
+            pipeline = ml_pipeline_instance
+            return {
+                'models': versions,
+                'active_version': model_registry.active_version(),
+                'loaded_version': pipeline.model_version if pipeline is not None else None,
+                'total': len(versions)
+            }, 200
+            
+        except Exception as e:
+            return {'error': f'Erro interno: {str(e)}'}, 500
+
+@ml_ns.route('/models/<string:version>')
+class MLModelDetail(Resource):
+    @ml_ns.doc('get_model')
+    # @ml_permission_required - removido
+    def get(self, version):
+        """Metadados de uma versão do modelo (métricas, dados, features)"""
+        try:
+            metadata = model_registry.get_metadata(version)
+            metadata['active'] = version == model_registry.active_version()
+            return metadata, 200
+        except ModelNotFound:
+            return {'error': f'Modelo {version} não encontrado'}, 404
+
+@ml_ns.route('/models/<string:version>/activate')
+class MLModelActivate(Resource):
+    @ml_ns.doc('activate_model')
+    # @ml_permission_required - removido
+    def post(self, version):
+        """Ativa uma versão do modelo em todos os workers"""
+        try:
+            metadata = model_registry.activate(version)
+        except ModelNotFound:
+            return {'error': f'Modelo {version} não encontrado'}, 404
+        except Exception as e:
+            return {'error': f'Erro interno: {str(e)}'}, 500
+        
+        # Este worker troca na hora; os demais na próxima verificação do registro
+        sync_active_model(get_ml_pipeline(), force=True)
+        return {'success': True, 'active_version': version, 'model': metadata}, 200
+
+@ml_ns.route('/models/rollback')
+class MLModelRollback(Resource):
+    @ml_ns.doc('rollback_model')
+    # @ml_permission_required - removido
+    def post(self):
+        """Volta para a versão do modelo ativa anteriormente"""
+        try:
+            metadata = model_registry.rollback()
+        except Exception as e:
+            return {'error': f'Erro interno: {str(e)}'}, 500
+        if metadata is None:
+            return {'error': 'Não há versão anterior para rollback'}, 409
+        
+        sync_active_model(get_ml_pipeline(), force=True)
+        return {'success': True, 'active_version': metadata['version'], 'model': metadata}, 200
+
 @ml_ns.route('/example-prediction')
 class MLExamplePrediction(Resource):
     @ml_ns.doc('example_prediction')
@@ -0,0 +1,302 @@
+"""
+Registro versionado de modelos em disco
+
+Cada treino bem-sucedido vira uma versão imutável:
+
+    MODEL_REGISTRY_DIR/
+        ACTIVE                      versão ativa e histórico de ativações (JSON)
+        20261019T120000-a1b2c3/
+            model.joblib            transformador de features (e o modelo, sem forest/)
+            estimator.joblib        RandomForest do scikit-learn
+            forest/                 o mesmo forest em arrays .npy (FlatForest)
+            metadata.json           métricas, versão dos dados, features...
+
+O arquivo ACTIVE é trocado de forma atômica (arquivo temporário +
+`os.replace`), então um worker nunca lê um ponteiro pela metade. Ativações,
+rollbacks e a limpeza de versões antigas vêm de vários workers e processos de
+treino: a leitura e a regravação do ponteiro acontecem sob um `flock` em
+`ACTIVE.lock`, e nenhuma atualização se perde. Cada worker
+carrega a versão ativa ao montar o pipeline e verifica o ponteiro no máximo a
+cada `MODEL_REGISTRY_CHECK_INTERVAL` segundos, adotando ativações e rollbacks
+feitos por outros workers.
+
+Com `MODEL_REGISTRY_MMAP` (padrão) os arrays de `forest/` são abertos com
+`mmap_mode='r'`: todos os workers do host leem as mesmas páginas do page
+cache, e ativar uma versão é só abrir outros arquivos. O `estimator.joblib`
+só é lido por um worker que receba um lote grande demais para o FlatForest.
+"""
+
+import fcntl
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+MODEL_REGISTRY_DIR = os.environ.get(
+    'MODEL_REGISTRY_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+)
+MODEL_REGISTRY_CHECK_INTERVAL = float(os.environ.get('MODEL_REGISTRY_CHECK_INTERVAL', 1.0))
+# Versões mantidas em disco; a ativa e as do histórico (as últimas KEEP ativações,
+# que algum worker ainda pode estar servindo) nunca são removidas
+MODEL_REGISTRY_KEEP = int(os.environ.get('MODEL_REGISTRY_KEEP', 20))
+# Forest servido direto dos arquivos mapeados em memória, compartilhado entre workers
+MODEL_REGISTRY_MMAP = os.environ.get('MODEL_REGISTRY_MMAP', 'true').lower() == 'true'
+
+ACTIVE_FILE = 'ACTIVE'
+LOCK_FILE = 'ACTIVE.lock'
+ARTIFACTS_FILE = 'model.joblib'
+ESTIMATOR_FILE = 'estimator.joblib'
+FLAT_FOREST_DIR = 'forest'
+METADATA_FILE = 'metadata.json'
+
+VERSION_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{6}$')
+
+
+def write_atomic(path: str, content: str):
+    """Grava o arquivo inteiro ou nada: temporário no mesmo diretório + os.replace"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class ModelNotFound(KeyError):
+    """Versão inexistente no registro"""
+
+
+class LazyEstimator:
+    """Estimador em um arquivo joblib, lido na primeira chamada (uma vez só)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._estimator = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._estimator is not None
+
+    def __call__(self):
+        if self._estimator is None:
+            import joblib
+
+            with self._lock:
+                if self._estimator is None:
+                    self._estimator = joblib.load(self.path)
+        return self._estimator
+
+
+class ModelRegistry:
+    """Versões de modelos persistidas em um diretório"""
+
+    def __init__(self, root: str = MODEL_REGISTRY_DIR, keep: int = MODEL_REGISTRY_KEEP,
+                 mmap: bool = MODEL_REGISTRY_MMAP):
+        self.root = root
+        self.keep = keep
+        self.mmap = mmap
+        self._lock = threading.Lock()
+
+    # Arquivos
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def _version_dir(self, version: str) -> str:
+        if not VERSION_PATTERN.match(version or ''):
+            raise ModelNotFound(version)
+        return self._path(version)
+
+    def _read_pointer(self) -> Dict[str, Any]:
+        try:
+            with open(self._path(ACTIVE_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'version': None, 'history': []}
+
+    @contextmanager
+    def _pointer_lock(self):
+        """Exclusão mútua na atualização do ponteiro entre threads e processos"""
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self._path(LOCK_FILE), 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_pointer(self, version: Optional[str], history: List[str]):
+        write_atomic(self._path(ACTIVE_FILE), json.dumps({
+            'version': version,
+            'history': history,
+            'updated_at': datetime.now(timezone.utc).isoformat(),
+        }))
+
+    # API pública
+
+    def save(self, artifacts: Dict[str, Any], metadata: Dict[str, Any],
+             activate: bool = True) -> Dict[str, Any]:
+        """Persiste uma nova versão (e a ativa, por padrão); retorna os metadados
+
+        Com `flat_forest` nos artefatos, o forest vai para `forest/` e o
+        estimador do scikit-learn para um arquivo próprio.
+        """
+        import joblib
+
+        os.makedirs(self.root, exist_ok=True)
+        now = datetime.now(timezone.utc)
+        version = f"{now.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        metadata = dict(metadata, version=version, created_at=now.isoformat())
+
+        # Grava em um diretório temporário e renomeia: a versão aparece completa
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            artifacts = dict(artifacts)
+            flat_forest = artifacts.pop('flat_forest', None)
+            if flat_forest is not None:
+                flat_forest.save(os.path.join(tmp_dir, FLAT_FOREST_DIR))
+                joblib.dump(artifacts.pop('model'), os.path.join(tmp_dir, ESTIMATOR_FILE))
+            joblib.dump(artifacts, os.path.join(tmp_dir, ARTIFACTS_FILE))
+            with open(os.path.join(tmp_dir, METADATA_FILE), 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2, default=float)
+            os.rename(tmp_dir, self._path(version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        self.prune()
+        return metadata
+
+    def prune(self):
+        """Remove as versões mais antigas além de `keep`, exceto a ativa e as do histórico
+
+        Um worker que ainda não viu a ativação mais recente pode estar servindo
+        uma versão do histórico, com o estimador ainda por ler (LazyEstimator).
+        """
+        with self._pointer_lock():
+            pointer = self._read_pointer()
+            protected = {pointer.get('version')} | set(pointer.get('history', []))
+            versions = [metadata['version'] for metadata in self.list_versions()]
+            for version in versions[self.keep:]:
+                if version not in protected:
+                    shutil.rmtree(self._path(version), ignore_errors=True)
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """Metadados de todas as versões, da mais recente para a mais antiga"""
+        if not os.path.isdir(self.root):
+            return []
+        active = self.active_version()
+        versions = []
+        for name in sorted(os.listdir(self.root), reverse=True):
+            if not VERSION_PATTERN.match(name):
+                continue
+            try:
+                metadata = self.get_metadata(name)
+            except ModelNotFound:
+                continue
+            metadata['active'] = name == active
+            versions.append(metadata)
+        # Versões criadas no mesmo segundo: ordena pelo instante completo
+        versions.sort(key=lambda metadata: metadata.get('created_at', ''), reverse=True)
+        return versions
+
+    def get_metadata(self, version: str) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self._version_dir(version), METADATA_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            raise ModelNotFound(version)
+
+    def load(self, version: str) -> Dict[str, Any]:
+        """Carrega os artefatos (modelo, transformador...) de uma versão
+
+        Versões com `forest/` trazem `flat_forest` (mapeado em memória com
+        `mmap`) e `model_loader`, que lê o estimador só quando chamado; sem
+        `mmap`, o estimador é carregado na hora em `model`.
+        """
+        import joblib
+
+        version_dir = self._version_dir(version)
+        path = os.path.join(version_dir, ARTIFACTS_FILE)
+        if not os.path.exists(path):
+            raise ModelNotFound(version)
+        artifacts = joblib.load(path)
+        estimator_path = os.path.join(version_dir, ESTIMATOR_FILE)
+        if os.path.exists(estimator_path):
+            if self.mmap:
+                from .tree_eval import FlatForest
+
+                artifacts['flat_forest'] = FlatForest.load(os.path.join(version_dir, FLAT_FOREST_DIR), mmap_mode='r')
+                artifacts['model_loader'] = LazyEstimator(estimator_path)
+            else:
+                artifacts['model'] = joblib.load(estimator_path)
+        return artifacts
+
+    def active_version(self) -> Optional[str]:
+        return self._read_pointer().get('version')
+
+    def activate(self, version: str) -> Dict[str, Any]:
+        """Torna `version` a versão ativa, guardando a anterior para rollback"""
+        metadata = self.get_metadata(version)
+        with self._pointer_lock():
+            pointer = self._read_pointer()
+            history = list(pointer.get('history', []))
+            current = pointer.get('version')
+            if current and current != version:
+                history.append(current)
+            # O histórico é também o que prune() preserva: limitado a `keep`
+            self._write_pointer(version, history[-max(self.keep, 1):])
+        return metadata
+
+    def rollback(self) -> Optional[Dict[str, Any]]:
+        """Volta para a versão ativa anterior; None se não há histórico"""
+        with self._pointer_lock():
+            pointer = self._read_pointer()
+            history = list(pointer.get('history', []))
+            while history:
+                version = history.pop()
+                try:
+                    metadata = self.get_metadata(version)
+                except ModelNotFound:
+                    continue
+                self._write_pointer(version, history)
+                return metadata
+        return None
+
+
+class ActiveModelWatcher:
+    """Acompanha o ponteiro ACTIVE com no máximo uma leitura por intervalo"""
+
+    def __init__(self, registry: ModelRegistry, interval: float = MODEL_REGISTRY_CHECK_INTERVAL):
+        self.registry = registry
+        self.interval = interval
+        self._last_check = 0.0
+        self._active: Optional[str] = None
+
+    def active_version(self, force: bool = False) -> Optional[str]:
+        now = time.monotonic()
+        if force or now - self._last_check >= self.interval:
+            self._last_check = now
+            self._active = self.registry.active_version()
+        return self._active
+
+
+model_registry = ModelRegistry()
@@ -3,9 +3,26 @@ Modelos de dados para a API
 """
 
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
-import pandas as pd
+from typing import Callable, List, Optional, Dict, Any, Tuple
+import csv
+import hashlib
+import io
+import json
 import os
+import threading
+import time
+
+from .cache import QueryCache, MISSING, make_key
+from .shared_cache import create_shared_cache
+from .singleflight import SingleFlight
+
+# Versões mantidas no change log (/books/changes) e intervalo mínimo entre
+# verificações de mudança no arquivo de dados (segundos)
+CHANGE_LOG_SIZE = int(os.environ.get('CHANGE_LOG_SIZE', 20))
+STALE_CHECK_INTERVAL = float(os.environ.get('STALE_CHECK_INTERVAL', 1.0))
+
+# Ordem dos campos no arquivo compacto (scripts/build_compact_data.py)
+COMPACT_FIELDS = ('id', 'title', 'price', 'rating', 'availability', 'category', 'image_url', 'book_url')
 
 @dataclass
 class Book:
@@ -35,40 +52,205 @@ class Book:
 class BookRepository:
     """Repositório para gerenciar dados dos livros"""
     
-    def __init__(self, csv_file_path: str = None):
+    def __init__(self, csv_file_path: str = None, shared_cache_path: str = None):
         if csv_file_path is None:
             csv_file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'books_data.csv')
         
         self.csv_file_path = csv_file_path
         self._books = []
+        self._books_by_id = None
+        self.dataset_version = None
+        # Diferenças entre versões dos dados, da mais antiga para a mais recente
+        self.change_log: List[Dict[str, Any]] = []
+        self._reload_lock = threading.RLock()
+        self._source_stat = None
+        self._last_stale_check = time.monotonic()
+        self.cache = QueryCache()
+        self.shared_cache = create_shared_cache(shared_cache_path, types=(Book,))
+        self.singleflight = SingleFlight()
         self.load_books()
     
     def load_books(self):
-        """Carrega livros do arquivo CSV"""
+        """Carrega livros do arquivo CSV (ou do JSON compacto, se a extensão for .json)"""
+        with self._reload_lock:
+            previous_version, previous_books = self.dataset_version, self._books
+            self._source_stat = self._stat_source()
+            try:
+                if os.path.exists(self.csv_file_path) and self.csv_file_path.endswith('.json'):
+                    self._load_compact()
+                elif os.path.exists(self.csv_file_path):
+                    with open(self.csv_file_path, 'rb') as f:
+                        raw = f.read()
+                    # Módulo csv da stdlib: evita importar pandas no boot da API
+                    reader = csv.DictReader(io.StringIO(raw.decode('utf-8-sig')))
+                    books = []
+                    
+                    for row in reader:
+                        book = Book(
+                            id=int(row['id']),
+                            title=str(row['title']),
+                            price=float(row['price']),
+                            rating=int(row['rating']),
+                            availability=str(row['availability']),
+                            category=str(row['category']),
+                            image_url=str(row['image_url']),
+                            book_url=str(row['book_url'])
+                        )
+                        books.append(book)
+                    # A lista é trocada de uma vez: leitores nunca veem carga parcial
+                    self._books = books
+                    self._set_dataset_version(hashlib.sha1(raw).hexdigest()[:12])
+                else:
+                    # Se não existe arquivo, cria dados de exemplo
+                    self._create_sample_data()
+                    
+            except Exception as e:
+                print(f"Erro ao carregar livros: {e}")
+                # Numa recarga, mantém os dados atuais em vez de trocá-los pelos de exemplo
+                if not previous_books:
+                    self._create_sample_data()
+            
+            if previous_version is not None and self.dataset_version != previous_version:
+                self._record_changes(previous_version, previous_books)
+    
+    def _stat_source(self) -> Optional[Tuple[int, int]]:
+        """Assinatura (mtime, tamanho) do arquivo de dados"""
         try:
-            if os.path.exists(self.csv_file_path):
-                df = pd.read_csv(self.csv_file_path)
-                self._books = []
-                
-                for _, row in df.iterrows():
-                    book = Book(
-                        id=int(row['id']),
-                        title=str(row['title']),
-                        price=float(row['price']),
-                        rating=int(row['rating']),
-                        availability=str(row['availability']),
-                        category=str(row['category']),
-                        image_url=str(row['image_url']),
-                        book_url=str(row['book_url'])
-                    )
-                    self._books.append(book)
-            else:
-                # Se não existe arquivo, cria dados de exemplo
-                self._create_sample_data()
-                
-        except Exception as e:
-            print(f"Erro ao carregar livros: {e}")
-            self._create_sample_data()
+            stat = os.stat(self.csv_file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def refresh_if_stale(self) -> bool:
+        """Recarrega os dados se o arquivo mudou (verifica no máximo a cada STALE_CHECK_INTERVAL)
+        
+        Chamado no início de cada consulta pública: todos os workers passam a
+        servir a nova versão no máximo STALE_CHECK_INTERVAL depois da troca do
+        arquivo, e /books/changes nunca anuncia uma versão que as demais rotas
+        ainda não servem.
+        """
+        now = time.monotonic()
+        if now - self._last_stale_check < STALE_CHECK_INTERVAL:
+            return False
+        self._last_stale_check = now
+        if self._stat_source() == self._source_stat:
+            return False
+        self.load_books()
+        return True
+    
+    def _record_changes(self, previous_version: str, previous_books: List[Book]):
+        """Registra no change log a diferença entre a versão anterior e a atual"""
+        before = {book.book_url: book for book in previous_books}
+        after = {book.book_url: book for book in self._books}
+        entry = {
+            'from_version': previous_version,
+            'to_version': self.dataset_version,
+            'timestamp': time.time(),
+            'added': {key: book for key, book in after.items() if key not in before},
+            'removed': {key: book for key, book in before.items() if key not in after},
+            'modified': {
+                key: book for key, book in after.items()
+                if key in before and before[key] != book
+            },
+        }
+        self.change_log.append(entry)
+        if len(self.change_log) > CHANGE_LOG_SIZE:
+            del self.change_log[:len(self.change_log) - CHANGE_LOG_SIZE]
+    
+    def get_changes(self, since: str) -> Optional[Dict[str, List[Book]]]:
+        """Livros adicionados, alterados e removidos desde a versão `since`
+        
+        Retorna None se a versão não está no change log (o cliente deve
+        recarregar a lista completa).
+        """
+        if since == self.dataset_version:
+            return {'added': [], 'modified': [], 'removed': []}
+        
+        log = list(self.change_log)
+        start = None
+        for index in range(len(log) - 1, -1, -1):
+            if log[index]['from_version'] == since:
+                start = index
+                break
+        if start is None or log[-1]['to_version'] != self.dataset_version:
+            return None
+        
+        # Compõe as entradas: existia na versão `since`? Como está agora?
+        existed: Dict[str, bool] = {}
+        current: Dict[str, Optional[Book]] = {}
+        last_known: Dict[str, Book] = {}
+        for entry in log[start:]:
+            for key, book in entry['added'].items():
+                existed.setdefault(key, False)
+                current[key] = last_known[key] = book
+            for key, book in entry['modified'].items():
+                existed.setdefault(key, True)
+                current[key] = last_known[key] = book
+            for key, book in entry['removed'].items():
+                existed.setdefault(key, True)
+                current[key] = None
+                last_known[key] = book
+        
+        changes = {'added': [], 'modified': [], 'removed': []}
+        for key, book in current.items():
+            if book is not None:
+                changes['modified' if existed[key] else 'added'].append(book)
+            elif existed[key]:
+                changes['removed'].append(last_known[key])
+        for books in changes.values():
+            books.sort(key=lambda book: book.id)
+        return changes
+    
+    def _load_compact(self):
+        """Carrega o arquivo gerado por scripts/build_compact_data.py"""
+        with open(self.csv_file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        fields = data['fields']
+        prefixes = [data.get('prefixes', {}).get(field, '') for field in fields]
+        books = []
+        for row in data['books']:
+            values = {
+                field: prefix + value if prefix else value
+                for field, prefix, value in zip(fields, prefixes, row)
+            }
+            books.append(Book(**values))
+        self._books = books
+        self._set_dataset_version(data['version'])
+    
+    def _set_dataset_version(self, version: str):
+        """Ativa uma nova versão dos dados, invalidando o cache de consultas"""
+        # Os índices são reconstruídos sob demanda a partir da nova lista
+        self._books_by_id = None
+        if version != self.dataset_version:
+            self.cache.clear()
+            if self.shared_cache is not None:
+                self.shared_cache.invalidate(keep_version=version)
+        self.dataset_version = version
+    
+    def _cached(self, operation: str, compute: Callable[[], Any], **params) -> Any:
+        """Retorna o resultado da consulta a partir do cache, calculando se necessário"""
+        version = self.dataset_version
+        key = make_key(operation, version, **params)
+        result = self.cache.get(key)
+        if result is not MISSING:
+            return result
+        
+        # Chamadas simultâneas com a mesma chave compartilham um único cálculo
+        return self.singleflight.do(key, lambda: self._fill(key, version, compute))
+    
+    def _fill(self, key, version: str, compute: Callable[[], Any]) -> Any:
+        """Busca no cache compartilhado ou calcula, preenchendo os caches"""
+        result = MISSING
+        if self.shared_cache is not None:
+            result = self.shared_cache.get(key, version)
+        if result is MISSING:
+            result = compute()
+            if self.shared_cache is not None:
+                self.shared_cache.set(key, version, result)
+        
+        self.cache.set(key, result)
+        return result
     
     def _create_sample_data(self):
         """Cria dados de exemplo se não houver arquivo CSV"""
@@ -81,20 +263,39 @@ class BookRepository:
                  "https://example.com/img3.jpg", "https://example.com/book3")
         ]
         self._books = sample_books
+        self._set_dataset_version('sample')
     
     def get_all_books(self) -> List[Book]:
         """Retorna todos os livros"""
+        self.refresh_if_stale()
         return self._books
     
+    def build_indexes(self) -> Dict[int, Book]:
+        """Constrói o índice de livros por ID"""
+        index = {}
+        for book in self._books:
+            # Em IDs duplicados vale o primeiro, como na busca linear
+            index.setdefault(book.id, book)
+        self._books_by_id = index
+        return index
+    
     def get_book_by_id(self, book_id: int) -> Optional[Book]:
         """Retorna um livro pelo ID"""
-        for book in self._books:
-            if book.id == book_id:
-                return book
-        return None
+        self.refresh_if_stale()
+        index = self._books_by_id
+        if index is None:
+            index = self.build_indexes()
+        return index.get(book_id)
     
     def search_books(self, title: str = None, category: str = None) -> List[Book]:
         """Busca livros por título e/ou categoria"""
+        self.refresh_if_stale()
+        return self._cached(
+            'search_books', lambda: self._search_books(title, category),
+            title=title, category=category
+        )
+    
+    def _search_books(self, title: str = None, category: str = None) -> List[Book]:
         results = self._books
         
         if title:
@@ -109,11 +310,22 @@ class BookRepository:
     
     def get_all_categories(self) -> List[str]:
         """Retorna todas as categorias únicas"""
+        self.refresh_if_stale()
+        return self._cached('get_all_categories', self._get_all_categories)
+    
+    def _get_all_categories(self) -> List[str]:
         categories = list(set(book.category for book in self._books))
         return sorted(categories)
     
     def get_books_by_price_range(self, min_price: float = None, max_price: float = None) -> List[Book]:
         """Retorna livros dentro de uma faixa de preço"""
+        self.refresh_if_stale()
+        return self._cached(
+            'get_books_by_price_range', lambda: self._get_books_by_price_range(min_price, max_price),
+            min_price=min_price, max_price=max_price
+        )
+    
+    def _get_books_by_price_range(self, min_price: float = None, max_price: float = None) -> List[Book]:
         results = self._books
         
         if min_price is not None:
@@ -126,11 +338,19 @@ class BookRepository:
     
     def get_top_rated_books(self, limit: int = 10) -> List[Book]:
         """Retorna os livros com melhor avaliação"""
+        self.refresh_if_stale()
+        return self._cached('get_top_rated_books', lambda: self._get_top_rated_books(limit), limit=limit)
+    
+    def _get_top_rated_books(self, limit: int = 10) -> List[Book]:
         sorted_books = sorted(self._books, key=lambda x: x.rating, reverse=True)
         return sorted_books[:limit]
     
     def get_stats_overview(self) -> Dict[str, Any]:
         """Retorna estatísticas gerais da coleção"""
+        self.refresh_if_stale()
+        return self._cached('get_stats_overview', self._get_stats_overview)
+    
+    def _get_stats_overview(self) -> Dict[str, Any]:
         if not self._books:
             return {
                 'total_books': 0,
@@ -158,6 +378,10 @@ class BookRepository:
     
     def get_stats_by_categories(self) -> Dict[str, Any]:
         """Retorna estatísticas detalhadas por categoria"""
+        self.refresh_if_stale()
+        return self._cached('get_stats_by_categories', self._get_stats_by_categories)
+    
+    def _get_stats_by_categories(self) -> Dict[str, Any]:
         categories_stats = {}
         
         for category in self.get_all_categories():
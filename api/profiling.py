@@ -0,0 +1,304 @@
+"""
+Profiling sob demanda de requisições
+
+Modo opt-in: uma requisição é perfilada quando traz o header
+`X-Profile: <PROFILE_TOKEN>` ou quando é sorteada pela taxa
+`PROFILE_SAMPLE_RATE`. Dois modos estão disponíveis (`PROFILE_MODE` ou header
+`X-Profile-Mode`):
+
+- sampling: um sampler em thread separada coleta a pilha da thread da
+  requisição a cada `PROFILE_INTERVAL_MS` (baixo overhead)
+- tracing: `sys.setprofile` registra todas as chamadas e o tempo próprio de
+  cada pilha em microssegundos (exato, útil para requisições curtas)
+
+O resultado é gravado no formato "collapsed stacks" (compatível com
+flamegraph.pl e speedscope), que também pode ser renderizado como SVG.
+
+Sem token e sem taxa configurados, nenhum hook é registrado: o custo com o
+modo desligado é zero.
+"""
+
+import hmac
+import html
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from .shared_cache import RUN_DIR, ensure_private_dir
+
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sampling')
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 2))
+# Pilhas e caminhos do código: diretório privado (0700), como os caches
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(RUN_DIR, 'profiles'))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 200))
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_MODE_HEADER = 'X-Profile-Mode'
+
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(ROOT_DIR):
+        filename = os.path.relpath(filename, ROOT_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Amostra periodicamente a pilha de uma thread"""
+
+    mode = 'sampling'
+    unit = 'samples'
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL_MS / 1000.0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Pilhas no formato collapsed: `f1;f2;f3 <contagem>` por linha"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class TracingProfiler:
+    """Registra todas as chamadas da thread atual e o tempo próprio de cada pilha"""
+
+    mode = 'tracing'
+    unit = 'us'
+
+    def __init__(self):
+        self._stack: List[str] = []
+        self._times: Counter = Counter()
+        self._last = 0
+        self.samples = 0
+
+    def start(self):
+        self._last = time.perf_counter_ns()
+        sys.setprofile(self._callback)
+        return self
+
+    def stop(self):
+        sys.setprofile(None)
+
+    def _callback(self, frame, event, arg):
+        now = time.perf_counter_ns()
+        if self._stack:
+            self._times[tuple(self._stack)] += now - self._last
+        if event == 'call':
+            self._stack.append(_frame_label(frame))
+        elif event == 'c_call':
+            self._stack.append(f"{getattr(arg, '__qualname__', repr(arg))} (builtin)")
+        elif self._stack:
+            # return, c_return, c_exception
+            self._stack.pop()
+        self.samples += 1
+        self._last = time.perf_counter_ns()
+
+    def collapsed(self) -> str:
+        """Pilhas no formato collapsed com o tempo próprio em microssegundos"""
+        return ''.join(
+            f"{';'.join(stack)} {elapsed // 1000}\n"
+            for stack, elapsed in self._times.most_common() if elapsed >= 1000
+        )
+
+
+class ProfileStore:
+    """Armazena perfis em disco (collapsed + metadados)"""
+
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+
+    def save(self, collapsed: str, metadata: Dict[str, Any]) -> str:
+        ensure_private_dir(self.directory)
+        profile_id = uuid.uuid4().hex
+        metadata = dict(metadata, id=profile_id)
+        with open(os.path.join(self.directory, f'{profile_id}.collapsed'), 'w') as f:
+            f.write(collapsed)
+        with open(os.path.join(self.directory, f'{profile_id}.json'), 'w') as f:
+            json.dump(metadata, f)
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        profiles = self.list()
+        for metadata in profiles[self.max_files:]:
+            for ext in ('collapsed', 'json'):
+                try:
+                    os.remove(os.path.join(self.directory, f"{metadata['id']}.{ext}"))
+                except OSError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadados dos perfis, do mais recente para o mais antigo"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return sorted(profiles, key=lambda p: p.get('started_at', 0), reverse=True)
+
+    def get_collapsed(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f'{profile_id}.collapsed')) as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+def render_flamegraph(collapsed: str, title: str = 'Books API profile',
+                      width: int = 1200, frame_height: int = 16) -> str:
+    """Renderiza pilhas collapsed como um flamegraph SVG simples"""
+    root: Dict[str, Any] = {'count': 0, 'children': {}}
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(' ')
+        if not stack:
+            continue
+        count = int(count)
+        root['count'] += count
+        node = root
+        for label in stack.split(';'):
+            node = node['children'].setdefault(label, {'count': 0, 'children': {}})
+            node['count'] += count
+
+    rects = []
+    max_depth = [0]
+
+    def walk(node, x, depth):
+        max_depth[0] = max(max_depth[0], depth)
+        for label, child in sorted(node['children'].items()):
+            w = child['count'] / root['count'] * width if root['count'] else 0
+            if w >= 0.5:
+                rects.append((label, x, depth, w, child['count']))
+                walk(child, x, depth + 1)
+            x += w
+
+    walk(root, 0.0, 0)
+    height = (max_depth[0] + 2) * frame_height
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">',
+        f'<text x="4" y="12">{html.escape(title)} (total {root["count"]})</text>',
+    ]
+    for label, x, depth, w, count in rects:
+        y = height - (depth + 1) * frame_height
+        hue = 20 + zlib.crc32(label.encode('utf-8')) % 40
+        text = html.escape(label)
+        max_chars = int(w / 7)
+        shown = text if len(label) <= max_chars else html.escape(label[:max(0, max_chars - 2)] + '..')
+        parts.append(
+            f'<g><title>{text} ({count})</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{frame_height - 1}" '
+            f'fill="hsl({hue},90%,60%)"/>'
+            + (f'<text x="{x + 2:.1f}" y="{y + frame_height - 4}">{shown}</text>' if max_chars > 3 else '')
+            + '</g>'
+        )
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+profile_store = ProfileStore()
+
+
+def profiling_enabled() -> bool:
+    return bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def is_authorized(headers) -> bool:
+    """Verifica o token de profiling; sem PROFILE_TOKEN ninguém consulta os perfis"""
+    if not PROFILE_TOKEN:
+        return False
+    return hmac.compare_digest(headers.get(PROFILE_HEADER, '').encode('utf-8'), PROFILE_TOKEN.encode('utf-8'))
+
+
+def init_profiling(app, store: ProfileStore = None):
+    """Registra os hooks de profiling na aplicação Flask, se habilitado"""
+    store = store or profile_store
+    if not profiling_enabled():
+        return store
+
+    from flask import g, request
+
+    @app.before_request
+    def _profile_start():
+        requested = is_authorized(request.headers)
+        if requested or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+            mode = request.headers.get(PROFILE_MODE_HEADER, PROFILE_MODE)
+            g.profile_started_at = time.time()
+            if mode == 'tracing':
+                g.profile_sampler = TracingProfiler().start()
+            else:
+                g.profile_sampler = StackSampler(threading.get_ident()).start()
+
+    @app.after_request
+    def _profile_header(response):
+        sampler = g.get('profile_sampler')
+        if sampler is not None:
+            sampler.stop()
+            g.profile_id = store.save(sampler.collapsed(), {
+                'method': request.method,
+                'path': request.path,
+                'route': request.url_rule.rule if request.url_rule is not None else None,
+                'status': response.status_code,
+                'started_at': g.profile_started_at,
+                'duration_ms': (time.time() - g.profile_started_at) * 1000.0,
+                'mode': sampler.mode,
+                'unit': sampler.unit,
+                'samples': sampler.samples,
+            })
+            response.headers['X-Profile-Id'] = g.profile_id
+        return response
+
+    @app.teardown_request
+    def _profile_cleanup(exc=None):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is not None and 'profile_id' not in g:
+            sampler.stop()
+
+    return store
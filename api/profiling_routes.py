@@ -0,0 +1,52 @@
+"""
+Rotas para consulta dos perfis de requisições
+"""
+
+from flask_restx import Namespace, Resource
+from flask import Response, request
+from . import profiling
+from .profiling import is_authorized, profile_store, render_flamegraph
+
+# Namespace para profiling
+profiling_ns = Namespace('api/v1/profiles', description='Perfis de execução de requisições')
+
+
+def unauthorized():
+    """Resposta para consultas sem o token (ou com o profiling só por amostragem)"""
+    if not profiling.PROFILE_TOKEN:
+        # Os perfis trazem stack traces e caminhos: só saem com um token configurado
+        return {'error': 'Consulta de perfis desativada: defina PROFILE_TOKEN'}, 403
+    return {'error': 'Header X-Profile inválido'}, 403
+
+
+@profiling_ns.route('')
+class ProfilesList(Resource):
+    @profiling_ns.doc('list_profiles')
+    def get(self):
+        """Lista os perfis coletados (mais recentes primeiro)"""
+        if not is_authorized(request.headers):
+            return unauthorized()
+
+        profiles = profile_store.list()
+        return {
+            'profiles': profiles,
+            'total': len(profiles)
+        }, 200
+
+
+@profiling_ns.route('/<string:profile_id>')
+class ProfileDetail(Resource):
+    @profiling_ns.doc('get_profile', params={'format': 'collapsed (padrão) ou svg'})
+    def get(self, profile_id):
+        """Retorna um perfil como collapsed stacks ou flamegraph SVG"""
+        if not is_authorized(request.headers):
+            return unauthorized()
+
+        collapsed = profile_store.get_collapsed(profile_id)
+        if collapsed is None:
+            return {'error': f'Perfil {profile_id} não encontrado'}, 404
+
+        if request.args.get('format') == 'svg':
+            return Response(render_flamegraph(collapsed, title=profile_id),
+                            mimetype='image/svg+xml')
+        return Response(collapsed, mimetype='text/plain')
@@ -6,12 +6,28 @@ from flask import Flask
 from flask_restx import Api, Resource, fields, reqparse
 from flask_cors import CORS
 from .models import BookRepository
+from .admission import init_admission
+from .events import publish as publish_event
+from .metrics import admission_listener, batch_listener, cache_listener, init_metrics, instrument_repository
+from .profiling import init_profiling
+from .spec_cache import init_spec_cache
+from .warmup import warmup_state
 import os
 
 # Configuração da aplicação Flask
 app = Flask(__name__)
 CORS(app)
 
+# Métricas Prometheus (/metrics); registrado antes da admissão para medir recusas
+init_metrics(app)
+
+# Controle de admissão / descarte de carga por rota
+admission_controller = init_admission(app)
+admission_controller.listener = admission_listener
+
+# Profiling sob demanda (só registra hooks se PROFILE_TOKEN/PROFILE_SAMPLE_RATE)
+init_profiling(app)
+
 # Configuração da API com Swagger
 api = Api(
     app,
@@ -29,12 +45,23 @@ ns_health = api.namespace('api/v1/health', description='Status da API')
 
 # Importa e adiciona novos namespaces
 # from .auth_routes import auth_ns - removido
-from .ml_routes import ml_ns
-from .scraping_routes import scraping_ns
+from .ml_routes import ml_ns, ml_prediction_cache, ml_singleflight, prediction_batcher
+from .scraping_routes import scraping_listeners, scraping_ns
+from .profiling_routes import profiling_ns
+from .events_routes import events_ns
 
 # api.add_namespace(auth_ns) - removido
 api.add_namespace(ml_ns)
 api.add_namespace(scraping_ns)
+api.add_namespace(profiling_ns)
+api.add_namespace(events_ns)
+ml_singleflight.listener = cache_listener('ml_singleflight')
+ml_prediction_cache.listener = cache_listener('ml_predictions')
+if prediction_batcher is not None:
+    prediction_batcher.listener = batch_listener
+
+# /swagger.json servido a partir dos bytes pré-serializados, com ETag
+spec_cache = init_spec_cache(app, api)
 
 # Modelos para documentação Swagger
 book_model = api.model('Book', {
@@ -58,7 +85,28 @@ stats_overview_model = api.model('StatsOverview', {
 })
 
 # Inicializa o repositório
-book_repo = BookRepository()
+book_repo = instrument_repository(BookRepository())
+
+
+def reload_dataset():
+    """Recarrega os dados e publica dataset.activated se a versão mudou"""
+    previous_version = book_repo.dataset_version
+    book_repo.load_books()
+    if book_repo.dataset_version == previous_version:
+        return
+    last_change = book_repo.change_log[-1] if book_repo.change_log else {}
+    publish_event('dataset.activated', {
+        'version': book_repo.dataset_version,
+        'previous_version': previous_version,
+        'total_books': len(book_repo.get_all_books()),
+        'added': len(last_change.get('added', ())),
+        'modified': len(last_change.get('modified', ())),
+        'removed': len(last_change.get('removed', ())),
+    })
+
+
+# Um scraping concluído recarrega os dados (e registra o change log)
+scraping_listeners.append(reload_dataset)
 
 # Parser para parâmetros de busca
 search_parser = reqparse.RequestParser()
@@ -70,6 +118,10 @@ price_parser = reqparse.RequestParser()
 price_parser.add_argument('min', type=float, help='Preço mínimo')
 price_parser.add_argument('max', type=float, help='Preço máximo')
 
+# Parser para sincronização incremental
+changes_parser = reqparse.RequestParser()
+changes_parser.add_argument('since', type=str, help='Versão dos dados já conhecida pelo cliente')
+
 # Rotas da API
 
 @ns_books.route('')
@@ -123,6 +175,33 @@ class BooksByPriceRange(Resource):
         books = book_repo.get_books_by_price_range(min_price=args['min'], max_price=args['max'])
         return [book.to_dict() for book in books]
 
+@ns_books.route('/changes')
+class BookChanges(Resource):
+    @ns_books.expect(changes_parser)
+    @ns_books.doc('book_changes')
+    def get(self):
+        """Livros adicionados, alterados e removidos desde uma versão dos dados (sincronização incremental)"""
+        args = changes_parser.parse_args()
+        book_repo.refresh_if_stale()
+        since = args['since']
+        version = book_repo.dataset_version
+        changes = book_repo.get_changes(since) if since else None
+        if changes is None:
+            return {
+                'since': since,
+                'version': version,
+                'full_resync': True,
+                'message': 'Versão fora do histórico: recarregue /api/v1/books por completo'
+            }
+        return {
+            'since': since,
+            'version': version,
+            'full_resync': False,
+            'added': [book.to_dict() for book in changes['added']],
+            'modified': [book.to_dict() for book in changes['modified']],
+            'removed': [{'id': book.id, 'book_url': book.book_url} for book in changes['removed']]
+        }
+
 @ns_categories.route('')
 class CategoriesList(Resource):
     @ns_categories.doc('list_categories')
@@ -168,6 +247,30 @@ class HealthCheck(Resource):
                 'version': '1.0'
             }, 500
 
+@ns_health.route('/ready')
+class ReadinessCheck(Resource):
+    @ns_health.doc('readiness_check')
+    def get(self):
+        """Prontidão para receber tráfego: 503 até o warm-up terminar"""
+        state = warmup_state.to_dict()
+        if warmup_state.ready:
+            return {'status': 'ready', 'warmup': state}
+        return {'status': 'warming_up', 'warmup': state}, 503
+
+@ns_health.route('/cache')
+class CacheStats(Resource):
+    @ns_health.doc('cache_stats')
+    def get(self):
+        """Contadores do cache de consultas (hits, misses, evictions) e versão dos dados"""
+        shared_cache = book_repo.shared_cache
+        return {
+            'dataset_version': book_repo.dataset_version,
+            'query_cache': book_repo.cache.stats(),
+            'shared_cache': shared_cache.stats() if shared_cache is not None else None,
+            'singleflight': book_repo.singleflight.stats(),
+            'ml_prediction_cache': ml_prediction_cache.stats()
+        }
+
 # Rota raiz
 @app.route('/')
 def home():
@@ -7,13 +7,20 @@ from flask import request
 # from .auth import admin_required, token_required - removido
 import subprocess
 import os
+import re
+import sys
 import threading
 import time
 from datetime import datetime
 
+from .events import publish as publish_event
+
 # Namespace para scraping
 scraping_ns = Namespace('api/v1/scraping', description='Controle de web scraping')
 
+# Callbacks chamados após um scraping bem-sucedido (ex.: recarregar o repositório)
+scraping_listeners = []
+
 # Status global do scraping
 scraping_status = {
     'is_running': False,
@@ -22,36 +29,79 @@ scraping_status = {
     'total_books_scraped': 0
 }
 
+# Linhas de log do scraper usadas para publicar o progresso
+PAGE_PATTERN = re.compile(r'Coletados (\d+) livros da página (\d+)')
+TOTAL_PATTERN = re.compile(r'Total coletado até agora: (\d+) livros')
+
+SCRAPING_TIMEOUT = 600  # 10 minutos
+
+
+def parse_progress(line, progress):
+    """Atualiza `progress` a partir de uma linha do log; retorna True se mudou"""
+    match = PAGE_PATTERN.search(line)
+    if match:
+        progress['pages'] = int(match.group(2))
+        progress['last_page_books'] = int(match.group(1))
+        return True
+    match = TOTAL_PATTERN.search(line)
+    if match:
+        progress['books'] = int(match.group(1))
+        return True
+    return False
+
+
 def run_scraping_background():
     """Executa scraping em background"""
     global scraping_status
     
+    started = time.time()
+    progress = {'pages': 0, 'books': 0, 'last_page_books': 0}
     try:
         scraping_status['is_running'] = True
         scraping_status['last_run'] = datetime.now().isoformat()
+        publish_event('scrape.started', {'started_at': scraping_status['last_run']})
         
-        # Executa o script de scraping
+        # Executa o script de scraping, lendo o log linha a linha para publicar o progresso
         script_path = os.path.join(os.path.dirname(__file__), '..', 'run_scraper.py')
-        result = subprocess.run(
-            ['python', script_path],
-            capture_output=True,
+        process = subprocess.Popen(
+            [sys.executable, script_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
-            timeout=600  # 10 minutos timeout
+            bufsize=1
         )
+        timer = threading.Timer(SCRAPING_TIMEOUT, process.kill)
+        timer.start()
+        output_lines = []
+        try:
+            for line in process.stdout:
+                output_lines.append(line)
+                if parse_progress(line, progress):
+                    publish_event('scrape.progress', dict(progress))
+            returncode = process.wait()
+        finally:
+            timed_out = not timer.is_alive()
+            timer.cancel()
+        if timed_out:
+            raise subprocess.TimeoutExpired(script_path, SCRAPING_TIMEOUT)
         
-        if result.returncode == 0:
+        if returncode == 0:
             scraping_status['last_result'] = 'success'
             # Tenta extrair número de livros do output
-            output_lines = result.stdout.split('\n')
             for line in output_lines:
                 if 'Total de livros:' in line:
                     try:
-                        count = int(line.split(':')[1].strip())
+                        count = int(line.rsplit(':', 1)[1].strip())
                         scraping_status['total_books_scraped'] = count
                     except:
                         pass
+            for listener in scraping_listeners:
+                try:
+                    listener()
+                except Exception as e:
+                    print(f"Erro ao notificar fim do scraping: {e}")
         else:
-            scraping_status['last_result'] = f'error: {result.stderr}'
+            scraping_status['last_result'] = f"error: {''.join(output_lines[-20:])}"
             
     except subprocess.TimeoutExpired:
         scraping_status['last_result'] = 'timeout: Scraping demorou mais de 10 minutos'
@@ -59,6 +109,13 @@ def run_scraping_background():
         scraping_status['last_result'] = f'error: {str(e)}'
     finally:
         scraping_status['is_running'] = False
+        publish_event('scrape.finished', {
+            'result': 'success' if scraping_status['last_result'] == 'success' else 'error',
+            'message': scraping_status['last_result'],
+            'pages': progress['pages'],
+            'books': scraping_status['total_books_scraped'] or progress['books'],
+            'duration_seconds': round(time.time() - started, 2)
+        })
 
 @scraping_ns.route('/trigger')
 class ScrapingTrigger(Resource):
@@ -0,0 +1,267 @@
+"""
+Cache compartilhado entre os workers do gunicorn no mesmo host
+
+Usa um arquivo SQLite local (modo WAL), sem depender de serviços externos.
+É consultado depois do cache em memória de cada worker e antes de recalcular
+a consulta. Falhas de acesso (ex.: banco bloqueado) e valores ilegíveis são
+tratados como miss, para que o cache nunca atrase uma requisição.
+
+Os valores são gravados como JSON (nunca pickle: quem consegue escrever no
+arquivo não executa código no processo da API). O arquivo precisa ficar em um
+diretório privado do usuário da aplicação (padrão `<app>/run`, modo 0700);
+um diretório ou arquivo de outro usuário desativa o cache.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import stat
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Type
+
+from .cache import MISSING
+
+logger = logging.getLogger(__name__)
+
+# Diretório privado dos arquivos de estado da aplicação no host
+RUN_DIR = os.environ.get(
+    'RUN_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'run')
+)
+
+# Caminho do arquivo SQLite; vazio desativa o cache compartilhado
+SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH', '')
+SHARED_CACHE_MAX_ENTRIES = int(os.environ.get('SHARED_CACHE_MAX_ENTRIES', 10000))
+SHARED_CACHE_TTL = float(os.environ.get('SHARED_CACHE_TTL', 300))
+
+# Tempo máximo de espera por lock do SQLite (ms)
+BUSY_TIMEOUT_MS = 50
+
+# A cada N escritas remove entradas expiradas e excedentes
+PRUNE_EVERY = 100
+
+# Marca dos valores que o JSON não representa direto (tuplas, dicts com chaves
+# não-string, dataclasses registradas)
+TYPE_TAG = '$type'
+
+
+class UnsafeCachePath(PermissionError):
+    """Diretório ou arquivo do cache acessível a outros usuários"""
+
+
+def _trusted_owner(uid: int) -> bool:
+    # O próprio usuário ou root (ex.: diretório criado pelo master do gunicorn)
+    return uid in (os.geteuid(), 0)
+
+
+def ensure_private_dir(path: str) -> str:
+    """Cria o diretório com modo 0700; recusa um diretório de outro usuário ou gravável por outros"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or not _trusted_owner(info.st_uid):
+        raise UnsafeCachePath(f'{path} não pertence ao usuário da aplicação')
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise UnsafeCachePath(f'{path} pode ser alterado por outros usuários')
+    return path
+
+
+def check_private_file(path: str):
+    """Recusa um arquivo existente que não pertence ao usuário da aplicação"""
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISREG(info.st_mode) or not _trusted_owner(info.st_uid):
+        raise UnsafeCachePath(f'{path} não pertence ao usuário da aplicação')
+
+
+class _Codec:
+    """JSON com marcação para tuplas, dicts de chaves não-string e dataclasses"""
+
+    def __init__(self, types: Iterable[Type] = ()):
+        self.types = {cls.__name__: cls for cls in types}
+
+    def encode(self, value: Any) -> Any:
+        if value is None or isinstance(value, (str, int, float)):
+            return value
+        if isinstance(value, list):
+            return [self.encode(item) for item in value]
+        if isinstance(value, tuple):
+            return {TYPE_TAG: 'tuple', 'items': [self.encode(item) for item in value]}
+        if isinstance(value, dict):
+            if TYPE_TAG not in value and all(isinstance(key, str) for key in value):
+                return {key: self.encode(item) for key, item in value.items()}
+            return {TYPE_TAG: 'dict', 'items': [[self.encode(k), self.encode(v)] for k, v in value.items()]}
+        name = type(value).__name__
+        if self.types.get(name) is type(value):
+            return {TYPE_TAG: name, 'fields': {
+                field.name: self.encode(getattr(value, field.name)) for field in dataclasses.fields(value)
+            }}
+        raise TypeError(f'Tipo não suportado no cache compartilhado: {name}')
+
+    def _decode_object(self, obj: Dict[str, Any]) -> Any:
+        kind = obj.get(TYPE_TAG)
+        if kind is None:
+            return obj
+        if kind == 'tuple':
+            return tuple(obj['items'])
+        if kind == 'dict':
+            return {key: item for key, item in obj['items']}
+        return self.types[kind](**obj['fields'])
+
+    def dumps(self, value: Any) -> str:
+        return json.dumps(self.encode(value), separators=(',', ':'))
+
+    def loads(self, data: str) -> Any:
+        return json.loads(data, object_hook=self._decode_object)
+
+
+class SharedCache:
+    """Cache chave/valor compartilhado entre processos via SQLite"""
+
+    def __init__(self, path: str, max_entries: int = SHARED_CACHE_MAX_ENTRIES,
+                 ttl: float = SHARED_CACHE_TTL, types: Iterable[Type] = ()):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Dataclasses que podem aparecer nos valores (ex.: Book)
+        self._codec = _Codec(types)
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        # Callback opcional chamado com 'hit', 'miss' ou 'error' (ex.: métricas)
+        self.listener: Optional[Callable[[str], None]] = None
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual (recriada após fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        ensure_private_dir(os.path.dirname(os.path.abspath(self.path)))
+        for suffix in ('', '-wal', '-shm'):
+            check_private_file(self.path + suffix)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000.0,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY,'
+            ' version TEXT NOT NULL,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _hash_key(key: Hashable) -> str:
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def get(self, key: Hashable, version: str) -> Any:
+        """Retorna o valor armazenado para a chave e versão, ou MISSING"""
+        try:
+            row = self._connect().execute(
+                'SELECT value FROM entries WHERE key = ? AND version = ? AND expires_at > ?',
+                (self._hash_key(key), version, time.time())
+            ).fetchone()
+            value = MISSING if row is None else self._codec.loads(row[0])
+        except (sqlite3.Error, UnsafeCachePath) as e:
+            self.errors += 1
+            logger.debug(f"Cache compartilhado indisponível: {e}")
+            self._notify('error')
+            return MISSING
+        except (ValueError, TypeError, KeyError) as e:
+            # Entrada corrompida (ou de um formato antigo): recalcula
+            self.errors += 1
+            logger.debug(f"Entrada ilegível no cache compartilhado: {e}")
+            self._notify('error')
+            value = MISSING
+
+        if value is MISSING:
+            self.misses += 1
+            self._notify('miss')
+            return MISSING
+        self.hits += 1
+        self._notify('hit')
+        return value
+
+    def _notify(self, event: str):
+        if self.listener is not None:
+            self.listener(event)
+
+    def set(self, key: Hashable, version: str, value: Any):
+        """Armazena um valor associado à versão dos dados"""
+        try:
+            data = self._codec.dumps(value)
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, version, value, expires_at) VALUES (?, ?, ?, ?)',
+                (self._hash_key(key), version, data, time.time() + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune(conn)
+        except (sqlite3.Error, UnsafeCachePath, TypeError, ValueError) as e:
+            self.errors += 1
+            logger.debug(f"Falha ao gravar no cache compartilhado: {e}")
+
+    def _prune(self, conn: sqlite3.Connection):
+        """Remove entradas expiradas e as mais antigas acima do limite"""
+        conn.execute('DELETE FROM entries WHERE expires_at <= ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM entries WHERE key IN ('
+            ' SELECT key FROM entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def invalidate(self, keep_version: Optional[str] = None):
+        """Remove entradas de versões diferentes de `keep_version` (ou todas)"""
+        try:
+            conn = self._connect()
+            if keep_version is None:
+                conn.execute('DELETE FROM entries')
+            else:
+                conn.execute('DELETE FROM entries WHERE version != ?', (keep_version,))
+        except (sqlite3.Error, UnsafeCachePath) as e:
+            self.errors += 1
+            logger.debug(f"Falha ao invalidar cache compartilhado: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna contadores do cache (deste processo) e total de entradas"""
+        try:
+            size = self._connect().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        except (sqlite3.Error, UnsafeCachePath):
+            size = None
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'size': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_shared_cache(path: str = None, types: Iterable[Type] = ()) -> Optional[SharedCache]:
+    """Cria o cache compartilhado se configurado; None caso contrário"""
+    path = SHARED_CACHE_PATH if path is None else path
+    if not path:
+        return None
+    try:
+        return SharedCache(path, types=types)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Cache compartilhado desativado: {e}")
+        return None
@@ -0,0 +1,81 @@
+"""
+Coalescência de requisições (single-flight)
+
+Quando várias threads pedem o mesmo cálculo caro ao mesmo tempo (cache
+expirado, recarga após scraping), só a primeira calcula; as demais esperam e
+recebem o mesmo resultado (ou a mesma exceção). Vale entre as threads de um
+processo, como nos workers gthread e no pool de threads do modo ASGI.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """Cálculo em andamento para uma chave"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Executa no máximo um cálculo por chave de cada vez"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+        # Callback opcional chamado com 'leader' ou 'shared' (ex.: métricas)
+        self.listener: Optional[Callable[[str], None]] = None
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Executa `func` ou aguarda o cálculo já em andamento para `key`"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+
+        if self.listener is not None:
+            self.listener('leader' if leader else 'shared')
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna contadores de coalescência"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'shared': self.shared,
+            }
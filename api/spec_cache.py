@@ -0,0 +1,104 @@
+"""
+Spec Swagger/OpenAPI pré-serializado
+
+O flask_restx já guarda o dicionário do spec por processo, mas serializa o
+JSON inteiro a cada GET /swagger.json. Aqui o spec é serializado uma única vez
+(no warm-up ou na primeira requisição) e servido como bytes com ETag, de forma
+que consultas repetidas do gateway recebem 304 sem corpo.
+
+`write_static_docs` exporta o spec e a página do Swagger UI para arquivos
+estáticos, que o nginx pode servir sem passar pela aplicação.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Optional, Tuple
+
+# Validade do spec em cache nos clientes (segundos); ETag revalida depois
+SWAGGER_CACHE_MAX_AGE = int(os.environ.get('SWAGGER_CACHE_MAX_AGE', 300))
+
+# Endpoint registrado pelo flask_restx para /swagger.json
+SPECS_ENDPOINT = 'specs'
+
+
+class SpecCache:
+    """Spec serializado uma vez por processo, com ETag"""
+
+    def __init__(self, api):
+        self.api = api
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Tuple[bytes, str]:
+        """Retorna (corpo JSON, etag); requer contexto de aplicação/requisição"""
+        if self._body is None:
+            with self._lock:
+                if self._body is None:
+                    schema = self.api.__schema__
+                    if 'error' in schema:
+                        # Não guarda falhas: a próxima requisição tenta de novo
+                        raise RuntimeError(schema['error'])
+                    # Mesmo formato da serialização do flask_restx
+                    body = (json.dumps(schema) + '\n').encode('utf-8')
+                    self._etag = hashlib.sha1(body).hexdigest()
+                    self._body = body
+        return self._body, self._etag
+
+    def clear(self):
+        with self._lock:
+            self._body = None
+            self._etag = None
+
+
+def init_spec_cache(app, api) -> SpecCache:
+    """Substitui a view de /swagger.json por uma que serve o spec em cache"""
+    from flask import Response, request
+
+    spec_cache = SpecCache(api)
+    original_view = app.view_functions[SPECS_ENDPOINT]
+
+    def specs():
+        try:
+            body, etag = spec_cache.get()
+        except RuntimeError:
+            return original_view()
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = SWAGGER_CACHE_MAX_AGE
+        return response.make_conditional(request)
+
+    app.view_functions[SPECS_ENDPOINT] = specs
+    return spec_cache
+
+
+def write_static_docs(app, api, output_dir: str, spec_cache: SpecCache = None) -> str:
+    """Grava swagger.json, docs.html e os assets do Swagger UI em `output_dir`
+
+    Os caminhos no HTML são absolutos (/swagger.json, /swaggerui/...), então o
+    diretório deve ser servido na raiz do mesmo host da API.
+    """
+    import flask_restx
+
+    spec_cache = spec_cache or SpecCache(api)
+    os.makedirs(output_dir, exist_ok=True)
+    with app.test_request_context('/'):
+        body, _ = spec_cache.get()
+        html = api.render_doc()
+
+    with open(os.path.join(output_dir, 'swagger.json'), 'wb') as f:
+        f.write(body)
+    with open(os.path.join(output_dir, 'docs.html'), 'w', encoding='utf-8') as f:
+        f.write(html)
+
+    assets_dir = os.path.join(output_dir, 'swaggerui')
+    shutil.rmtree(assets_dir, ignore_errors=True)
+    shutil.copytree(
+        os.path.join(os.path.dirname(flask_restx.__file__), 'static'), assets_dir,
+        ignore=shutil.ignore_patterns('*.map'),
+    )
+    return output_dir
@@ -0,0 +1,361 @@
+"""
+Jobs de treino em segundo plano
+
+`POST /ml/train` não treina mais dentro da requisição (um Random Forest de 100
+árvores passa fácil do `timeout` dos workers sync): o treino vira um job em um
+pool de processos e a rota responde na hora com o ID do job.
+
+O estado de cada job fica em um arquivo JSON em `TRAINING_JOBS_DIR` (padrão
+`MODEL_REGISTRY_DIR/jobs`), gravado de forma atômica, então qualquer worker
+responde `/ml/jobs/<id>`, inclusive depois de restarts:
+
+    queued -> running (preparing, training, evaluating, publishing) -> succeeded | failed
+
+O processo do job salva o modelo no registro e troca o ponteiro ACTIVE
+(publicação atômica); os workers adotam a nova versão pelo `ActiveModelWatcher`.
+
+Cada job guarda o pid do worker que o enfileirou (`owner_pid`) e, ao começar, o
+do processo de treino (`pid`). Se o worker é reciclado (`max_requests`) ou
+encerrado com o job pendente, o processo dono some sem gravar o status final: a
+próxima leitura do job marca `failed` com `progress.stage = 'interrupted'`. No
+`worker_exit` do gunicorn, `training_queue.abort()` cancela a fila e termina o
+treino em andamento, para o join do pool não segurar o worker além do
+`graceful_timeout`.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from .model_registry import MODEL_REGISTRY_DIR, ModelRegistry, write_atomic
+
+logger = logging.getLogger(__name__)
+
+TRAINING_JOBS_DIR = os.environ.get('TRAINING_JOBS_DIR', os.path.join(MODEL_REGISTRY_DIR, 'jobs'))
+# Processos de treino por worker da API
+TRAINING_WORKERS = int(os.environ.get('TRAINING_WORKERS', 1))
+# Jobs na fila ou rodando por worker; acima disso /ml/train responde 503
+TRAINING_MAX_PENDING = int(os.environ.get('TRAINING_MAX_PENDING', 4))
+# Arquivos de status mantidos em disco
+TRAINING_JOBS_KEEP = int(os.environ.get('TRAINING_JOBS_KEEP', 100))
+# spawn: o processo de treino não herda threads nem locks do worker
+TRAINING_MP_CONTEXT = os.environ.get('TRAINING_MP_CONTEXT', 'spawn')
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+FINISHED_STATUSES = ('succeeded', 'failed')
+INTERRUPTED_ERROR = 'Job interrompido: o processo dono encerrou antes do fim'
+
+
+class JobNotFound(KeyError):
+    """Job inexistente"""
+
+
+class TrainingQueueFull(RuntimeError):
+    """Limite de jobs pendentes atingido (503)"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    """Sem pid gravado (jobs antigos) o processo conta como vivo"""
+    if not pid:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def training_metadata(pipeline, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadados da versão do modelo salva no registro"""
+    return {
+        'model_type': result.get('model_type'),
+        'target_column': result.get('target_column'),
+        'metrics': result.get('metrics', {}),
+        'feature_importance': result.get('feature_importance', {}),
+        'feature_names': pipeline.feature_names,
+        'features': pipeline.transformer.to_dict(),
+        'dataset_version': pipeline.dataset_version,
+        'training_samples': result.get('training_samples'),
+        'test_samples': result.get('test_samples'),
+        'timings': result.get('timings', {}),
+    }
+
+
+class TrainingJobStore:
+    """Estado dos jobs, um arquivo JSON por job"""
+
+    def __init__(self, root: str = TRAINING_JOBS_DIR, keep: int = TRAINING_JOBS_KEEP):
+        self.root = root
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _job_path(self, job_id: str) -> str:
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            raise JobNotFound(job_id)
+        return os.path.join(self.root, f'{job_id}.json')
+
+    def create(self, target: str) -> Dict[str, Any]:
+        os.makedirs(self.root, exist_ok=True)
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': 'queued',
+            'target': target,
+            'progress': {'stage': 'queued'},
+            'submitted_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'timings': {},
+            'metrics': None,
+            'model_version': None,
+            'error': None,
+            'owner_pid': os.getpid(),
+            'pid': None,
+        }
+        write_atomic(self._job_path(job['job_id']), json.dumps(job))
+        self.prune()
+        return job
+
+    def _read(self, job_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._job_path(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            raise JobNotFound(job_id)
+
+    @staticmethod
+    def _orphaned(job: Dict[str, Any]) -> bool:
+        """Job pendente cujo processo responsável já morreu
+
+        Na fila, quem responde é o worker dono do pool; rodando, o processo de
+        treino (que grava o status final mesmo se o worker sair antes).
+        """
+        if job['status'] == 'queued':
+            return not _pid_alive(job.get('owner_pid'))
+        if job['status'] == 'running':
+            return not _pid_alive(job.get('pid') or job.get('owner_pid'))
+        return False
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        job = self._read(job_id)
+        if not self._orphaned(job):
+            return job
+        with self._lock:
+            # Relê sob o lock: o processo de treino pode ter gravado o fim
+            job = self._read(job_id)
+            if self._orphaned(job):
+                pid = job.get('pid') or job.get('owner_pid')
+                logger.warning(f"Job de treino {job_id} interrompido: processo {pid} encerrado")
+                job.update(status='failed', error=INTERRUPTED_ERROR, finished_at=_now(),
+                           progress={**job.get('progress', {}), 'stage': 'interrupted'})
+                write_atomic(self._job_path(job_id), json.dumps(job, default=float))
+        return job
+
+    def update(self, job_id: str, **fields) -> Dict[str, Any]:
+        # Só um processo escreve em cada job por vez (o do treino, ou o worker
+        # quando o processo morre); o lock cobre as threads do mesmo processo
+        with self._lock:
+            job = self._read(job_id)
+            job.update(fields)
+            write_atomic(self._job_path(job_id), json.dumps(job, default=float))
+        return job
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Jobs mais recentes primeiro"""
+        if not os.path.isdir(self.root):
+            return []
+        jobs = []
+        for name in os.listdir(self.root):
+            if name.endswith('.json'):
+                try:
+                    jobs.append(self.get(name[:-5]))
+                except JobNotFound:
+                    continue
+        jobs.sort(key=lambda job: job.get('submitted_at', ''), reverse=True)
+        return jobs[:limit]
+
+    def prune(self):
+        """Remove os arquivos de jobs já finalizados além de `keep`"""
+        jobs = self.list_jobs(limit=len(os.listdir(self.root)))
+        for job in jobs[self.keep:]:
+            if job['status'] in FINISHED_STATUSES:
+                try:
+                    os.unlink(self._job_path(job['job_id']))
+                except FileNotFoundError:
+                    pass
+
+
+def run_training_job(job_id: str, target: str, data_path: Optional[str],
+                     jobs_dir: str, registry_dir: str) -> Dict[str, Any]:
+    """Executa um job no processo do pool: treina, publica no registro e grava o status"""
+    from .ml_pipeline import MLPipeline
+    from .models import BookRepository
+
+    store = TrainingJobStore(jobs_dir)
+    started = time.perf_counter()
+    job = store.get(job_id)
+    if job['status'] in FINISHED_STATUSES:
+        # Já dado como interrompido (o worker dono saiu com o job na fila)
+        return job
+    submitted = datetime.fromisoformat(job['submitted_at'])
+    timings = {'queued_seconds': round((datetime.now(timezone.utc) - submitted).total_seconds(), 4)}
+    store.update(job_id, status='running', pid=os.getpid(), started_at=_now(), timings=timings,
+                 progress={'stage': 'loading'})
+
+    def report(stage, **info):
+        progress = {'stage': stage, **info}
+        if 'trees_total' in info:
+            progress['percent'] = round(100 * info['trees_built'] / info['trees_total'], 1)
+        store.update(job_id, progress=progress)
+
+    try:
+        repository = BookRepository(data_path)
+        pipeline = MLPipeline(
+            [book.to_dict() for book in repository.get_all_books()],
+            repository.dataset_version
+        )
+        result = pipeline.train_model(target, progress=report)
+        if 'error' in result:
+            return store.update(job_id, status='failed', error=result['error'], finished_at=_now())
+        timings.update(result['timings'])
+
+        report('publishing')
+        publish_started = time.perf_counter()
+        metadata = ModelRegistry(registry_dir).save(
+            pipeline.export_artifacts(), training_metadata(pipeline, result)
+        )
+        timings['publish_seconds'] = round(time.perf_counter() - publish_started, 4)
+        timings['total_seconds'] = round(time.perf_counter() - started, 4)
+        return store.update(
+            job_id,
+            status='succeeded',
+            progress={'stage': 'done', 'percent': 100.0},
+            finished_at=_now(),
+            timings=timings,
+            metrics=result['metrics'],
+            model_type=result['model_type'],
+            dataset_version=pipeline.dataset_version,
+            model_version=metadata['version'],
+        )
+    except Exception as e:
+        logger.error(f"Erro no job de treino {job_id}: {e}")
+        return store.update(job_id, status='failed', error=f'Erro ao treinar modelo: {str(e)}',
+                            finished_at=_now())
+
+
+class TrainingJobQueue:
+    """Fila de treino do worker, sobre um ProcessPoolExecutor criado sob demanda
+
+    Um novo pedido para um target que já tem job na fila ou rodando neste
+    worker recebe o mesmo job. Ao fim de cada job, `listener(job)` é chamado
+    (em uma thread do executor).
+    """
+
+    def __init__(self, store: TrainingJobStore = None, registry_dir: str = MODEL_REGISTRY_DIR,
+                 max_workers: int = TRAINING_WORKERS, max_pending: int = TRAINING_MAX_PENDING,
+                 mp_context: str = TRAINING_MP_CONTEXT):
+        self.store = store or TrainingJobStore()
+        self.registry_dir = registry_dir
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.mp_context = mp_context
+        self.listener: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._executor = None
+        self._executor_pid = None
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Não atravessa fork: com preload_app cada worker cria o seu pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.mp_context)
+            )
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def submit(self, target: str, data_path: Optional[str] = None) -> Dict[str, Any]:
+        """Enfileira o treino de `target`; retorna o registro do job"""
+        with self._lock:
+            job_id = self._pending.get(target)
+            if job_id is not None:
+                return self.store.get(job_id)
+            if len(self._pending) >= self.max_pending:
+                raise TrainingQueueFull(f'Limite de {self.max_pending} treinos pendentes atingido')
+
+            job = self.store.create(target)
+            args = (job['job_id'], target, data_path, self.store.root, self.registry_dir)
+            try:
+                future = self._get_executor().submit(run_training_job, *args)
+            except BrokenProcessPool:
+                # Um processo do pool morreu (ex.: OOM): recria o pool uma vez
+                self._executor = None
+                future = self._get_executor().submit(run_training_job, *args)
+            self._pending[target] = job['job_id']
+
+        future.add_done_callback(lambda future: self._finished(job['job_id'], target, future))
+        return job
+
+    def _finished(self, job_id: str, target: str, future):
+        with self._lock:
+            self._pending.pop(target, None)
+        try:
+            job = future.result()
+        except Exception as e:
+            # O processo morreu antes de gravar o status final
+            logger.error(f"Job de treino {job_id} interrompido: {e}")
+            job = self.store.update(job_id, status='failed', error=f'Job interrompido: {str(e)}',
+                                    finished_at=_now())
+        if self.listener is not None:
+            try:
+                self.listener(job)
+            except Exception as e:
+                logger.warning(f"Falha no listener do job {job_id}: {e}")
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        self._executor = None
+
+    def abort(self):
+        """Encerra o pool sem esperar (worker_exit do gunicorn)
+
+        Cancela os jobs na fila e termina os processos de treino: sem isso o
+        join do pool na saída do interpretador espera o treino acabar. Os jobs
+        cortados aparecem como interrompidos (`failed`) na próxima leitura.
+        """
+        executor = self._executor
+        if executor is None or self._executor_pid != os.getpid():
+            self._executor = None
+            return
+        # O executor não expõe os processos; _processes é estável desde o 3.x
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(timeout=5)
+        self._executor = None
+
+
+training_queue = TrainingJobQueue()
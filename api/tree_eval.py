@@ -0,0 +1,160 @@
+"""
+Avaliação compacta do Random Forest a partir de tabelas de nós planas
+
+O `RandomForestRegressor.predict` do scikit-learn tem um custo fixo alto por
+chamada (validação, joblib, um objeto Python por árvore), que domina a
+predição de uma ou poucas linhas. O `FlatForest` guarda todas as árvores em
+cinco arrays NumPy contíguos (um nó por posição) e avalia as linhas de todas
+as árvores ao mesmo tempo, um nível da árvore por iteração (só os cursores
+que ainda não chegaram a uma folha seguem):
+
+    left, right   filhos de cada nó (folhas apontam para si mesmas)
+    feature       índice da feature testada no nó
+    threshold     limiar do teste `x[feature] <= threshold`
+    value         valor da folha
+
+As entradas passam por float32, como no scikit-learn, e a média soma as
+árvores na mesma ordem do `RandomForestRegressor.predict`: o resultado é
+idêntico ao dele. Os arrays podem ser salvos como arquivos .npy e abertos com
+`mmap_mode='r'`.
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+ARRAYS = ('left', 'right', 'feature', 'threshold', 'value', 'roots')
+META_FILE = 'forest.json'
+
+
+class FlatForest:
+    """Forest de regressão em tabelas de nós planas"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], n_features: int, max_depth: int):
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        # Índice do nó raiz de cada árvore
+        self.roots = arrays['roots']
+        self.n_features = n_features
+        self.max_depth = max_depth
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.left)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    @classmethod
+    def from_sklearn(cls, model) -> 'FlatForest':
+        """Converte um RandomForestRegressor (uma saída) ajustado"""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError('Apenas forests de regressão com uma saída')
+        counts = np.array([tree.node_count for tree in trees], dtype=np.int64)
+        roots = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int32)
+        n_nodes = int(counts.sum())
+        if n_nodes >= np.iinfo(np.int32).max:
+            raise ValueError('Forest grande demais para índices de 32 bits')
+
+        left = np.empty(n_nodes, dtype=np.int32)
+        right = np.empty(n_nodes, dtype=np.int32)
+        feature = np.empty(n_nodes, dtype=np.int32)
+        threshold = np.empty(n_nodes, dtype=np.float64)
+        value = np.empty(n_nodes, dtype=np.float64)
+        for tree, start, count in zip(trees, roots.tolist(), counts.tolist()):
+            nodes = slice(start, start + count)
+            own = np.arange(start, start + count, dtype=np.int32)
+            leaf = tree.children_left == -1
+            # Folhas apontam para si mesmas: a travessia fica parada nelas
+            left[nodes] = np.where(leaf, own, tree.children_left + start)
+            right[nodes] = np.where(leaf, own, tree.children_right + start)
+            feature[nodes] = np.where(leaf, 0, tree.feature)
+            threshold[nodes] = tree.threshold
+            value[nodes] = tree.value[:, 0, 0]
+
+        arrays = {'left': left, 'right': right, 'feature': feature,
+                  'threshold': threshold, 'value': value, 'roots': roots}
+        return cls(arrays, int(model.n_features_in_), max(tree.max_depth for tree in trees))
+
+    def tree_predictions(self, X: np.ndarray) -> np.ndarray:
+        """Saída de cada árvore para cada linha: matriz (árvores x linhas)"""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f'Esperadas {self.n_features} features, recebidas {X.shape[-1]}')
+        # Mesma precisão das árvores do scikit-learn: float32 comparado ao limiar float64
+        X = X.astype(np.float32).astype(np.float64)
+        n_rows = X.shape[0]
+
+        # Um cursor por (árvore, linha); cada iteração desce um nível e só os
+        # cursores que ainda não chegaram a uma folha seguem para a próxima
+        nodes = np.repeat(self.roots.astype(np.intp), n_rows)
+        offsets = np.tile(np.arange(n_rows) * self.n_features, self.n_trees)
+        flat_X = X.ravel()
+        active = np.arange(len(nodes))
+        current = nodes
+        for _ in range(self.max_depth):
+            go_left = flat_X[offsets + self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            internal = self.left[current] != current
+            if not internal.any():
+                break
+            active = active[internal]
+            current = current[internal]
+            offsets = offsets[internal]
+        return self.value[nodes].reshape(self.n_trees, n_rows)
+
+    def predict(self, X: np.ndarray, return_std: bool = False, chunk_rows: Optional[int] = None):
+        """Média das árvores (e o desvio padrão entre elas, com `return_std`)
+
+        Com `chunk_rows`, as linhas são avaliadas em blocos: a memória de
+        trabalho (árvores x linhas) fica limitada ao tamanho do bloco.
+        """
+        X = np.asarray(X)
+        if chunk_rows and len(X) > chunk_rows:
+            parts = [self.predict(X[start:start + chunk_rows], return_std=True)
+                     for start in range(0, len(X), chunk_rows)]
+            mean = np.concatenate([part[0] for part in parts])
+            if return_std:
+                return mean, np.concatenate([part[1] for part in parts])
+            return mean
+        per_tree = self.tree_predictions(X)
+        # Soma sequencial na ordem das árvores, como o RandomForestRegressor
+        mean = per_tree[0].copy()
+        for row in per_tree[1:]:
+            mean += row
+        mean /= self.n_trees
+        if return_std:
+            return mean, per_tree.std(axis=0)
+        return mean
+
+    def save(self, directory: str):
+        """Grava um .npy por array e os metadados em forest.json"""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'n_features': self.n_features, 'max_depth': self.max_depth,
+                       'n_trees': self.n_trees, 'n_nodes': self.n_nodes}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> 'FlatForest':
+        """Abre um forest salvo; com `mmap_mode='r'` os arrays ficam mapeados do disco"""
+        with open(os.path.join(directory, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in ARRAYS
+        }
+        return cls(arrays, meta['n_features'], meta['max_depth'])
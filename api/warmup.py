@@ -0,0 +1,156 @@
+"""
+Aquecimento (warm-up) da aplicação antes de receber tráfego
+
+Constrói de antemão o que as primeiras requisições pagariam: índices do
+repositório, cache das consultas de leitura, pipeline de ML (importando
+pandas/scikit-learn) e o spec Swagger. Modos (`WARMUP_MODE`):
+
+- off: nada é pré-construído; a aplicação é considerada pronta no boot
+- master: roda de forma síncrona no master do gunicorn (hook `when_ready`,
+  com `preload_app`), antes do fork; os workers herdam tudo já pronto
+- worker: roda em uma thread de fundo em cada worker (hook
+  `post_worker_init`); `/api/v1/health/ready` responde 503 até terminar
+
+Falhas em uma etapa são registradas e não impedem as demais.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODE = os.environ.get('WARMUP_MODE', 'off').lower()
+WARMUP_STEPS = [
+    step.strip()
+    for step in os.environ.get('WARMUP_STEPS', 'repository,query_cache,ml_pipeline,swagger').split(',')
+    if step.strip()
+]
+
+
+class WarmupState:
+    """Progresso do warm-up deste processo"""
+
+    def __init__(self, mode: str = WARMUP_MODE):
+        self.mode = mode
+        # pending -> running -> ready; com o modo off já nasce pronto
+        self.status = 'ready' if mode == 'off' else 'pending'
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == 'ready'
+
+    def start(self):
+        with self._lock:
+            self.status = 'running'
+            self.started_at = time.time()
+            self.finished_at = None
+            self.steps = {}
+
+    def record(self, step: str, duration: float, error: Optional[str] = None):
+        with self._lock:
+            self.steps[step] = {
+                'status': 'failed' if error else 'done',
+                'duration_ms': round(duration * 1000.0, 2),
+                'error': error,
+            }
+
+    def finish(self):
+        with self._lock:
+            self.status = 'ready'
+            self.finished_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            duration = None
+            if self.started_at is not None and self.finished_at is not None:
+                duration = round((self.finished_at - self.started_at) * 1000.0, 2)
+            return {
+                'mode': self.mode,
+                'status': self.status,
+                'pid': os.getpid(),
+                'steps': dict(self.steps),
+                'duration_ms': duration,
+            }
+
+
+warmup_state = WarmupState()
+
+
+def warm_repository():
+    """Índices do repositório (ex.: livro por ID)"""
+    from .routes import book_repo
+    book_repo.build_indexes()
+
+
+def warm_query_cache():
+    """Resultados das consultas de leitura sem parâmetros, como as rotas chamam"""
+    from .routes import book_repo
+    book_repo.get_all_categories()
+    book_repo.get_stats_overview()
+    book_repo.get_stats_by_categories()
+    book_repo.get_top_rated_books(limit=20)
+    book_repo.search_books(title=None, category=None)
+    book_repo.get_books_by_price_range(min_price=None, max_price=None)
+
+
+def warm_ml_pipeline():
+    """Importa a stack de ML e monta o pipeline"""
+    from .ml_routes import get_ml_pipeline
+    get_ml_pipeline()
+
+
+def warm_swagger():
+    """Gera e serializa o spec Swagger servido em /swagger.json"""
+    from .routes import app, spec_cache
+    with app.test_request_context('/'):
+        spec_cache.get()
+
+
+STEPS: Dict[str, Callable[[], None]] = {
+    'repository': warm_repository,
+    'query_cache': warm_query_cache,
+    'ml_pipeline': warm_ml_pipeline,
+    'swagger': warm_swagger,
+}
+
+
+def run_warmup(steps: List[str] = None, state: WarmupState = None) -> WarmupState:
+    """Executa as etapas de warm-up em sequência"""
+    state = state or warmup_state
+    steps = WARMUP_STEPS if steps is None else steps
+    state.start()
+    for step in steps:
+        func = STEPS.get(step)
+        start = time.perf_counter()
+        if func is None:
+            state.record(step, 0.0, 'etapa desconhecida')
+            logger.warning(f"Etapa de warm-up desconhecida: {step}")
+            continue
+        try:
+            func()
+        except Exception as e:
+            state.record(step, time.perf_counter() - start, str(e))
+            logger.warning(f"Falha no warm-up ({step}): {e}")
+        else:
+            state.record(step, time.perf_counter() - start)
+    state.finish()
+    logger.info(f"Warm-up concluído: {state.to_dict()}")
+    return state
+
+
+def start_warmup(steps: List[str] = None, state: WarmupState = None) -> threading.Thread:
+    """Executa o warm-up em uma thread de fundo"""
+    state = state or warmup_state
+    # Marca como não pronto antes de a thread começar
+    state.start()
+    thread = threading.Thread(target=run_warmup, args=(steps, state),
+                              name='warmup', daemon=True)
+    thread.start()
+    return thread
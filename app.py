@@ -15,6 +15,8 @@ os.environ.setdefault('PORT', '5005')
 
 # Importa a aplicação Flask
 from api.routes import app
+from api.ml_routes import ML_WARMUP, start_ml_warmup
+from api.warmup import WARMUP_MODE, start_warmup
 
 # For Vercel compatibility
 handler = app
@@ -31,5 +33,10 @@ if __name__ == '__main__':
     print(f"🐛 Debug: {debug}")
     print(f"📖 Documentação: http://{host if host != '0.0.0.0' else 'localhost'}:{port}/api/docs")
     
+    if WARMUP_MODE != 'off':
+        start_warmup()
+    elif ML_WARMUP:
+        start_ml_warmup()
+    
     # Inicia a aplicação
     app.run(host=host, port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for production deployment
+Serves the same routes as wsgi.py with an async request path
+"""
+
+import os
+
+# Set production environment
+os.environ.setdefault('FLASK_ENV', 'production')
+os.environ.setdefault('FLASK_DEBUG', 'False')
+os.environ.setdefault('API_HOST', '0.0.0.0')
+os.environ.setdefault('PORT', '5005')
+
+from api.asgi_app import create_asgi_app
+
+application = create_asgi_app()
+
+# Alias seguindo a convenção de wsgi.py
+app = application
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        application,
+        host=os.environ.get('API_HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 5005)),
+    )
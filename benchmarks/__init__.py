@@ -0,0 +1 @@
+# Benchmarks da Books API
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: deploy sync (wsgi.py) vs ASGI (asgi.py + UvicornWorker)
+
+Sobe cada modo com o gunicorn local e mede throughput e latência (p50/p99)
+nas rotas de leitura com muitas conexões concorrentes.
+
+Uso:
+    python -m benchmarks.asgi_vs_wsgi --connections 50 200 500 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+
+from benchmarks.http_load import free_port, run_load, start_gunicorn, stop_process
+
+READ_TARGETS = [
+    ('GET', '/api/v1/health', None),
+    ('GET', '/api/v1/books/1', None),
+    ('GET', '/api/v1/books/search?title=the', None),
+    ('GET', '/api/v1/books/price-range?min=10&max=30', None),
+    ('GET', '/api/v1/categories', None),
+    ('GET', '/api/v1/stats/overview', None),
+    ('GET', '/api/v1/books/top-rated', None),
+]
+
+MODES = {
+    'sync': {
+        'app': 'wsgi:app',
+        'worker_class': 'sync',
+        'workers': multiprocessing.cpu_count() * 2 + 1,
+    },
+    'asgi': {
+        'app': 'asgi:application',
+        'worker_class': 'uvicorn.workers.UvicornWorker',
+        'workers': multiprocessing.cpu_count(),
+    },
+}
+
+
+def run_mode(mode: str, connections_list, duration: float, admission_control: bool = False):
+    """Executa o benchmark para um modo de deploy"""
+    config = MODES[mode]
+    port = free_port()
+    # Como no load_test: sem o controle de admissão, respostas 503 rápidas
+    # inflariam o throughput do modo que descarta mais
+    env = {} if admission_control else {'ADMISSION_CONTROL': 'false'}
+    process = start_gunicorn(config['app'], port, config['workers'], config['worker_class'], env=env)
+    results = {}
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        # Aquecimento
+        asyncio.run(run_load(base_url, READ_TARGETS, 4, 1.0))
+        for connections in connections_list:
+            result = asyncio.run(run_load(base_url, READ_TARGETS, connections, duration))
+            results[connections] = result.to_dict()
+    finally:
+        stop_process(process)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--connections', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--admission-control', action='store_true',
+                        help='Mantém o controle de admissão ligado (mede o deploy como está)')
+    parser.add_argument('--output', help='Arquivo JSON para salvar os resultados')
+    args = parser.parse_args()
+
+    report = {mode: run_mode(mode, args.connections, args.duration, args.admission_control)
+              for mode in args.modes}
+
+    print(f"{'modo':<6} {'conexões':>9} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'erros':>7}")
+    for mode, results in report.items():
+        for connections, stats in results.items():
+            print(f"{mode:<6} {connections:>9} {stats['throughput_rps']:>10.1f} "
+                  f"{stats['p50_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['errors']:>7}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Fixtures dos micro-benchmarks: CSVs sintéticos em vários tamanhos
+"""
+
+import csv
+import os
+import random
+
+import pytest
+
+from api.cache import QueryCache
+from api.models import BookRepository
+
+# Tamanhos de coleção medidos (sobrescreva com BENCH_SIZES=100,1000)
+BENCH_SIZES = [int(size) for size in os.environ.get('BENCH_SIZES', '100,1000,10000').split(',')]
+
+CATEGORIES = [
+    'Fiction', 'Non-Fiction', 'Science', 'History', 'Poetry', 'Mystery', 'Romance',
+    'Fantasy', 'Travel', 'Music', 'Philosophy', 'Horror', 'Humor', 'Biography',
+    'Business', 'Classics', 'Childrens', 'Religion', 'Sports', 'Art',
+]
+WORDS = [
+    'the', 'light', 'attic', 'velvet', 'soumission', 'sharp', 'objects', 'sapiens',
+    'requiem', 'red', 'dead', 'secret', 'garden', 'house', 'night', 'river', 'star',
+    'shadow', 'city', 'love', 'war', 'king', 'queen', 'song', 'dream', 'black',
+]
+FIELDS = ['id', 'title', 'price', 'rating', 'availability', 'category', 'image_url', 'book_url']
+
+
+def write_books_csv(path: str, size: int, seed: int = 42):
+    """Gera um CSV no formato de data/books_data.csv com `size` livros"""
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for book_id in range(1, size + 1):
+            writer.writerow([
+                book_id,
+                ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))).title(),
+                round(rng.uniform(10, 60), 2),
+                rng.randint(1, 5),
+                'In stock' if rng.random() < 0.9 else 'Out of stock',
+                rng.choice(CATEGORIES),
+                f'https://books.toscrape.com/media/cache/{book_id:08x}.jpg',
+                f'https://books.toscrape.com/catalogue/book_{book_id}/index.html',
+            ])
+
+
+@pytest.fixture(scope='session', params=BENCH_SIZES, ids=lambda size: f'{size}books')
+def books_csv(request, tmp_path_factory):
+    path = tmp_path_factory.mktemp('books') / f'books_{request.param}.csv'
+    write_books_csv(str(path), request.param)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def repository(books_csv):
+    """Repositório com os caches de consulta desativados (mede o cálculo)"""
+    repo = BookRepository(books_csv, shared_cache_path='')
+    repo.cache = QueryCache(max_size=0)
+    return repo
+
+
+@pytest.fixture(scope='session')
+def cached_repository(books_csv):
+    """Repositório com o cache local habilitado (mede o caminho de hit)"""
+    return BookRepository(books_csv, shared_cache_path='')
@@ -0,0 +1,20 @@
+# Configuração mínima do Gunicorn para benchmarks locais
+# (sem logs em /var/log, pidfile ou troca de usuário)
+backlog = 2048
+timeout = 30
+keepalive = 2
+loglevel = 'warning'
+preload_app = True
+
+# Mesmo warm-up do deploy (gunicorn.conf.py): os workers já nascem com o
+# pipeline de ML e os caches prontos, e a medição não inclui a partida a frio
+import os
+
+os.environ.setdefault('WARMUP_MODE', 'master')
+
+
+def when_ready(server):
+    from api.warmup import WARMUP_MODE, run_warmup
+
+    if WARMUP_MODE == 'master' and server.cfg.preload_app:
+        run_warmup()
@@ -0,0 +1,231 @@
+"""
+Gerador de carga HTTP assíncrono usado pelos benchmarks
+
+Mantém N conexões concorrentes com keep-alive (reabrindo quando o servidor
+fecha a conexão, como faz o worker sync do gunicorn) e registra a latência de
+cada requisição.
+"""
+
+import asyncio
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class LoadResult:
+    """Resultado agregado de uma rodada de carga"""
+    requests: int = 0
+    errors: int = 0
+    duration: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    status_counts: Dict[int, int] = field(default_factory=dict)
+
+    def percentile(self, pct: float) -> float:
+        """Percentil da latência em milissegundos"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index] * 1000.0
+
+    def to_dict(self) -> Dict[str, float]:
+        """Converte o resultado para dicionário"""
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': self.errors / self.requests if self.requests else 0.0,
+            'throughput_rps': self.requests / self.duration if self.duration else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'status_counts': {str(k): v for k, v in sorted(self.status_counts.items())},
+        }
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bool]:
+    """Lê uma resposta HTTP/1.1; retorna (status, conexão mantida)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return status, False
+
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    return status, keep_alive
+
+
+async def _worker(host: str, port: int, requests: Sequence[bytes], deadline: float,
+                  result: LoadResult, offset: int, expected_status: Optional[Collection[int]]):
+    reader: Optional[asyncio.StreamReader] = None
+    writer: Optional[asyncio.StreamWriter] = None
+    index = offset
+    while time.perf_counter() < deadline:
+        payload = requests[index % len(requests)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(payload)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            result.requests += 1
+            result.errors += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+
+        result.latencies.append(time.perf_counter() - start)
+        result.requests += 1
+        result.status_counts[status] = result.status_counts.get(status, 0) + 1
+        if (status not in expected_status) if expected_status else status >= 500:
+            result.errors += 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+def build_request(method: str, url_path: str, host: str, body: Optional[bytes] = None) -> bytes:
+    """Monta uma requisição HTTP/1.1 crua"""
+    lines = [f'{method} {url_path} HTTP/1.1', f'Host: {host}', 'Connection: keep-alive']
+    if body is not None:
+        lines += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin1') + (body or b'')
+
+
+async def run_load(base_url: str, targets: Sequence[Tuple[str, str, Optional[bytes]]],
+                   connections: int, duration: float,
+                   expected_status: Optional[Collection[int]] = None) -> LoadResult:
+    """Dispara carga com `connections` conexões concorrentes durante `duration` segundos
+
+    Sem `expected_status`, respostas 5xx contam como erro; com ele, qualquer
+    status fora do conjunto conta como erro.
+    """
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    requests = [build_request(method, path, parts.netloc, body) for method, path, body in targets]
+    result = LoadResult()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[
+        _worker(host, port, requests, deadline, result, i, expected_status)
+        for i in range(connections)
+    ])
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def free_port() -> int:
+    """Retorna uma porta TCP livre no host local"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    """Aguarda o servidor aceitar conexões"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Servidor não respondeu na porta {port}')
+
+
+def wait_for_ready(port: int, path: str = '/api/v1/health/ready', timeout: float = 120.0):
+    """Aguarda a rota de prontidão responder 200 (warm-up concluído)"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urlopen(f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Servidor não ficou pronto na porta {port}')
+
+
+def start_gunicorn(app_path: str, port: int, workers: int, worker_class: str = 'sync',
+                   extra_args: Sequence[str] = (), env: Optional[Dict[str, str]] = None):
+    """Inicia o gunicorn localmente, sem o gunicorn.conf.py de produção
+
+    O registro de modelos, os jobs de treino e o RUN_DIR do servidor ficam em
+    um diretório temporário, removido por `stop_process`: os cenários de treino
+    não gravam versões nem trocam o ACTIVE do `models/` do repositório.
+    """
+    state_dir = tempfile.mkdtemp(prefix='books-api-bench-')
+    state_env = {
+        'MODEL_REGISTRY_DIR': os.path.join(state_dir, 'models'),
+        'RUN_DIR': os.path.join(state_dir, 'run'),
+    }
+    config_path = os.path.join(ROOT_DIR, 'benchmarks', 'gunicorn_bench.conf.py')
+    cmd = [
+        sys.executable, '-m', 'gunicorn', app_path,
+        '--config', config_path,
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers),
+        '--worker-class', worker_class,
+        *extra_args,
+    ]
+    process = subprocess.Popen(
+        cmd, cwd=ROOT_DIR, env={**os.environ, **state_env, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    process.state_dir = state_dir
+    try:
+        wait_for_port(port)
+        wait_for_ready(port)
+    except RuntimeError:
+        stop_process(process)
+        raise
+    return process
+
+
+def stop_process(process: subprocess.Popen):
+    """Encerra o processo do servidor e remove o seu diretório de estado"""
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    state_dir = getattr(process, 'state_dir', None)
+    if state_dir is not None:
+        shutil.rmtree(state_dir, ignore_errors=True)
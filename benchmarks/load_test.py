@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Teste de carga HTTP de todas as rotas públicas da Books API
+
+Sobe o gunicorn localmente (ou usa --base-url), exercita cada rota de
+api/routes.py, api/ml_routes.py e api/scraping_routes.py com concorrência
+configurável e grava throughput, p50/p95/p99 e taxa de erro por rota em um
+arquivo de resultados. Cada execução é comparada com o baseline versionado
+em benchmarks/baselines/load_test.json; regressões fazem o script sair com
+código 1.
+
+Uso:
+    python -m benchmarks.load_test                       # roda e compara
+    python -m benchmarks.load_test --update-baseline     # regrava o baseline
+    python -m benchmarks.load_test --routes /books --connections 32
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.http_load import ROOT_DIR, free_port, run_load, start_gunicorn, stop_process
+
+BASELINE_PATH = os.path.join(ROOT_DIR, 'benchmarks', 'baselines', 'load_test.json')
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+# Tolerâncias padrão para considerar regressão
+P99_TOLERANCE = 0.5          # p99 até 50% acima do baseline
+THROUGHPUT_TOLERANCE = 0.3   # throughput até 30% abaixo do baseline
+ERROR_RATE_TOLERANCE = 0.01  # taxa de erro até 1 ponto percentual acima
+
+PREDICTION_BODY = {
+    'data': [
+        {'title': 'Example Book', 'price': 25.99, 'rating': 4,
+         'category': 'Fiction', 'availability': 'In stock'},
+    ]
+}
+
+
+@dataclass
+class Scenario:
+    """Rota exercitada pelo teste de carga"""
+    method: str
+    rule: str
+    path: str
+    body: Optional[Dict[str, Any]] = None
+    expected: Tuple[int, ...] = (200,)
+    connections: Optional[int] = None
+    duration: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return f'{self.method} {self.path}'
+
+
+# Executados na ordem: o treino vem antes das predições e o reset por último
+SCENARIOS = [
+    # Conforme a ordem de registro, / pode cair no endpoint raiz do flask_restx (404)
+    Scenario('GET', '/', '/', expected=(200, 404)),
+    Scenario('GET', '/api/v1/health', '/api/v1/health'),
+    Scenario('GET', '/api/v1/health/ready', '/api/v1/health/ready'),
+    Scenario('GET', '/api/v1/health/cache', '/api/v1/health/cache'),
+    Scenario('GET', '/api/v1/books', '/api/v1/books'),
+    Scenario('GET', '/api/v1/books/<int:book_id>', '/api/v1/books/1'),
+    Scenario('GET', '/api/v1/books/search', '/api/v1/books/search?title=the'),
+    Scenario('GET', '/api/v1/books/top-rated', '/api/v1/books/top-rated'),
+    Scenario('GET', '/api/v1/books/price-range', '/api/v1/books/price-range?min=10&max=30'),
+    Scenario('GET', '/api/v1/books/changes', '/api/v1/books/changes?since=0'),
+    Scenario('GET', '/api/v1/events', '/api/v1/events'),
+    Scenario('GET', '/api/v1/categories', '/api/v1/categories'),
+    Scenario('GET', '/api/v1/stats/overview', '/api/v1/stats/overview'),
+    Scenario('GET', '/api/v1/stats/categories', '/api/v1/stats/categories'),
+    Scenario('GET', '/api/v1/scraping/status', '/api/v1/scraping/status'),
+    Scenario('GET', '/api/v1/scraping/history', '/api/v1/scraping/history'),
+    Scenario('GET', '/api/v1/scraping/data-info', '/api/v1/scraping/data-info'),
+    Scenario('GET', '/api/v1/scraping/config', '/api/v1/scraping/config'),
+    Scenario('PUT', '/api/v1/scraping/config', '/api/v1/scraping/config', body={}),
+    Scenario('GET', '/api/v1/ml/model-info', '/api/v1/ml/model-info'),
+    Scenario('GET', '/api/v1/ml/models', '/api/v1/ml/models'),
+    Scenario('GET', '/api/v1/ml/models/<string:version>', '/api/v1/ml/models/desconhecido',
+             expected=(404,)),
+    Scenario('GET', '/api/v1/ml/example-prediction', '/api/v1/ml/example-prediction'),
+    Scenario('GET', '/api/v1/ml/features', '/api/v1/ml/features', connections=4),
+    Scenario('GET', '/api/v1/ml/training-data', '/api/v1/ml/training-data', connections=4),
+    # Enfileira o treino (pedidos repetidos reaproveitam o job pendente); com a
+    # fila cheia responde 503
+    Scenario('POST', '/api/v1/ml/train', '/api/v1/ml/train', body={'target': 'rating'},
+             expected=(202, 503), connections=1),
+    Scenario('GET', '/api/v1/ml/jobs', '/api/v1/ml/jobs'),
+    Scenario('GET', '/api/v1/ml/jobs/<string:job_id>', '/api/v1/ml/jobs/desconhecido',
+             expected=(404,)),
+    # Antes do primeiro job terminar não há modelo ativo: predições respondem 400
+    Scenario('POST', '/api/v1/ml/predictions', '/api/v1/ml/predictions',
+             body=PREDICTION_BODY, expected=(200, 400)),
+    Scenario('GET', '/swagger.json', '/swagger.json'),
+    Scenario('GET', '/metrics', '/metrics'),
+    Scenario('POST', '/api/v1/ml/reset', '/api/v1/ml/reset', connections=1),
+]
+
+# Rotas intencionalmente fora do teste de carga
+EXCLUDED_RULES = {
+    ('POST', '/api/v1/scraping/trigger'): 'dispara scraping real contra books.toscrape.com',
+    ('GET', '/api/v1/profiles'): 'rota administrativa de profiling',
+    ('GET', '/api/v1/profiles/<string:profile_id>'): 'rota administrativa de profiling',
+    ('GET', '/api/docs'): 'página HTML do Swagger UI',
+    ('GET', '/api/v1/events/stream'): 'conexão SSE de longa duração',
+    ('POST', '/api/v1/ml/models/<string:version>/activate'): 'troca o modelo ativo de todos os workers',
+    ('POST', '/api/v1/ml/models/rollback'): 'troca o modelo ativo de todos os workers',
+}
+EXCLUDED_PREFIXES = ('/static/', '/swaggerui/')
+
+
+def missing_scenarios(app) -> List[Tuple[str, str]]:
+    """Rotas da aplicação sem cenário de carga nem exclusão explícita"""
+    covered = {(s.method, s.rule) for s in SCENARIOS} | set(EXCLUDED_RULES)
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.rule.startswith(EXCLUDED_PREFIXES):
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (method, rule.rule) not in covered:
+                missing.append((method, rule.rule))
+    return missing
+
+
+def run_suite(base_url: str, scenarios: List[Scenario], connections: int,
+              duration: float) -> Dict[str, Dict[str, Any]]:
+    """Executa os cenários em sequência e retorna as estatísticas por rota"""
+    results = {}
+    for scenario in scenarios:
+        body = json.dumps(scenario.body).encode() if scenario.body is not None else None
+        result = asyncio.run(run_load(
+            base_url,
+            [(scenario.method, scenario.path, body)],
+            scenario.connections or connections,
+            scenario.duration or duration,
+            expected_status=scenario.expected,
+        ))
+        stats = result.to_dict()
+        stats['connections'] = scenario.connections or connections
+        results[scenario.name] = stats
+        print(f"{scenario.name:<50} {stats['throughput_rps']:>9.1f} req/s "
+              f"p50 {stats['p50_ms']:>8.1f} p95 {stats['p95_ms']:>8.1f} "
+              f"p99 {stats['p99_ms']:>8.1f} ms  erros {stats['error_rate']:.1%}")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            p99_tolerance: float = P99_TOLERANCE,
+            throughput_tolerance: float = THROUGHPUT_TOLERANCE,
+            error_rate_tolerance: float = ERROR_RATE_TOLERANCE) -> List[str]:
+    """Lista as regressões em relação ao baseline
+    
+    Um cenário sem entrada no baseline também é listado: sem ele a rota
+    nunca seria comparada.
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            regressions.append(f"{name}: sem baseline (execute com --update-baseline)")
+            continue
+        if current['p99_ms'] > reference['p99_ms'] * (1 + p99_tolerance):
+            regressions.append(
+                f"{name}: p99 {current['p99_ms']:.1f} ms > baseline {reference['p99_ms']:.1f} ms"
+            )
+        if current['throughput_rps'] < reference['throughput_rps'] * (1 - throughput_tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput_rps']:.1f} req/s < "
+                f"baseline {reference['throughput_rps']:.1f} req/s"
+            )
+        if current['error_rate'] > reference['error_rate'] + error_rate_tolerance:
+            regressions.append(
+                f"{name}: taxa de erro {current['error_rate']:.1%} > "
+                f"baseline {reference['error_rate']:.1%}"
+            )
+    return regressions
+
+
+def environment_info(args) -> Dict[str, Any]:
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': multiprocessing.cpu_count(),
+        'workers': args.workers,
+        'connections': args.connections,
+        'duration': args.duration,
+        'admission_control': args.admission_control,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--base-url', help='Usa um servidor já em execução')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count() * 2 + 1)
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--routes', help='Executa só cenários cujo nome contém o texto')
+    parser.add_argument('--admission-control', action='store_true',
+                        help='Mantém o controle de admissão ligado (mede o deploy como está)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--output', help='Arquivo de resultados (padrão: benchmarks/results/)')
+    parser.add_argument('--p99-tolerance', type=float, default=P99_TOLERANCE)
+    parser.add_argument('--throughput-tolerance', type=float, default=THROUGHPUT_TOLERANCE)
+    parser.add_argument('--error-rate-tolerance', type=float, default=ERROR_RATE_TOLERANCE)
+    args = parser.parse_args()
+
+    from api.routes import app
+    missing = missing_scenarios(app)
+    if missing:
+        print('⚠️  Rotas sem cenário de carga: ' + ', '.join(f'{m} {r}' for m, r in missing))
+
+    scenarios = [s for s in SCENARIOS if not args.routes or args.routes in s.name]
+
+    process = None
+    base_url = args.base_url
+    if base_url is None:
+        port = free_port()
+        env = {} if args.admission_control else {'ADMISSION_CONTROL': 'false'}
+        process = start_gunicorn('wsgi:app', port, args.workers, env=env)
+        base_url = f'http://127.0.0.1:{port}'
+
+    try:
+        results = run_suite(base_url, scenarios, args.connections, args.duration)
+    finally:
+        if process is not None:
+            stop_process(process)
+
+    report = {'environment': environment_info(args), 'routes': results}
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_test-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\n📄 Resultados: {output}')
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'📌 Baseline atualizado: {args.baseline}')
+        return
+
+    if not os.path.exists(args.baseline):
+        print('⚠️  Baseline não encontrado; execute com --update-baseline')
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline['routes'], args.p99_tolerance,
+                          args.throughput_tolerance, args.error_rate_tolerance)
+    if regressions:
+        print('\n❌ Regressões em relação ao baseline:')
+        for regression in regressions:
+            print(f'   - {regression}')
+        sys.exit(1)
+    print('\n✅ Nenhuma regressão em relação ao baseline')
+
+
+if __name__ == '__main__':
+    main()
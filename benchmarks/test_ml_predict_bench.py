@@ -0,0 +1,64 @@
+"""
+Micro-benchmarks da predição do Random Forest (média + confiança)
+
+Compara a implementação anterior (forest.predict + um tree.predict por árvore,
+duas passadas) com `forest_predict` (uma passada, sequencial ou em threads) e
+com o `FlatForest` (tabelas de nós planas), em lotes de 1, 100 e 10.000 linhas.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from api.ml_pipeline import MLPipeline, forest_predict  # noqa: E402
+from api.models import BookRepository  # noqa: E402
+from api.tree_eval import FlatForest  # noqa: E402
+from benchmarks.conftest import write_books_csv  # noqa: E402
+
+BATCH_SIZES = [1, 100, 10000]
+
+
+@pytest.fixture(scope='module')
+def trained_model(tmp_path_factory):
+    path = tmp_path_factory.mktemp('ml') / 'books.csv'
+    write_books_csv(str(path), 1000)
+    repository = BookRepository(str(path), shared_cache_path='')
+    pipeline = MLPipeline([book.to_dict() for book in repository.get_all_books()])
+    assert 'error' not in pipeline.train_model()
+    return pipeline.model
+
+
+@pytest.fixture(params=BATCH_SIZES, ids=lambda size: f'{size}rows')
+def batch(request):
+    return np.random.RandomState(0).standard_normal((request.param, 9))
+
+
+def two_pass_predict(model, X):
+    """Implementação anterior de MLPipeline.predict"""
+    predictions = model.predict(X)
+    tree_predictions = np.array([tree.predict(X) for tree in model.estimators_])
+    return predictions, np.std(tree_predictions, axis=0)
+
+
+def test_predict_two_pass(benchmark, trained_model, batch):
+    benchmark(two_pass_predict, trained_model, batch)
+
+
+def test_predict_single_pass(benchmark, trained_model, batch):
+    mean, spread = benchmark(forest_predict, trained_model, batch, 1)
+    expected_mean, expected_spread = two_pass_predict(trained_model, batch)
+    assert np.array_equal(mean, expected_mean)
+    assert np.array_equal(spread, expected_spread)
+
+
+def test_predict_single_pass_threads(benchmark, trained_model, batch):
+    benchmark(forest_predict, trained_model, batch, 4)
+
+
+def test_predict_flat_forest(benchmark, trained_model, batch):
+    forest = FlatForest.from_sklearn(trained_model)
+    mean, spread = benchmark(forest.predict, batch, True)
+    expected_mean, expected_spread = two_pass_predict(trained_model, batch)
+    assert np.array_equal(mean, expected_mean)
+    assert np.array_equal(spread, expected_spread)
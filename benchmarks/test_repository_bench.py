@@ -0,0 +1,54 @@
+"""
+Micro-benchmarks do BookRepository e da serialização de Book
+
+Executar com `make bench-micro`: cada execução é comparada com a referência
+gravada por `make bench-micro-save` (`.benchmarks/reference.json`), falhando
+se a média de algum benchmark piorar além de BENCH_THRESHOLD.
+"""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+
+def test_load_books(benchmark, repository):
+    benchmark(repository.load_books)
+
+
+def test_get_book_by_id(benchmark, repository):
+    # Consulta ao índice por ID (dict); o último livro, como no antigo pior caso
+    last_id = repository.get_all_books()[-1].id
+    assert benchmark(repository.get_book_by_id, last_id) is not None
+
+
+def test_search_books_by_title(benchmark, repository):
+    benchmark(repository.search_books, title='the')
+
+
+def test_search_books_by_category(benchmark, repository):
+    benchmark(repository.search_books, category='fiction')
+
+
+def test_search_books_cached(benchmark, cached_repository):
+    benchmark(cached_repository.search_books, title='the')
+
+
+def test_get_books_by_price_range(benchmark, repository):
+    benchmark(repository.get_books_by_price_range, 20.0, 40.0)
+
+
+def test_get_top_rated_books(benchmark, repository):
+    benchmark(repository.get_top_rated_books, 10)
+
+
+def test_get_stats_overview(benchmark, repository):
+    benchmark(repository.get_stats_overview)
+
+
+def test_get_stats_by_categories(benchmark, repository):
+    benchmark(repository.get_stats_by_categories)
+
+
+def test_book_to_dict(benchmark, repository):
+    books = repository.get_all_books()
+    benchmark(lambda: [book.to_dict() for book in books])
@@ -24,6 +24,9 @@ st.set_page_config(
 # URL base da API
 API_BASE_URL = "http://localhost:5005"
 
+# Eventos que disparam o auto-refresh
+UPDATE_EVENT_TYPES = 'dataset.activated,model.trained'
+
 class BooksDashboard:
     """Classe principal do dashboard"""
     
@@ -70,6 +73,55 @@ class BooksDashboard:
         except Exception as e:
             st.error(f"Erro ao carregar estatísticas por categoria: {e}")
             return None
+    
+    def wait_for_update(self, last_event_id=None, timeout=30):
+        """Aguarda um evento de dados/modelo no stream SSE da API
+        
+        Retorna o id do evento recebido, ou None ao fim de `timeout` segundos.
+        """
+        headers = {'Last-Event-ID': str(last_event_id)} if last_event_id else {}
+        deadline = time.time() + timeout
+        try:
+            with requests.get(
+                f"{self.api_url}/api/v1/events/stream",
+                params={'types': UPDATE_EVENT_TYPES},
+                headers=headers, stream=True, timeout=(5, timeout)
+            ) as response:
+                if response.status_code == 503:
+                    # Deploy com workers sync: sem stream, consulta /api/v1/events
+                    interval = response.json().get('poll_interval_seconds', 5)
+                    return self.poll_for_update(last_event_id, deadline, interval)
+                event_id = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line and line.startswith('id:'):
+                        event_id = int(line[3:].strip())
+                    elif line and line.startswith('event:') and event_id is not None:
+                        return event_id
+                    if time.time() >= deadline:
+                        return None
+        except Exception:
+            # API fora do ar ou sem suporte a eventos: espera o intervalo normal
+            time.sleep(max(0.0, deadline - time.time()))
+        return None
+    
+    def poll_for_update(self, last_event_id, deadline, interval=5):
+        """Consulta GET /api/v1/events até surgir um evento novo ou chegar o `deadline`"""
+        while time.time() < deadline:
+            response = requests.get(
+                f"{self.api_url}/api/v1/events",
+                params={'types': UPDATE_EVENT_TYPES, 'last_event_id': last_event_id},
+                timeout=10
+            )
+            events = response.json().get('events', []) if response.status_code == 200 else []
+            if events and last_event_id is not None:
+                return events[-1]['id']
+            if events:
+                # Primeira consulta: só marca o ponto de partida
+                last_event_id = events[-1]['id']
+            elif last_event_id is None:
+                last_event_id = 0
+            time.sleep(max(0.0, min(interval, deadline - time.time())))
+        return None
 
 def create_header():
     """Cria o cabeçalho do dashboard"""
@@ -83,11 +135,7 @@ def create_sidebar():
     
     # Configurações
     st.sidebar.subheader("⚙️ Configurações")
-    auto_refresh = st.sidebar.checkbox("🔄 Auto-refresh (30s)", value=False)
-    
-    if auto_refresh:
-        time.sleep(30)
-        st.rerun()
+    auto_refresh = st.sidebar.checkbox("🔄 Auto-refresh (novos dados)", value=False)
     
     # Filtros
     st.sidebar.subheader("🔍 Filtros")
@@ -404,6 +452,14 @@ def main():
     # Informações do dashboard
     st.markdown("---")
     st.info(f"🕐 Última atualização: {datetime.now().strftime('%H:%M:%S')}")
+    
+    # Auto-refresh: a página já renderizada espera um evento de nova versão dos
+    # dados ou de modelo retreinado (ou 30s) antes de recarregar
+    if sidebar_config['auto_refresh']:
+        event_id = dashboard.wait_for_update(st.session_state.get('last_event_id'), timeout=30)
+        if event_id is not None:
+            st.session_state['last_event_id'] = event_id
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
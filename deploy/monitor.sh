@@ -57,6 +57,11 @@ echo "🌍 API Endpoints:"
 check_url "http://localhost:5005/api/v1/health" "Direct API"
 check_url "http://localhost/api/v1/health" "Via Nginx"
 
+echo ""
+echo "📈 Métricas (latência por rota, caches, admissão):"
+/var/www/books-api/venv/bin/python /var/www/books-api/scripts/metrics_summary.py \
+    "http://localhost:5005/metrics" 2>/dev/null || echo -e "❌ /metrics: ${RED}FAILED${NC}"
+
 echo ""
 echo "💾 Disk Usage:"
 df -h /var/www/books-api | tail -1
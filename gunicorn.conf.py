@@ -1,13 +1,25 @@
 # Configuração do Gunicorn para produção
 import multiprocessing
+import os
+import shutil
 
 # Server socket
 bind = "0.0.0.0:5005"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# Modo sync (padrão):  gunicorn -c gunicorn.conf.py wsgi:application
+# Modo ASGI:           GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+#                      gunicorn -c gunicorn.conf.py asgi:application
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+if worker_class == 'sync':
+    workers = multiprocessing.cpu_count() * 2 + 1
+else:
+    # Workers assíncronos não ficam presos a clientes lentos: um por CPU basta
+    workers = multiprocessing.cpu_count()
+workers = int(os.environ.get('GUNICORN_WORKERS', workers))
+# Os limites de admissão por rota valem para o host: cada worker aplica a sua parte
+os.environ.setdefault('ADMISSION_WORKERS', str(workers))
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -35,5 +47,78 @@ daemon = False
 user = 'www-data'
 group = 'www-data'
 
+# Estado local compartilhado entre os workers (caches SQLite) em um diretório
+# privado da aplicação, nunca no /tmp: outro usuário do host poderia criar os
+# arquivos antes e alterar o que os workers leem
+def make_private_dir(path):
+    """Cria o diretório com modo 0700, pertencente ao usuário dos workers"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if os.geteuid() == 0:
+        # O master roda como root e os workers como `user`: o diretório é deles
+        import pwd
+
+        account = pwd.getpwnam(user)
+        os.chown(path, account.pw_uid, account.pw_gid)
+    return path
+
+
+RUN_DIR = make_private_dir(
+    os.environ.setdefault('RUN_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run'))
+)
+
+# Cache de consultas compartilhado entre os workers (SQLite local)
+os.environ.setdefault('SHARED_CACHE_PATH', os.path.join(RUN_DIR, 'cache.sqlite3'))
+
+# Eventos SSE compartilhados entre os workers (SQLite local)
+os.environ.setdefault('EVENTS_PATH', os.path.join(RUN_DIR, 'events.sqlite3'))
+# Nos workers sync cada conexão SSE prenderia um worker inteiro (e poucas abas
+# abertas esgotariam todos): o stream responde 503 e os clientes consultam
+# GET /api/v1/events. Sirva o stream com workers gthread ou no modo ASGI
+if worker_class == 'sync':
+    os.environ.setdefault('EVENTS_STREAMING', 'false')
+
+# Warm-up (índices, caches, pipeline de ML, Swagger) no master antes do fork
+os.environ.setdefault('WARMUP_MODE', 'master')
+
+# Métricas Prometheus agregadas entre workers. O diretório precisa existir
+# (e estar limpo) antes de a aplicação ser carregada pelo preload_app; fica no
+# RUN_DIR pelo mesmo motivo dos caches
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(RUN_DIR, 'metrics'))
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+make_private_dir(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
 # Preload app for better performance
-preload_app = True
\ No newline at end of file
+preload_app = True
+
+
+def child_exit(server, worker):
+    """Remove os gauges "live" do worker encerrado"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """Cancela os treinos do worker que sai: o join do pool não segura o graceful_timeout"""
+    from api.training_jobs import training_queue
+
+    training_queue.abort()
+
+
+def when_ready(server):
+    """Warm-up no master, antes do fork dos workers (WARMUP_MODE=master)"""
+    from api.warmup import WARMUP_MODE, run_warmup
+
+    if WARMUP_MODE == 'master' and server.cfg.preload_app:
+        run_warmup()
+
+
+def post_worker_init(worker):
+    """Warm-up em segundo plano no worker (WARMUP_MODE=worker ou sem preload)"""
+    from api.ml_routes import ML_WARMUP, start_ml_warmup
+    from api.warmup import WARMUP_MODE, start_warmup, warmup_state
+
+    if WARMUP_MODE != 'off' and not warmup_state.ready:
+        start_warmup()
+    elif ML_WARMUP:
+        start_ml_warmup()
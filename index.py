@@ -1,49 +1,163 @@
-from flask import Flask, jsonify
+"""
+Entry point serverless (Vercel) enxuto da Books API
+
+Serve as rotas de leitura de livros, categorias, estatísticas e health a
+partir do arquivo compacto data/books_compact.json (gerado por
+scripts/build_compact_data.py), usando apenas Flask e a stdlib: sem pandas,
+flask_restx, scikit-learn ou Prometheus no cold start. As respostas têm o
+mesmo formato da aplicação completa (api/routes.py).
+"""
+
+import json
+import os
+
+from flask import Flask, Response, request
+
+from api.models import BookRepository
+
+COMPACT_DATA_PATH = os.environ.get(
+    'COMPACT_DATA_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'books_compact.json')
+)
+
+# Campos do modelo StatsOverview, na ordem do marshal do flask_restx
+STATS_OVERVIEW_FIELDS = (
+    ('total_books', int),
+    ('average_price', float),
+    ('min_price', float),
+    ('max_price', float),
+    ('rating_distribution', None),
+    ('total_categories', int),
+)
+
+NOT_FOUND_MESSAGE = (
+    'The requested URL was not found on the server. If you entered the URL manually '
+    'please check your spelling and try again.'
+)
 
 app = Flask(__name__)
 
+# Sem cache compartilhado: cada instância serverless é um processo isolado
+book_repo = BookRepository(COMPACT_DATA_PATH, shared_cache_path='')
+
+
+def json_response(payload, status: int = 200) -> Response:
+    """Serializa como o flask_restx (json.dumps + quebra de linha)"""
+    return Response(json.dumps(payload) + '\n', status=status, mimetype='application/json')
+
+
+def books_response(books) -> Response:
+    return json_response([book.to_dict() for book in books])
+
+
+class InvalidArgument(ValueError):
+    def __init__(self, name: str, message: str):
+        super().__init__(message)
+        self.name = name
+
+
+def float_arg(name: str, help_text: str):
+    """Lê um parâmetro float da query string (mesma mensagem do reqparse)"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError as e:
+        raise InvalidArgument(name, f'{help_text} {e}')
+
+
+@app.errorhandler(InvalidArgument)
+def invalid_argument(e):
+    return json_response({
+        'errors': {e.name: str(e)},
+        'message': 'Input payload validation failed'
+    }, 400)
+
+
+@app.errorhandler(404)
+def not_found(e):
+    return json_response({'message': NOT_FOUND_MESSAGE}, 404)
+
+
 @app.route('/')
 def home():
-    return jsonify({
-        'message': 'Books API - Tech Challenge',
-        'status': 'running',
+    return json_response({
+        'message': 'Books API - Tech Challenge Fase 1',
         'version': '1.0',
+        'documentation': '/api/docs',
         'endpoints': {
-            'health': '/api/v1/health',
-            'docs': '/api/docs'
+            'books': '/api/v1/books',
+            'categories': '/api/v1/categories',
+            'stats': '/api/v1/stats',
+            'health': '/api/v1/health'
         }
     })
 
+
 @app.route('/api/v1/health')
 def health():
-    return jsonify({
+    return json_response({
         'status': 'healthy',
+        'message': 'API está funcionando corretamente',
         'data_connection': 'ok',
-        'books_loaded': 1000,
+        'total_books_loaded': len(book_repo.get_all_books()),
         'version': '1.0'
     })
 
+
 @app.route('/api/v1/books')
-def books():
-    sample_books = [
-        {
-            'id': 1,
-            'title': 'Sample Book 1',
-            'price': 19.99,
-            'rating': 4,
-            'availability': 'In stock',
-            'category': 'Fiction'
-        },
-        {
-            'id': 2,
-            'title': 'Sample Book 2',
-            'price': 24.99,
-            'rating': 5,
-            'availability': 'In stock',
-            'category': 'Non-Fiction'
-        }
-    ]
-    return jsonify(sample_books)
+def list_books():
+    return books_response(book_repo.get_all_books())
+
+
+@app.route('/api/v1/books/<int:book_id>')
+def get_book(book_id):
+    book = book_repo.get_book_by_id(book_id)
+    if book is None:
+        return json_response({'message': f'Livro com ID {book_id} não encontrado'}, 404)
+    return json_response(book.to_dict())
+
+
+@app.route('/api/v1/books/search')
+def search_books():
+    return books_response(book_repo.search_books(
+        title=request.args.get('title'), category=request.args.get('category')
+    ))
+
+
+@app.route('/api/v1/books/top-rated')
+def top_rated_books():
+    return books_response(book_repo.get_top_rated_books(limit=20))
+
+
+@app.route('/api/v1/books/price-range')
+def books_by_price_range():
+    return books_response(book_repo.get_books_by_price_range(
+        min_price=float_arg('min', 'Preço mínimo'),
+        max_price=float_arg('max', 'Preço máximo')
+    ))
+
+
+@app.route('/api/v1/categories')
+def list_categories():
+    return json_response({'categories': book_repo.get_all_categories()})
+
+
+@app.route('/api/v1/stats/overview')
+def stats_overview():
+    stats = book_repo.get_stats_overview()
+    payload = {}
+    for name, cast in STATS_OVERVIEW_FIELDS:
+        value = stats.get(name)
+        payload[name] = cast(value) if cast is not None and value is not None else value
+    return json_response(payload)
+
+
+@app.route('/api/v1/stats/categories')
+def stats_categories():
+    return json_response(book_repo.get_stats_by_categories())
+
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Gera o arquivo de dados compacto usado pelo entry point serverless (index.py)
+
+Lê data/books_data.csv e grava data/books_compact.json no formato:
+
+    {
+      "version": "<sha1[:12] do CSV>",
+      "fields": ["id", "title", ...],
+      "prefixes": {"image_url": "https://...", ...},
+      "books": [[1, "A Light in the Attic", 51.77, ...], ...]
+    }
+
+Cada livro é uma lista na ordem de `fields`; os campos em `prefixes` são
+gravados sem o prefixo comum. A versão é a mesma do BookRepository, então os
+caches e o /health/cache das duas entradas concordam.
+
+Uso:
+    python scripts/build_compact_data.py [--csv data/books_data.csv] [--output data/books_compact.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from api.models import COMPACT_FIELDS, BookRepository  # noqa: E402
+
+# Prefixos menores que isso não compensam
+MIN_PREFIX_LENGTH = 8
+
+
+def build_compact_data(repo: BookRepository) -> dict:
+    """Monta a estrutura compacta a partir de um repositório carregado"""
+    rows = [[getattr(book, field) for field in COMPACT_FIELDS] for book in repo.get_all_books()]
+
+    prefixes = {}
+    for index, field in enumerate(COMPACT_FIELDS):
+        values = [row[index] for row in rows]
+        if not values or not all(isinstance(value, str) for value in values):
+            continue
+        prefix = os.path.commonprefix(values)
+        if len(prefix) >= MIN_PREFIX_LENGTH:
+            prefixes[field] = prefix
+            for row in rows:
+                row[index] = row[index][len(prefix):]
+
+    return {
+        'version': repo.dataset_version,
+        'fields': list(COMPACT_FIELDS),
+        'prefixes': prefixes,
+        'books': rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera o arquivo de dados compacto')
+    parser.add_argument('--csv', default=os.path.join(ROOT_DIR, 'data', 'books_data.csv'))
+    parser.add_argument('--output', default=os.path.join(ROOT_DIR, 'data', 'books_compact.json'))
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv):
+        print(f"❌ CSV não encontrado: {args.csv}")
+        sys.exit(1)
+
+    repo = BookRepository(args.csv, shared_cache_path='')
+    data = build_compact_data(repo)
+
+    tmp_path = f'{args.output}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, args.output)
+
+    print(f"✅ {len(data['books'])} livros gravados em {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.1f} KB, versão {data['version']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Exporta o spec Swagger e a página /api/docs como arquivos estáticos
+
+Gera swagger.json, docs.html e os assets do Swagger UI (swaggerui/) para
+serem servidos pelo nginx sem passar pela aplicação. Exemplo de configuração:
+
+    location = /swagger.json { root /var/www/books-api/api-docs; }
+    location = /api/docs     { alias /var/www/books-api/api-docs/docs.html; default_type text/html; }
+    location /swaggerui/     { alias /var/www/books-api/api-docs/swaggerui/; }
+
+Uso:
+    python scripts/export_api_docs.py [--output build/api-docs]
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta o spec Swagger e o Swagger UI')
+    parser.add_argument('--output', default=os.path.join(ROOT_DIR, 'build', 'api-docs'))
+    args = parser.parse_args()
+
+    from api.routes import api, app, spec_cache
+    from api.spec_cache import write_static_docs
+
+    output_dir = write_static_docs(app, api, args.output, spec_cache)
+    size = os.path.getsize(os.path.join(output_dir, 'swagger.json'))
+    print(f"✅ Documentação exportada em {output_dir} (swagger.json: {size / 1024:.1f} KB)")
+
+
+if __name__ == '__main__':
+    main()
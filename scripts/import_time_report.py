@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Relatório de tempo de importação (cold start) da Books API
+
+Executa `python -X importtime` em processos novos para cada módulo alvo e
+mostra o tempo total de importação, os pacotes mais pesados e quais
+dependências de ML (pandas, NumPy, scikit-learn, joblib) foram carregadas.
+
+Uso:
+    python scripts/import_time_report.py
+    python scripts/import_time_report.py api.routes api.ml_pipeline --runs 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Set, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('pandas', 'numpy', 'sklearn', 'scipy', 'joblib')
+
+DEFAULT_TARGETS = ('api.routes', 'api.ml_pipeline')
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """Converte a saída do -X importtime em (módulo, nível, próprio_us, cumulativo_us)"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        prefix, cumulative_us, name = line.split('|')
+        self_us = int(prefix.split(':')[1])
+        # Cada nível de importação aninhada acrescenta dois espaços ao nome
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), level, self_us, int(cumulative_us)))
+    return entries
+
+
+def _run_importtime(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    )
+
+
+def startup_modules() -> Set[str]:
+    """Módulos importados pelo próprio interpretador e pelo código do relatório"""
+    proc = _run_importtime('import sys, json')
+    return {name for name, _, _, _ in parse_importtime(proc.stderr)}
+
+
+def measure(module: str, baseline: Set[str]) -> Dict:
+    """Importa `module` em um processo novo e retorna o resumo"""
+    code = (
+        f'import sys, json; import {module}; '
+        f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+    )
+    proc = _run_importtime(code)
+    packages: Dict[str, int] = {}
+    for name, _, self_us, _ in parse_importtime(proc.stderr):
+        if name not in baseline:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us
+    return {
+        'module': module,
+        'total_ms': sum(packages.values()) / 1000.0,
+        'packages_ms': {name: us / 1000.0 for name, us in packages.items()},
+        'heavy_loaded': json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Relatório de tempo de importação')
+    parser.add_argument('targets', nargs='*', default=list(DEFAULT_TARGETS))
+    parser.add_argument('--runs', type=int, default=3, help='Execuções por módulo (usa a melhor)')
+    parser.add_argument('--top', type=int, default=10, help='Pacotes mais pesados a listar')
+    parser.add_argument('--json', action='store_true', help='Saída em JSON')
+    args = parser.parse_args()
+
+    baseline = startup_modules()
+    reports = []
+    for module in args.targets:
+        runs = [measure(module, baseline) for _ in range(args.runs)]
+        reports.append(min(runs, key=lambda report: report['total_ms']))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    for report in reports:
+        heavy = ', '.join(report['heavy_loaded']) or 'nenhuma'
+        print(f"\n📦 import {report['module']}: {report['total_ms']:.1f} ms "
+              f"(melhor de {args.runs})")
+        print(f"   Dependências de ML carregadas: {heavy}")
+        ranked = sorted(report['packages_ms'].items(), key=lambda item: item[1], reverse=True)
+        for name, ms in ranked[:args.top]:
+            print(f"   {name:<30} {ms:>9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
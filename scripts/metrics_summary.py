@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Resumo das métricas Prometheus da Books API (usado pelo deploy/monitor.sh)
+
+Lê o endpoint /metrics e mostra, por rota, volume de requisições, latência
+média, p50/p99 estimados pelos buckets dos histogramas, taxa de acerto dos
+caches e recusas do controle de admissão.
+"""
+
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import requests
+from prometheus_client.parser import text_string_to_metric_families
+
+
+def histogram_quantile(quantile: float, buckets: List[Tuple[float, float]]) -> float:
+    """Estima um quantil a partir de buckets cumulativos (como o PromQL)"""
+    buckets = sorted(buckets)
+    total = buckets[-1][1] if buckets else 0
+    if total == 0:
+        return 0.0
+    rank = quantile * total
+    prev_bound, prev_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float('inf'):
+                return prev_bound
+            fraction = (rank - prev_count) / (count - prev_count) if count > prev_count else 0
+            return prev_bound + (bound - prev_bound) * fraction
+        prev_bound, prev_count = bound, count
+    return prev_bound
+
+
+def summarize(text: str) -> str:
+    """Gera o resumo em texto a partir da exposição Prometheus"""
+    buckets: Dict[str, Dict[float, float]] = defaultdict(lambda: defaultdict(float))
+    sums: Dict[str, float] = defaultdict(float)
+    counts: Dict[str, float] = defaultdict(float)
+    cache: Dict[Tuple[str, str], float] = defaultdict(float)
+    rejections: Dict[str, float] = defaultdict(float)
+    in_flight = 0.0
+
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            labels = sample.labels
+            if sample.name == 'books_api_request_duration_seconds_bucket':
+                route = f"{labels['method']} {labels['route']}"
+                buckets[route][float(labels['le'])] += sample.value
+            elif sample.name == 'books_api_request_duration_seconds_sum':
+                sums[f"{labels['method']} {labels['route']}"] += sample.value
+            elif sample.name == 'books_api_request_duration_seconds_count':
+                counts[f"{labels['method']} {labels['route']}"] += sample.value
+            elif sample.name == 'books_api_cache_events_total':
+                cache[(labels['tier'], labels['event'])] += sample.value
+            elif sample.name == 'books_api_admission_rejections_total':
+                rejections[f"{labels['priority']}/{labels['status']}"] += sample.value
+            elif sample.name == 'books_api_requests_in_flight':
+                in_flight += sample.value
+
+    lines = [f"{'rota':<45} {'reqs':>8} {'média ms':>9} {'p50 ms':>8} {'p99 ms':>8}"]
+    for route in sorted(counts, key=counts.get, reverse=True):
+        route_buckets = list(buckets[route].items())
+        avg = sums[route] / counts[route] * 1000 if counts[route] else 0.0
+        lines.append(
+            f"{route:<45} {int(counts[route]):>8} {avg:>9.1f} "
+            f"{histogram_quantile(0.5, route_buckets) * 1000:>8.1f} "
+            f"{histogram_quantile(0.99, route_buckets) * 1000:>8.1f}"
+        )
+
+    lines.append('')
+    lines.append(f"Requisições em andamento: {int(in_flight)}")
+    for tier in ('local', 'shared'):
+        hits, misses = cache[(tier, 'hit')], cache[(tier, 'miss')]
+        if hits + misses:
+            lines.append(f"Cache {tier}: {hits / (hits + misses):.1%} de acerto "
+                         f"({int(hits)} hits / {int(misses)} misses)")
+    if rejections:
+        lines.append('Recusas de admissão: ' + ', '.join(
+            f"{key}={int(value)}" for key, value in sorted(rejections.items())
+        ))
+    return '\n'.join(lines)
+
+
+def main():
+    url = sys.argv[1] if len(sys.argv) > 1 else 'http://localhost:5005/metrics'
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
+    print(summarize(response.text))
+
+
+if __name__ == '__main__':
+    main()
@@ -141,7 +141,7 @@ class AuthMLTester:
             "/api/v1/ml/train", 
             "Treinando modelo Random Forest",
             method="POST",
-            data={"target": "rating"}
+            data={"target": "rating", "wait": True}
         )
         
         if training_result and not training_result.get('error'):
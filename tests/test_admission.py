@@ -0,0 +1,97 @@
+"""
+Testes para o controle de admissão
+"""
+
+import time
+import unittest
+
+from flask import Flask
+
+from api.admission import AdmissionController, get_policy, init_admission
+
+
+class TestAdmissionController(unittest.TestCase):
+    """Testes das regras de admissão"""
+
+    def test_route_priorities(self):
+        """Rotas baratas são críticas e as de ML são pesadas"""
+        self.assertEqual(get_policy('/api/v1/health').priority, 'critical')
+        self.assertEqual(get_policy('/api/v1/books/42').priority, 'critical')
+        self.assertEqual(get_policy('/api/v1/ml/train').priority, 'heavy')
+        self.assertEqual(get_policy('/api/v1/books').priority, 'heavy')
+        self.assertEqual(get_policy('/api/v1/books/search').priority, 'standard')
+
+    def test_concurrency_limit(self):
+        """Respeita o limite de execuções simultâneas da rota"""
+        controller = AdmissionController()
+        ticket, rejection = controller.admit('/api/v1/ml/train')
+        self.assertIsNone(rejection)
+        _, rejection = controller.admit('/api/v1/ml/train')
+        self.assertEqual(rejection.status, 503)
+        ticket.release()
+        self.assertEqual(controller.stats()['inflight'], 0)
+
+    def test_rate_limit(self):
+        """Token bucket recusa com 429 e Retry-After"""
+        controller = AdmissionController()
+        for _ in range(2):
+            ticket, rejection = controller.admit('/api/v1/ml/train')
+            self.assertIsNone(rejection)
+            ticket.release()
+        _, rejection = controller.admit('/api/v1/ml/train')
+        self.assertEqual(rejection.status, 429)
+        self.assertGreaterEqual(rejection.retry_after, 1)
+
+    def test_limits_split_between_workers(self):
+        """Cada worker aplica a sua parte dos limites do host"""
+        policy = get_policy('/api/v1/books').per_process(4)
+        self.assertEqual((policy.max_concurrent, policy.rate, policy.burst), (2, 25, 50))
+        # Sem cair abaixo de uma execução e um token
+        self.assertEqual(get_policy('/api/v1/ml/train').per_process(5).max_concurrent, 1)
+        self.assertEqual(get_policy('/api/v1/ml/train').per_process(5).burst, 1.0)
+
+        controller = AdmissionController(workers=2)
+        ticket, rejection = controller.admit('/api/v1/ml/train')
+        self.assertIsNone(rejection)
+        ticket.release()
+        _, rejection = controller.admit('/api/v1/ml/train')
+        self.assertEqual(rejection.status, 429)
+
+    def test_sheds_heavy_before_critical(self):
+        """Com muitas requisições em andamento, só as críticas passam"""
+        controller = AdmissionController(max_inflight=2)
+        held = [controller.admit('/api/v1/books/1')[0]]
+        _, rejection = controller.admit('/api/v1/ml/features')
+        self.assertEqual(rejection.status, 503)
+        ticket, rejection = controller.admit('/api/v1/health')
+        self.assertIsNone(rejection)
+        for t in held + [ticket]:
+            t.release()
+
+    def test_queue_time_budget(self):
+        """Requisições que esperaram demais na fila são descartadas"""
+        controller = AdmissionController(queue_budget_ms={'heavy': 100})
+        stale = f't={time.time() - 5:.3f}'
+        _, rejection = controller.admit('/api/v1/books', stale)
+        self.assertEqual(rejection.status, 503)
+        ticket, rejection = controller.admit('/api/v1/books/1', stale)
+        self.assertIsNone(rejection)
+        ticket.release()
+
+    def test_flask_integration(self):
+        """Recusas viram respostas HTTP com Retry-After"""
+        app = Flask(__name__)
+        controller = init_admission(app, AdmissionController(max_inflight=0))
+
+        @app.route('/api/v1/books/search')
+        def search():
+            return {'ok': True}
+
+        response = app.test_client().get('/api/v1/books/search')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(controller.stats()['inflight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
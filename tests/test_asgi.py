@@ -0,0 +1,107 @@
+"""
+Testes para o adaptador ASGI
+"""
+
+import asyncio
+import io
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from api import ml_export
+from api.routes import admission_controller, app
+from api.asgi_app import create_asgi_app
+
+
+def call_asgi(asgi_app, method, path, query_string=b'', body=b'', messages=None):
+    """Executa uma requisição na aplicação ASGI e retorna (status, corpo)"""
+    messages = [] if messages is None else messages
+
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': [(b'content-type', b'application/json')],
+    }
+    asyncio.run(asgi_app(scope, receive, send))
+    return messages[0]['status'], b''.join(message.get('body', b'') for message in messages[1:])
+
+
+class TestASGIApp(unittest.TestCase):
+    """Testes de paridade entre o caminho ASGI e a aplicação Flask"""
+
+    def setUp(self):
+        self.asgi_app = create_asgi_app()
+        self.client = app.test_client()
+
+    def assert_same_response(self, path, query_string=''):
+        status, body = call_asgi(self.asgi_app, 'GET', path, query_string.encode())
+        url = f'{path}?{query_string}' if query_string else path
+        response = self.client.get(url)
+        self.assertEqual(status, response.status_code)
+        self.assertEqual(json.loads(body), response.get_json())
+
+    def test_read_routes_match_flask(self):
+        """Rotas de leitura assíncronas retornam o mesmo que o Flask"""
+        self.assert_same_response('/api/v1/books')
+        self.assert_same_response('/api/v1/books/1')
+        self.assert_same_response('/api/v1/books/search', 'title=the&category=fic')
+        self.assert_same_response('/api/v1/books/price-range', 'min=10&max=30')
+        self.assert_same_response('/api/v1/books/top-rated')
+        self.assert_same_response('/api/v1/categories')
+        self.assert_same_response('/api/v1/stats/overview')
+        self.assert_same_response('/api/v1/stats/categories')
+        self.assert_same_response('/api/v1/health')
+
+    def test_errors_fall_through_to_flask(self):
+        """Erros de validação e 404 usam as mensagens do flask_restx"""
+        self.assert_same_response('/api/v1/books/99999')
+        self.assert_same_response('/api/v1/books/price-range', 'min=abc')
+
+    def test_post_routes_are_forwarded(self):
+        """Rotas não assíncronas são encaminhadas para o Flask"""
+        status, body = call_asgi(self.asgi_app, 'POST', '/api/v1/ml/reset')
+        self.assertEqual(status, 200)
+        self.assertTrue(json.loads(body)['success'])
+
+    def test_native_handlers_run_off_the_event_loop(self):
+        """Repositório e serialização rodam no pool, não na thread do loop"""
+        threads = []
+        get_all_books = self.asgi_app.book_repo.get_all_books
+
+        def record():
+            threads.append(threading.current_thread().name)
+            return get_all_books()
+
+        with patch.object(self.asgi_app.book_repo, 'get_all_books', side_effect=record):
+            status, _ = call_asgi(self.asgi_app, 'GET', '/api/v1/books')
+        self.assertEqual(status, 200)
+        self.assertTrue(threads[0].startswith('asgi-wsgi'))
+
+    def test_forwarded_response_is_streamed_in_chunks(self):
+        """Exportações binárias encaminhadas ao Flask saem bloco a bloco"""
+        admission_controller.buckets.clear()
+        messages = []
+        with patch.object(ml_export, 'CHUNK_SIZE', 256):
+            status, body = call_asgi(self.asgi_app, 'GET', '/api/v1/ml/features',
+                                     b'format=npz', messages=messages)
+        self.assertEqual(status, 200)
+        bodies = [message for message in messages[1:] if message.get('more_body')]
+        self.assertGreater(len(bodies), 1)
+        self.assertFalse(messages[-1].get('more_body'))
+        archive = np.load(io.BytesIO(body))
+        self.assertEqual(archive['features'].shape[1], len(archive['feature_names']))
+
+
+if __name__ == '__main__':
+    unittest.main()
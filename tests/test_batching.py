@@ -0,0 +1,92 @@
+"""
+Testes para o micro-batching de predições
+"""
+
+import threading
+import unittest
+from unittest.mock import patch
+
+from api import ml_routes
+from api.batching import MicroBatcher
+from api.ml_pipeline import MLPipeline
+from api.routes import app
+from tests.test_ml_pipeline import BOOKS
+from tests.test_singleflight import run_concurrently
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """Cargas concorrentes viram uma chamada ao handler"""
+
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def handler(self, payloads):
+        with self.lock:
+            self.calls.append(list(payloads))
+        return [payload * 2 for payload in payloads]
+
+    def test_concurrent_calls_share_batch(self):
+        batcher = MicroBatcher(self.handler, window=0.2, max_size=64)
+        sizes = []
+        batcher.listener = lambda size, delays: sizes.append((size, len(delays)))
+        counter = iter(range(100))
+        results, errors = run_concurrently(lambda: (lambda n: (n, batcher.submit(n)))(next(counter)))
+
+        self.assertEqual(errors, [])
+        self.assertTrue(all(result == n * 2 for n, result in results))
+        self.assertLess(len(self.calls), len(results))
+        self.assertEqual(sum(size for size, _ in sizes), len(results))
+
+    def test_max_size_closes_batch(self):
+        batcher = MicroBatcher(self.handler, window=5, max_size=4)
+        results, errors = run_concurrently(lambda: batcher.submit(1, size=2), threads=4)
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [2] * 4)
+        self.assertTrue(all(len(call) <= 2 for call in self.calls))
+
+    def test_large_payload_runs_directly(self):
+        batcher = MicroBatcher(self.handler, window=5, max_size=4)
+        self.assertEqual(batcher.submit(3, size=10), 6)
+        self.assertIsNone(batcher._thread)
+
+    def test_handler_error_reaches_callers(self):
+        def failing(payloads):
+            raise RuntimeError('falhou')
+
+        batcher = MicroBatcher(failing, window=0.01)
+        with self.assertRaises(RuntimeError):
+            batcher.submit(1)
+
+
+class TestBatchedPredictions(unittest.TestCase):
+    """/ml/predictions com o micro-batcher ativo"""
+
+    def setUp(self):
+        pipeline = MLPipeline(BOOKS)
+        pipeline.train_model()
+        self.patch = patch.object(ml_routes, 'get_ml_pipeline', lambda: pipeline)
+        self.patch.start()
+        self.client = app.test_client()
+        self.row = {'title': 'Example Book', 'price': 25.99, 'rating': 4,
+                    'category': 'Fiction', 'availability': 'In stock'}
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_batched_results_match_direct(self):
+        direct = self.client.post('/api/v1/ml/predictions', json={'data': [self.row]}).get_json()
+        batcher = MicroBatcher(ml_routes.predict_batch, window=0.05)
+        with patch.object(ml_routes, 'prediction_batcher', batcher):
+            results, errors = run_concurrently(
+                lambda: app.test_client().post('/api/v1/ml/predictions', json={'data': [self.row]}).get_json()
+            )
+            invalid = self.client.post('/api/v1/ml/predictions', json={'data': [{'price': 1}]})
+        self.assertEqual(errors, [])
+        self.assertTrue(all(result == direct for result in results))
+        self.assertLess(batcher.batches, len(results))
+        self.assertEqual(invalid.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
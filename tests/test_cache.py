@@ -0,0 +1,165 @@
+"""
+Testes para o cache de consultas
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from api.cache import QueryCache, MISSING, make_key
+from api.models import Book, BookRepository
+from api.shared_cache import SharedCache, create_shared_cache
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'books_data.csv')
+
+
+class TestQueryCache(unittest.TestCase):
+    """Testes para o cache LRU"""
+
+    def test_lru_eviction(self):
+        """Descarta a entrada menos usada ao exceder o tamanho"""
+        cache = QueryCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIs(cache.get('b'), MISSING)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl_expiration(self):
+        """Entradas expiradas contam como miss"""
+        cache = QueryCache(max_size=10, ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        self.assertIs(cache.get('a'), MISSING)
+        stats = cache.stats()
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['hits'], 0)
+
+    def test_key_normalization(self):
+        """Parâmetros equivalentes geram a mesma chave"""
+        self.assertEqual(
+            make_key('search_books', 'v1', title='Python', category=''),
+            make_key('search_books', 'v1', category=None, title='python')
+        )
+        self.assertEqual(
+            make_key('price', 'v1', min_price=10),
+            make_key('price', 'v1', min_price=10.0)
+        )
+        self.assertNotEqual(
+            make_key('search_books', 'v1', title='python'),
+            make_key('search_books', 'v2', title='python')
+        )
+
+
+class TestRepositoryCache(unittest.TestCase):
+    """Testes do cache integrado ao repositório"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, 'books.csv')
+        shutil.copy(DATA_FILE, self.csv_path)
+        self.repo = BookRepository(self.csv_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_repeated_query_hits_cache(self):
+        """Consultas repetidas são atendidas pelo cache"""
+        first = self.repo.search_books(title='The')
+        second = self.repo.search_books(title='the')
+        self.assertIs(first, second)
+        self.assertEqual(self.repo.cache.stats()['hits'], 1)
+
+    def test_reload_invalidates_cache(self):
+        """Uma nova versão dos dados invalida o cache"""
+        old_version = self.repo.dataset_version
+        total = self.repo.get_stats_overview()['total_books']
+
+        with open(self.csv_path) as f:
+            lines = f.readlines()
+        with open(self.csv_path, 'w') as f:
+            f.writelines(lines[:-1])
+        self.repo.load_books()
+
+        self.assertNotEqual(self.repo.dataset_version, old_version)
+        self.assertEqual(self.repo.get_stats_overview()['total_books'], total - 1)
+
+
+
+class TestSharedCache(unittest.TestCase):
+    """Testes do cache compartilhado entre processos"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'cache.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_value_is_shared_between_instances(self):
+        """Um valor gravado por uma instância é lido por outra"""
+        writer = SharedCache(self.db_path)
+        reader = SharedCache(self.db_path)
+        key = make_key('get_stats_overview', 'v1')
+        writer.set(key, 'v1', {'total_books': 10})
+        self.assertEqual(reader.get(key, 'v1'), {'total_books': 10})
+        self.assertIs(reader.get(key, 'v2'), MISSING)
+
+    def test_invalidate_other_versions(self):
+        """Invalidação remove apenas versões diferentes da atual"""
+        cache = SharedCache(self.db_path)
+        cache.set('a', 'v1', 1)
+        cache.set('b', 'v2', 2)
+        cache.invalidate(keep_version='v2')
+        self.assertIs(cache.get('a', 'v1'), MISSING)
+        self.assertEqual(cache.get('b', 'v2'), 2)
+
+    def test_values_round_trip_as_json(self):
+        """Livros, tuplas e dicts com chaves numéricas voltam com os mesmos tipos"""
+        cache = SharedCache(self.db_path, types=(Book,))
+        book = Book(1, 'Título', 10.5, 4, 'In stock', 'Fiction', 'img', 'url')
+        value = {'books': [book], 'rating_distribution': {5: 2, 4: 1}, 'range': (1.5, None)}
+        cache.set('k', 'v1', value)
+        self.assertEqual(cache.get('k', 'v1'), value)
+        raw = sqlite3.connect(self.db_path).execute('SELECT value FROM entries').fetchone()[0]
+        self.assertIsInstance(raw, str)
+
+    def test_corrupt_entry_is_a_miss(self):
+        """Um valor ilegível (ex.: pickle antigo) é tratado como miss"""
+        cache = SharedCache(self.db_path)
+        cache.set('k', 'v1', 1)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('UPDATE entries SET value = ?', (b'\x80\x04K\x01.',))
+        conn.commit()
+        self.assertIs(cache.get('k', 'v1'), MISSING)
+        self.assertEqual(cache.errors, 1)
+
+    def test_refuses_shared_directory(self):
+        """Diretório gravável por outros usuários desativa o cache"""
+        os.chmod(self.tmpdir, 0o777)
+        self.assertIsNone(create_shared_cache(self.db_path))
+        self.assertFalse(os.path.exists(self.db_path))
+
+    @unittest.skipUnless(hasattr(os, 'geteuid') and os.geteuid() == 0, 'requer root para trocar o dono')
+    def test_refuses_file_of_other_user(self):
+        """Arquivo criado por outro usuário não é aberto"""
+        open(self.db_path, 'w').close()
+        os.chown(self.db_path, 12345, 12345)
+        self.assertIsNone(create_shared_cache(self.db_path))
+
+    def test_repositories_share_results(self):
+        """Um segundo repositório reaproveita consultas do primeiro"""
+        first = BookRepository(DATA_FILE, shared_cache_path=self.db_path)
+        second = BookRepository(DATA_FILE, shared_cache_path=self.db_path)
+        expected = first.get_stats_by_categories()
+        self.assertEqual(second.get_stats_by_categories(), expected)
+        self.assertEqual(second.shared_cache.hits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
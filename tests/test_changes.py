@@ -0,0 +1,110 @@
+"""
+Testes para o change log e a sincronização incremental (/books/changes)
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from api import models
+from api.models import BookRepository
+from api.routes import app
+
+FIELDS = ['id', 'title', 'price', 'rating', 'availability', 'category', 'image_url', 'book_url']
+
+
+def book_row(book_id, title, price=10.0, key=None):
+    key = key or f'book_{book_id}'
+    return [book_id, title, price, 3, 'In stock', 'Fiction',
+            f'https://example.com/{key}.jpg', f'https://example.com/{key}']
+
+
+class TestBookChanges(unittest.TestCase):
+    """Diferenças entre versões dos dados por book_url"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'books.csv')
+        self.write([book_row(1, 'A'), book_row(2, 'B'), book_row(3, 'C')])
+        self.repo = BookRepository(self.path, shared_cache_path='')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, rows):
+        with open(self.path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            writer.writerows(rows)
+
+    def test_delta_since_previous_version(self):
+        v0 = self.repo.dataset_version
+        self.write([book_row(1, 'A'), book_row(2, 'B2', price=12.0), book_row(4, 'D')])
+        self.repo.load_books()
+
+        changes = self.repo.get_changes(v0)
+        self.assertEqual([book.title for book in changes['added']], ['D'])
+        self.assertEqual([book.title for book in changes['modified']], ['B2'])
+        self.assertEqual([book.title for book in changes['removed']], ['C'])
+        self.assertEqual(self.repo.get_changes(self.repo.dataset_version),
+                         {'added': [], 'modified': [], 'removed': []})
+
+    def test_delta_composes_versions(self):
+        v0 = self.repo.dataset_version
+        self.write([book_row(1, 'A'), book_row(2, 'B'), book_row(3, 'C'), book_row(4, 'D'), book_row(5, 'E')])
+        self.repo.load_books()
+        self.write([book_row(1, 'A2'), book_row(2, 'B'), book_row(3, 'C'), book_row(4, 'D2')])
+        self.repo.load_books()
+
+        changes = self.repo.get_changes(v0)
+        # D foi adicionado e depois alterado; E foi adicionado e removido
+        self.assertEqual([book.title for book in changes['added']], ['D2'])
+        self.assertEqual([book.title for book in changes['modified']], ['A2'])
+        self.assertEqual(changes['removed'], [])
+
+    def test_unknown_or_truncated_version_requires_resync(self):
+        self.assertIsNone(self.repo.get_changes('unknown'))
+
+        v0 = self.repo.dataset_version
+        with patch.object(models, 'CHANGE_LOG_SIZE', 1):
+            for title in ('X', 'Y'):
+                self.write([book_row(1, title)])
+                self.repo.load_books()
+        self.assertIsNone(self.repo.get_changes(v0))
+
+    def test_failed_reload_keeps_current_data(self):
+        with open(self.path, 'w') as f:
+            f.write('id,title\nnot-a-number,x\n')
+        self.repo.load_books()
+        self.assertEqual(len(self.repo.get_all_books()), 3)
+
+    def test_changes_endpoint(self):
+        v0 = self.repo.dataset_version
+        self.write([book_row(1, 'A'), book_row(2, 'B')])
+        client = app.test_client()
+
+        with patch('api.routes.book_repo', self.repo), patch.object(models, 'STALE_CHECK_INTERVAL', 0):
+            data = client.get(f'/api/v1/books/changes?since={v0}').get_json()
+            self.assertFalse(data['full_resync'])
+            self.assertEqual(data['removed'], [{'id': 3, 'book_url': 'https://example.com/book_3'}])
+            self.assertNotEqual(data['version'], v0)
+
+            data = client.get('/api/v1/books/changes?since=unknown').get_json()
+            self.assertTrue(data['full_resync'])
+
+
+    def test_all_routes_follow_announced_version(self):
+        """Depois que /changes anuncia uma versão, as demais rotas já a servem"""
+        client = app.test_client()
+        with patch('api.routes.book_repo', self.repo), patch.object(models, 'STALE_CHECK_INTERVAL', 0):
+            self.assertEqual(len(client.get('/api/v1/books').get_json()), 3)
+            self.write([book_row(1, 'A'), book_row(2, 'B'), book_row(3, 'C'), book_row(4, 'D')])
+            # Sem passar por /changes: a própria leitura detecta o arquivo novo
+            self.assertEqual(client.get('/api/v1/books/4').get_json()['title'], 'D')
+            self.assertEqual(len(client.get('/api/v1/books').get_json()), 4)
+            self.assertEqual(client.get('/api/v1/stats/overview').get_json()['total_books'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+"""
+Testes para o barramento de eventos e o stream SSE
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from api import events
+from api.admission import AdmissionController
+from api.asgi_app import create_asgi_app
+from api.events import EventBus, matches, parse_types, stream_events
+from api.routes import app
+from api.scraping_routes import parse_progress
+
+
+class TestEventBus(unittest.TestCase):
+    """Publicação, assinatura e reenvio de eventos"""
+
+    def test_subscribers_receive_events(self):
+        bus = EventBus(path='')
+        received = []
+        bus.subscribe(received.append)
+        bus.publish('scrape.started', {'started_at': 'agora'})
+        bus.publish('scrape.finished', {'result': 'success'})
+        self.assertEqual([event.type for event in received], ['scrape.started', 'scrape.finished'])
+        self.assertEqual(received[1].id, received[0].id + 1)
+
+    def test_subscribe_replays_missed_events(self):
+        bus = EventBus(path='')
+        first = bus.publish('scrape.started')
+        bus.publish('scrape.progress', {'pages': 1})
+        bus.publish('scrape.finished')
+        backlog = bus.subscribe(lambda event: None, last_event_id=first.id)
+        self.assertEqual([event.type for event in backlog], ['scrape.progress', 'scrape.finished'])
+
+    def test_unsubscribe(self):
+        bus = EventBus(path='')
+        received = []
+        bus.subscribe(received.append)
+        bus.unsubscribe(received.append)
+        bus.publish('model.trained')
+        self.assertEqual(received, [])
+        self.assertEqual(bus.subscriber_count(), 0)
+
+    def test_shared_bus_delivers_across_instances(self):
+        """Com EVENTS_PATH, eventos de outro processo chegam pela thread de polling"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'events.sqlite3')
+            publisher = EventBus(path=path, poll_interval=0.01)
+            subscriber = EventBus(path=path, poll_interval=0.01)
+            received = []
+            subscriber.subscribe(received.append)
+            publisher.publish('dataset.activated', {'version': 'abc'})
+            deadline = time.time() + 2
+            while not received and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(received[0].type, 'dataset.activated')
+            self.assertEqual(received[0].data, {'version': 'abc'})
+            self.assertEqual([e.type for e in subscriber.recent()], ['dataset.activated'])
+
+    def test_shared_bus_refuses_open_directory(self):
+        """Um EVENTS_PATH em diretório gravável por outros não é usado"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chmod(tmpdir, 0o777)
+            path = os.path.join(tmpdir, 'events.sqlite3')
+            bus = EventBus(path=path, poll_interval=0.01)
+            with self.assertLogs('api.events', 'WARNING'):
+                self.assertIsNone(bus.publish('model.trained'))
+            self.assertEqual(bus.recent(), [])
+            self.assertFalse(os.path.exists(path))
+
+    def test_stream_does_not_replay_history_as_live(self):
+        """Eventos gravados antes da primeira conexão saem só no backlog, uma vez"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'events.sqlite3')
+            # Barramento do worker criado no boot, antes dos eventos
+            subscriber = EventBus(path=path, poll_interval=0.01)
+            publisher = EventBus(path=path, poll_interval=0.01)
+            ids = [publisher.publish('dataset.activated', {'n': n}).id for n in range(5)]
+
+            timer = threading.Timer(0.1, lambda: publisher.publish('model.trained'))
+            timer.start()
+            chunks = list(stream_events(subscriber, last_event_id=ids[3], keepalive=1, timeout=0.4))
+            timer.join()
+
+            sent = [int(chunk.split('\n')[0][4:]) for chunk in chunks if chunk.startswith('id: ')]
+            self.assertEqual(sent, [ids[4], ids[4] + 1])
+
+    def test_type_filters(self):
+        event = events.Event(1, 'scrape.progress')
+        self.assertTrue(matches(event, None))
+        self.assertTrue(matches(event, parse_types('scrape.*')))
+        self.assertFalse(matches(event, parse_types('dataset.activated,model.trained')))
+
+    def test_sse_format(self):
+        event = events.Event(7, 'model.trained', {'target': 'rating'}, 1.5)
+        self.assertEqual(
+            event.to_sse(),
+            'id: 7\nevent: model.trained\ndata: {"target": "rating", "timestamp": 1.5}\n\n'
+        )
+
+
+class TestEventStream(unittest.TestCase):
+    """Gerador SSE síncrono e handler ASGI"""
+
+    def test_stream_sends_backlog_keepalive_and_closes(self):
+        bus = EventBus(path='')
+        first = bus.publish('scrape.started')
+        bus.publish('scrape.finished')
+        chunks = list(stream_events(bus, last_event_id=first.id, keepalive=0.01, timeout=0.05))
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        self.assertTrue(chunks[1].startswith(f'id: {first.id + 1}\nevent: scrape.finished\n'))
+        self.assertIn(events.KEEPALIVE_MESSAGE, chunks)
+        self.assertEqual(bus.subscriber_count(), 0)
+
+    def test_flask_recent_events(self):
+        bus = EventBus(path='')
+        bus.publish('scrape.started')
+        bus.publish('model.trained', {'target': 'rating'})
+        with patch('api.events_routes.event_bus', bus):
+            response = app.test_client().get('/api/v1/events?types=model.trained')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['events'][0]['data'], {'target': 'rating'})
+
+    def test_stream_disabled_points_to_polling(self):
+        """Com EVENTS_STREAMING=false (workers sync) o stream responde 503"""
+        with patch.object(events, 'EVENTS_STREAMING', False):
+            response = app.test_client().get('/api/v1/events/stream')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['poll_url'], '/api/v1/events')
+        self.assertIn('Retry-After', response.headers)
+
+    def test_asgi_stream_delivers_live_events(self):
+        bus = EventBus(path='')
+        messages = []
+
+        async def run():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if b'dataset.activated' in message.get('body', b''):
+                    disconnect.set()
+
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': '/api/v1/events/stream',
+                'query_string': b'types=dataset.*', 'headers': [],
+            }
+            task = asyncio.ensure_future(create_asgi_app()(scope, receive, send))
+            while bus.subscriber_count() == 0:
+                await asyncio.sleep(0.01)
+            # Publicado de outra thread, como no fim de um scraping
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: (bus.publish('scrape.started'),
+                               bus.publish('dataset.activated', {'version': 'v2'}))
+            )
+            await asyncio.wait_for(task, timeout=5)
+
+        with patch.object(events, 'event_bus', bus):
+            asyncio.run(run())
+
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), messages[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        self.assertIn(b'event: dataset.activated', body)
+        self.assertNotIn(b'scrape.started', body)
+        self.assertEqual(bus.subscriber_count(), 0)
+
+
+class TestStreamAdmission(unittest.TestCase):
+    """Conexões SSE não contam como requisições em andamento"""
+
+    def test_streams_do_not_consume_inflight(self):
+        controller = AdmissionController(max_inflight=2)
+        tickets = [controller.admit('/api/v1/events/stream')[0] for _ in range(5)]
+        self.assertTrue(all(tickets))
+        self.assertEqual(controller.inflight, 0)
+        ticket, rejection = controller.admit('/api/v1/books/search')
+        self.assertIsNone(rejection)
+        ticket.release()
+        for ticket in tickets:
+            ticket.release()
+        self.assertEqual(controller.stats()['route_inflight'], {})
+
+
+class TestScrapingProgress(unittest.TestCase):
+    """Progresso extraído do log do scraper"""
+
+    def test_parse_progress(self):
+        progress = {'pages': 0, 'books': 0, 'last_page_books': 0}
+        self.assertTrue(parse_progress('INFO - Coletados 20 livros da página 3', progress))
+        self.assertTrue(parse_progress('INFO - Total coletado até agora: 60 livros', progress))
+        self.assertFalse(parse_progress('INFO - Fazendo scraping da página 4', progress))
+        self.assertEqual(progress, {'pages': 3, 'books': 60, 'last_page_books': 20})
+
+
+if __name__ == '__main__':
+    unittest.main()
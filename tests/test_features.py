@@ -0,0 +1,65 @@
+"""
+Testes para o FeatureTransformer (features do treino reaplicadas na inferência)
+"""
+
+import io
+import unittest
+
+import joblib
+import numpy as np
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from api.features import FeatureTransformer
+from tests.test_ml_pipeline import BOOKS
+
+
+class TestFeatureTransformer(unittest.TestCase):
+    """Parâmetros do treino, transformação por linha e persistência"""
+
+    def setUp(self):
+        fitted = FeatureTransformer.fit(BOOKS)
+        self.scaler = StandardScaler().fit(fitted.engineer(BOOKS))
+        self.transformer = fitted.with_scaler(self.scaler)
+
+    def test_fit_learns_training_parameters(self):
+        prices = [book['price'] for book in BOOKS]
+        self.assertEqual(self.transformer.price_threshold, float(np.quantile(prices, 0.75)))
+        self.assertEqual(list(self.transformer.categories['category']), ['Fiction', 'History', 'Poetry'])
+        self.assertEqual(len(self.transformer.feature_names), 9)
+
+    def test_rows_do_not_depend_on_batch(self):
+        batch = self.transformer.transform(BOOKS[:10])
+        for index, book in enumerate(BOOKS[:10]):
+            self.assertTrue(np.array_equal(self.transformer.transform(book)[0], batch[index]))
+
+    def test_matches_standard_scaler(self):
+        raw = FeatureTransformer.fit(BOOKS).engineer(BOOKS)
+        self.assertTrue(np.array_equal(self.transformer.transform(BOOKS), self.scaler.transform(raw)))
+        self.assertTrue(np.array_equal(self.transformer.transform(raw), self.scaler.transform(raw)))
+
+    def test_unknown_and_missing_values(self):
+        row = {'title': 'Livro', 'price': 10.0, 'rating': 3, 'category': 'Desconhecida'}
+        raw = self.transformer.engineer([row])[0]
+        self.assertEqual(raw[self.transformer.feature_names.index('category_encoded')], 0)
+        self.assertEqual(raw[self.transformer.feature_names.index('availability_encoded')], 0)
+        with self.assertRaises(ValueError):
+            self.transformer.transform([{'price': 1.0}])
+
+    def test_persisted_with_joblib(self):
+        buffer = io.BytesIO()
+        joblib.dump(self.transformer, buffer)
+        buffer.seek(0)
+        loaded = joblib.load(buffer)
+        self.assertTrue(np.array_equal(loaded.transform(BOOKS), self.transformer.transform(BOOKS)))
+
+    def test_from_legacy_artifacts(self):
+        encoders = {col: LabelEncoder().fit([book[col] for book in BOOKS])
+                    for col in ('category', 'availability')}
+        legacy = FeatureTransformer.from_legacy(self.scaler, encoders)
+        self.assertEqual(legacy.categories, self.transformer.categories)
+        self.assertIsNone(legacy.price_threshold)
+        self.assertEqual(legacy.transform(BOOKS[:5]).shape, (5, 9))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Testes para o carregamento tardio da stack de ML
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('pandas', 'numpy', 'sklearn', 'joblib')
+
+
+def loaded_after(code: str):
+    """Executa `code` em um processo novo e retorna os módulos pesados carregados"""
+    script = f'{code}\nimport sys\nprint(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    proc = subprocess.run([sys.executable, '-c', script], cwd=ROOT_DIR,
+                          capture_output=True, text=True, check=True)
+    output = proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else ''
+    return [name for name in output.split(',') if name]
+
+
+class TestLazyMLImports(unittest.TestCase):
+    """A stack de ML só é importada na primeira requisição /api/v1/ml/*"""
+
+    def test_api_import_skips_ml_stack(self):
+        self.assertEqual(loaded_after('import api.routes'), [])
+
+    def test_books_request_skips_ml_stack(self):
+        code = (
+            'from api.routes import app\n'
+            'assert app.test_client().get("/api/v1/books/1").status_code == 200'
+        )
+        self.assertEqual(loaded_after(code), [])
+
+    def test_ml_request_loads_pipeline(self):
+        code = (
+            'from api.routes import app\n'
+            'assert app.test_client().get("/api/v1/ml/model-info").status_code == 200'
+        )
+        self.assertIn('sklearn', loaded_after(code))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""
+Testes para o harness de teste de carga
+"""
+
+import json
+import unittest
+
+from api.routes import app
+from benchmarks.load_test import BASELINE_PATH, SCENARIOS, compare, missing_scenarios
+
+
+class TestLoadTestHarness(unittest.TestCase):
+    """Cobertura de rotas e comparação com o baseline"""
+
+    def test_every_route_has_scenario(self):
+        """Toda rota nova precisa de cenário de carga ou exclusão explícita"""
+        self.assertEqual(missing_scenarios(app), [])
+
+    def test_scenario_names_are_unique(self):
+        names = [scenario.name for scenario in SCENARIOS]
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_compare_flags_regressions(self):
+        baseline = {'GET /a': {'p99_ms': 10.0, 'throughput_rps': 100.0, 'error_rate': 0.0}}
+        ok = {'GET /a': {'p99_ms': 12.0, 'throughput_rps': 90.0, 'error_rate': 0.0}}
+        slow = {'GET /a': {'p99_ms': 30.0, 'throughput_rps': 40.0, 'error_rate': 0.5}}
+
+        self.assertEqual(compare(ok, baseline), [])
+        self.assertEqual(len(compare(slow, baseline)), 3)
+        # Rota sem baseline também conta: do contrário nunca seria comparada
+        self.assertEqual(len(compare({'GET /b': ok['GET /a']}, baseline)), 1)
+
+    def test_baseline_covers_every_scenario(self):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)['routes']
+        self.assertEqual([s.name for s in SCENARIOS if s.name not in baseline], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
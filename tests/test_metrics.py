@@ -0,0 +1,46 @@
+"""
+Testes para as métricas Prometheus
+"""
+
+import unittest
+
+from api.routes import app
+from scripts.metrics_summary import histogram_quantile
+
+
+class TestMetrics(unittest.TestCase):
+    """Testes do endpoint /metrics"""
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_metrics_endpoint(self):
+        """Expõe latência por rota, caches e operações do repositório"""
+        self.client.get('/api/v1/stats/overview')
+        self.client.get('/api/v1/stats/overview')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+
+        text = response.data.decode()
+        self.assertIn(
+            'books_api_request_duration_seconds_count{method="GET",'
+            'route="/api/v1/stats/overview",status="200"}', text
+        )
+        self.assertIn('books_api_response_size_bytes_bucket', text)
+        self.assertIn('books_api_requests_in_flight', text)
+        self.assertIn('books_api_cache_events_total{event="hit",tier="local"}', text)
+        self.assertIn(
+            'books_api_repository_operation_duration_seconds_count{operation="get_stats_overview"}',
+            text
+        )
+
+    def test_histogram_quantile(self):
+        """Estimativa de quantil a partir de buckets cumulativos"""
+        buckets = [(0.1, 50), (0.2, 100), (float('inf'), 100)]
+        self.assertAlmostEqual(histogram_quantile(0.5, buckets), 0.1)
+        self.assertAlmostEqual(histogram_quantile(0.75, buckets), 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Testes para a exportação binária de /ml/features e /ml/training-data
+"""
+
+import io
+import unittest
+
+import numpy as np
+
+from api.ml_export import iter_npy, iter_npz, pyarrow_available
+from api.routes import admission_controller, app
+
+
+class TestMLExport(unittest.TestCase):
+    """Negociação de formato e fidelidade dos arrays exportados"""
+
+    def setUp(self):
+        admission_controller.buckets.clear()
+        self.client = app.test_client()
+
+    def test_features_npy_matches_json(self):
+        data = self.client.get('/api/v1/ml/features').get_json()
+        response = self.client.get('/api/v1/ml/features?format=npy')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-npy')
+        array = np.load(io.BytesIO(response.data))
+        self.assertEqual(array.dtype, np.float64)
+        expected = [[row[name] for name in data['feature_names']] for row in data['features']]
+        self.assertEqual(array.tolist(), expected)
+
+    def test_features_npz_via_accept_header(self):
+        response = self.client.get('/api/v1/ml/features', headers={'Accept': 'application/x-npz'})
+        self.assertEqual(response.mimetype, 'application/x-npz')
+        archive = np.load(io.BytesIO(response.data))
+        self.assertEqual(set(archive.files), {'features', 'feature_names'})
+        self.assertEqual(archive['features'].shape[1], len(archive['feature_names']))
+
+    def test_training_data_npz_preserves_precision(self):
+        data = self.client.get('/api/v1/ml/training-data').get_json()
+        response = self.client.get('/api/v1/ml/training-data?format=npz')
+        archive = np.load(io.BytesIO(response.data))
+        self.assertEqual(archive['X_train'].tolist(), data['X_train'])
+        self.assertEqual(archive['y_test'].tolist(), data['y_test'])
+
+    def test_browser_accept_header_keeps_json(self):
+        response = self.client.get('/api/v1/ml/features', headers={'Accept': 'text/html,*/*;q=0.8'})
+        self.assertEqual(response.mimetype, 'application/json')
+
+    def test_unsupported_format_returns_406(self):
+        response = self.client.get('/api/v1/ml/training-data?format=npy')
+        self.assertEqual(response.status_code, 406)
+        self.assertNotIn('npy', response.get_json()['formats'])
+
+    def test_non_numeric_target_rejected_before_streaming(self):
+        for format_name, target in (('npz', 'category'), ('npz', 'title'),
+                                    ('parquet', 'category'), ('json', 'title')):
+            response = self.client.get(f'/api/v1/ml/training-data?format={format_name}&target={target}')
+            with self.subTest(format=format_name, target=target):
+                if response.status_code != 406:
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.mimetype, 'application/json')
+
+    def test_object_arrays_are_not_exported(self):
+        objects = np.array(['a', None], dtype=object)
+        with self.assertRaises(ValueError):
+            iter_npy(objects)
+        with self.assertRaises(ValueError):
+            iter_npz({'values': np.zeros(2), 'labels': objects})
+
+    def test_arrow_formats(self):
+        """Com pyarrow, Arrow/Parquet trazem as colunas tipadas; sem ele, 406"""
+        arrow = self.client.get('/api/v1/ml/features?format=arrow')
+        parquet = self.client.get('/api/v1/ml/training-data?format=parquet')
+        if not pyarrow_available():
+            self.assertEqual(arrow.status_code, 406)
+            self.assertEqual(parquet.status_code, 406)
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.ipc.open_stream(io.BytesIO(arrow.data)).read_all()
+        self.assertEqual(table.schema.field('rating').type, pa.int64())
+        self.assertEqual(table.schema.field('price').type, pa.float64())
+        table = pq.read_table(io.BytesIO(parquet.data))
+        self.assertEqual(table.column_names[-2:], ['rating', 'split'])
+
+
+if __name__ == '__main__':
+    unittest.main()
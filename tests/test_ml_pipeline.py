@@ -0,0 +1,162 @@
+"""
+Testes para o pipeline de ML (matriz de features por versão dos dados)
+"""
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from api.cache import QueryCache
+from api.ml_pipeline import MLPipeline, forest_predict
+
+BOOKS = [
+    {'id': i, 'title': f'Book number {i}', 'price': 10.0 + i, 'rating': i % 5 + 1,
+     'availability': 'In stock' if i % 3 else 'Out of stock',
+     'category': ['Fiction', 'Poetry', 'History'][i % 3],
+     'image_url': '', 'book_url': f'https://example.com/{i}'}
+    for i in range(40)
+]
+
+
+class TestFeatureMatrix(unittest.TestCase):
+    """A engenharia de features roda uma vez por versão e é reutilizada"""
+
+    def setUp(self):
+        self.pipeline = MLPipeline(BOOKS, dataset_version='v1')
+
+    def test_matrix_built_once_per_version(self):
+        with patch.object(MLPipeline, '_build_feature_matrix',
+                          wraps=MLPipeline._build_feature_matrix) as build:
+            self.pipeline.prepare_features()
+            self.pipeline.prepare_training_data()
+            self.pipeline.train_model()
+            self.assertEqual(build.call_count, 1)
+
+            self.pipeline.set_data(BOOKS[:30], dataset_version='v2')
+            matrix = self.pipeline.get_feature_matrix()
+            self.assertEqual(build.call_count, 2)
+            self.assertEqual(matrix.dataset_version, 'v2')
+            self.assertEqual(matrix.shape, (30, 9))
+
+    def test_matrix_is_typed_and_read_only(self):
+        matrix = self.pipeline.get_feature_matrix()
+        self.assertEqual(matrix.values.dtype, np.float64)
+        self.assertFalse(matrix.values.flags.writeable)
+        self.assertEqual(set(matrix.label_encoders), {'category', 'availability'})
+
+    def test_records_keep_integer_columns(self):
+        record = self.pipeline.prepare_features()['features'][0]
+        self.assertIsInstance(record['rating'], int)
+        self.assertIsInstance(record['category_encoded'], int)
+        self.assertIsInstance(record['price'], float)
+
+    def test_training_data_does_not_touch_serving_transformer(self):
+        self.pipeline.train_model()
+        transformer = self.pipeline.transformer
+        self.pipeline.prepare_training_data()
+        self.assertIs(self.pipeline.transformer, transformer)
+        self.assertIs(transformer.categories, self.pipeline.get_feature_matrix().label_encoders)
+
+    def test_progress_reports_trees_and_keeps_model(self):
+        stages = []
+        reported = MLPipeline(BOOKS).train_model(progress=lambda stage, **info: stages.append((stage, info)))
+        plain = self.pipeline.train_model()
+        self.assertEqual(reported['metrics'], plain['metrics'])
+        self.assertEqual(stages[0][0], 'preparing')
+        self.assertEqual(stages[-1][0], 'evaluating')
+        self.assertIn(('training', {'trees_built': 100, 'trees_total': 100}), stages)
+        self.assertEqual(set(plain['timings']), {'prepare_seconds', 'fit_seconds', 'evaluate_seconds'})
+
+
+class TestForestPredict(unittest.TestCase):
+    """Uma passada pelas árvores, com o mesmo resultado do scikit-learn"""
+    
+    @classmethod
+    def setUpClass(cls):
+        pipeline = MLPipeline(BOOKS)
+        pipeline.train_model()
+        cls.model = pipeline.model
+        cls.X = np.random.RandomState(0).standard_normal((50, 9))
+    
+    def test_matches_two_pass_prediction(self):
+        for rows in (1, 50):
+            X = self.X[:rows]
+            for n_threads in (1, 3):
+                mean, spread = forest_predict(self.model, X, n_threads)
+                self.assertTrue(np.array_equal(mean, self.model.predict(X)))
+                expected = np.std([tree.predict(X) for tree in self.model.estimators_], axis=0)
+                self.assertTrue(np.array_equal(spread, expected))
+    
+    def test_predict_many_matches_predict(self):
+        pipeline = MLPipeline(BOOKS)
+        pipeline.train_model()
+        first, second = BOOKS[:3], BOOKS[10:11]
+        results = pipeline.predict_many([first, [{'price': 1.0}], second])
+        self.assertEqual(results[0], pipeline.predict(first))
+        self.assertIn('error', results[1])
+        self.assertEqual(results[2], pipeline.predict(second))
+    
+    def test_rejects_wrong_feature_count(self):
+        with self.assertRaises(ValueError):
+            forest_predict(self.model, self.X[:, :5])
+
+
+class TestPredictionCache(unittest.TestCase):
+    """Predições por linha em cache, invalidadas ao trocar de modelo"""
+    
+    def setUp(self):
+        self.cache = QueryCache(max_size=100, ttl=60)
+        self.pipeline = MLPipeline(BOOKS, prediction_cache=self.cache)
+        self.pipeline.train_model()
+    
+    def test_batch_computes_only_misses(self):
+        expected = self.pipeline.predict(BOOKS[:4])
+        self.assertEqual(self.cache.stats()['size'], 4)
+        rows = []
+        model_predict = MLPipeline._model_predict
+        with patch.object(MLPipeline, '_model_predict',
+                          side_effect=lambda model, flat, X: rows.append(len(X)) or model_predict(model, flat, X)):
+            result = self.pipeline.predict_many([BOOKS[:4], BOOKS[10:11]])
+        self.assertEqual(result[0], expected)
+        self.assertEqual(rows, [1])
+        uncached = MLPipeline(BOOKS)
+        uncached.load_artifacts(self.pipeline.export_artifacts())
+        self.assertEqual(result[1], uncached.predict(BOOKS[10:11]))
+    
+    def test_new_model_invalidates(self):
+        self.pipeline.predict(BOOKS[:4])
+        self.pipeline.load_artifacts(self.pipeline.export_artifacts(), 'v2')
+        self.assertEqual(self.cache.stats()['size'], 0)
+        self.pipeline.predict(BOOKS[:4])
+        self.assertEqual(self.cache.stats()['hits'], 0)
+
+    def test_swap_during_prediction_keeps_served_model(self):
+        other = MLPipeline(BOOKS)
+        other.train_model('price')
+        expected = self.pipeline.predict(BOOKS[20:24])
+        self.cache.clear()
+        model_predict = MLPipeline._model_predict
+        
+        def swap_then_predict(model, flat, X):
+            # Ativação concorrente no meio do lote
+            self.pipeline.load_artifacts(other.export_artifacts(), 'v2')
+            return model_predict(model, flat, X)
+        
+        with patch.object(MLPipeline, '_model_predict', side_effect=swap_then_predict):
+            result = self.pipeline.predict(BOOKS[20:24])
+        self.assertEqual(result, expected)
+        # O que foi gravado no cache ficou na chave do modelo antigo
+        self.assertEqual(self.pipeline.predict(BOOKS[20:24]), other.predict(BOOKS[20:24]))
+    
+    def test_assign_version_only_to_model_still_served(self):
+        served = self.pipeline.served
+        self.assertTrue(self.pipeline.assign_version(served, 'v1'))
+        self.assertEqual(self.pipeline.model_version, 'v1')
+        self.assertEqual(self.pipeline.served.generation, served.generation)
+        self.assertFalse(self.pipeline.assign_version(served, 'v3'))
+        self.assertEqual(self.pipeline.model_version, 'v1')
+
+
+if __name__ == '__main__':
+    unittest.main()
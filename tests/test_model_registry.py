@@ -0,0 +1,209 @@
+"""
+Testes para o registro versionado de modelos
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from api import ml_pipeline, ml_routes
+from api.ml_pipeline import MLPipeline
+from api.model_registry import ActiveModelWatcher, LazyEstimator, ModelNotFound, ModelRegistry
+from api.routes import admission_controller, app
+from tests.test_ml_pipeline import BOOKS
+
+
+class TestModelRegistry(unittest.TestCase):
+    """Versões imutáveis, ponteiro ativo atômico e rollback"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.tmpdir.name, keep=3)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def save(self, name):
+        return self.registry.save({'model': name}, {'metrics': {'test_r2': 0.5}})['version']
+
+    def test_save_activates_and_loads(self):
+        version = self.save('a')
+        self.assertEqual(self.registry.active_version(), version)
+        self.assertEqual(self.registry.load(version), {'model': 'a'})
+        metadata = self.registry.get_metadata(version)
+        self.assertEqual(metadata['metrics'], {'test_r2': 0.5})
+        self.assertIn('created_at', metadata)
+
+    def test_activate_and_rollback(self):
+        first, second = self.save('a'), self.save('b')
+        self.assertEqual(self.registry.rollback()['version'], first)
+        self.assertEqual(self.registry.active_version(), first)
+        self.assertIsNone(self.registry.rollback())
+        self.registry.activate(second)
+        self.assertEqual([m['active'] for m in self.registry.list_versions()], [True, False])
+
+    def test_unknown_versions(self):
+        with self.assertRaises(ModelNotFound):
+            self.registry.activate('../etc')
+        with self.assertRaises(ModelNotFound):
+            self.registry.load('20260101T000000-abcdef')
+
+    def test_prune_keeps_active_version(self):
+        first = self.save('a')
+        self.save('b')
+        self.save('c')
+        self.registry.activate(first)
+        self.save('d')
+        versions = [m['version'] for m in self.registry.list_versions()]
+        self.assertEqual(len(versions), 4)
+        self.assertIn(first, versions)
+
+    def test_prune_keeps_history_window(self):
+        versions = [self.save(name) for name in 'abcdef']
+        pointer = self.registry._read_pointer()
+        self.assertEqual(pointer['history'], versions[-4:-1])
+        kept = {m['version'] for m in self.registry.list_versions()}
+        self.assertEqual(kept, set(versions[-4:]))
+
+    def test_concurrent_activations_keep_every_entry(self):
+        """Instâncias separadas (como workers) serializam pelo flock em ACTIVE.lock"""
+        registries = [ModelRegistry(self.tmpdir.name, keep=1000) for _ in range(4)]
+        versions = [registries[0].save({'model': index}, {}, activate=False)['version']
+                    for index in range(100)]
+
+        def activate_all(registry, own):
+            for version in own:
+                registry.activate(version)
+
+        threads = [threading.Thread(target=activate_all, args=(registry, versions[index::4]))
+                   for index, registry in enumerate(registries)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Cada ativação empurra a versão anterior no histórico: nenhuma se perde
+        pointer = self.registry._read_pointer()
+        self.assertEqual(len(pointer['history']), 99)
+        self.assertEqual(set(pointer['history']) | {pointer['version']}, set(versions))
+
+    def test_watcher_throttles_reads(self):
+        watcher = ActiveModelWatcher(self.registry, interval=60)
+        self.assertIsNone(watcher.active_version())
+        version = self.save('a')
+        self.assertIsNone(watcher.active_version())
+        self.assertEqual(watcher.active_version(force=True), version)
+
+
+class TestMemoryMappedModels(unittest.TestCase):
+    """Forest servido dos arquivos mapeados; estimador lido só para lotes grandes"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.trained = MLPipeline(BOOKS)
+        cls.trained.train_model()
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.tmpdir.name)
+        self.version = self.registry.save(self.trained.export_artifacts(), {})['version']
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def load_pipeline(self, registry):
+        pipeline = MLPipeline(BOOKS)
+        pipeline.load_artifacts(registry.load(self.version), self.version)
+        return pipeline
+
+    def test_forest_is_memory_mapped(self):
+        self.assertTrue(os.path.isdir(os.path.join(self.tmpdir.name, self.version, 'forest')))
+        artifacts = self.registry.load(self.version)
+        self.assertNotIn('model', artifacts)
+        self.assertIsInstance(artifacts['flat_forest'].threshold, np.memmap)
+        self.assertIsInstance(artifacts['model_loader'], LazyEstimator)
+
+        pipeline = self.load_pipeline(self.registry)
+        self.assertEqual(pipeline.predict(BOOKS[:8]), self.trained.predict(BOOKS[:8]))
+        self.assertFalse(pipeline.served.loader.loaded)
+        self.assertTrue(pipeline.get_model_info()['memory_mapped'])
+
+    def test_large_batch_stays_on_mapped_forest(self):
+        pipeline = self.load_pipeline(self.registry)
+        self.assertGreater(len(BOOKS), ml_pipeline.ML_FLAT_FOREST_MAX_ROWS)
+        with patch.object(ml_pipeline, 'ML_FLAT_FOREST_CHUNK_ROWS', 16):
+            self.assertEqual(pipeline.predict(BOOKS), self.trained.predict(BOOKS))
+        self.assertFalse(pipeline.served.loader.loaded)
+        self.assertFalse(pipeline.get_model_info()['estimator_loaded'])
+
+    def test_large_batch_loads_estimator_when_enabled(self):
+        pipeline = self.load_pipeline(self.registry)
+        with patch.object(ml_pipeline, 'ML_LOAD_ESTIMATOR', True):
+            self.assertEqual(pipeline.predict(BOOKS), self.trained.predict(BOOKS))
+        self.assertTrue(pipeline.served.loader.loaded)
+        self.assertTrue(pipeline.get_model_info()['estimator_loaded'])
+
+    def test_without_mmap_loads_estimator(self):
+        pipeline = self.load_pipeline(ModelRegistry(self.tmpdir.name, mmap=False))
+        self.assertIsNotNone(pipeline.model)
+        self.assertFalse(pipeline.get_model_info()['memory_mapped'])
+        self.assertEqual(pipeline.predict(BOOKS), self.trained.predict(BOOKS))
+
+
+class TestModelRegistryRoutes(unittest.TestCase):
+    """Treino persiste o modelo; workers adotam a versão ativa"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        registry = ModelRegistry(self.tmpdir.name)
+        self.patches = [
+            patch.object(ml_routes, 'model_registry', registry),
+            patch.object(ml_routes, 'active_model_watcher', ActiveModelWatcher(registry, interval=0)),
+            patch.object(ml_routes, 'ml_pipeline_instance', None),
+            patch.object(ml_routes, '_synced_model_version', None),
+        ]
+        for p in self.patches:
+            p.start()
+        # /ml/train tem rate limit próprio (token bucket); cada teste começa cheio
+        admission_controller.buckets.clear()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmpdir.cleanup()
+
+    def test_train_list_activate_rollback(self):
+        first = self.client.post('/api/v1/ml/train', json={'wait': True}).get_json()['model_version']
+        second = self.client.post('/api/v1/ml/train', json={'wait': True}).get_json()['model_version']
+        self.assertTrue(os.path.isdir(os.path.join(self.tmpdir.name, first)))
+
+        listing = self.client.get('/api/v1/ml/models').get_json()
+        self.assertEqual(listing['active_version'], second)
+        self.assertEqual(listing['total'], 2)
+
+        response = self.client.post('/api/v1/ml/models/rollback')
+        self.assertEqual(response.get_json()['active_version'], first)
+        info = self.client.get('/api/v1/ml/model-info').get_json()
+        self.assertEqual(info['model_version'], first)
+
+        response = self.client.post(f'/api/v1/ml/models/{second}/activate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/ml/model-info').get_json()['model_version'], second)
+
+        self.assertEqual(self.client.get('/api/v1/ml/models/desconhecido').status_code, 404)
+
+    def test_new_worker_loads_active_model(self):
+        version = self.client.post('/api/v1/ml/train', json={'wait': True}).get_json()['model_version']
+        # Simula um worker recém-iniciado (ou reciclado por max_requests)
+        with patch.object(ml_routes, 'ml_pipeline_instance', None):
+            info = self.client.get('/api/v1/ml/model-info').get_json()
+        self.assertTrue(info['model_trained'])
+        self.assertEqual(info['model_version'], version)
+
+
+if __name__ == '__main__':
+    unittest.main()
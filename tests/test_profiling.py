@@ -0,0 +1,92 @@
+"""
+Testes para o profiling sob demanda
+"""
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from api import profiling
+from api.profiling import ProfileStore, init_profiling, render_flamegraph
+
+
+def create_app(store):
+    app = Flask(__name__)
+    init_profiling(app, store)
+
+    @app.route('/work')
+    def work():
+        return {'total': sum(sorted(range(20000), reverse=True))}
+
+    return app
+
+
+class TestProfiling(unittest.TestCase):
+    """Testes do hook de profiling"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = ProfileStore(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_disabled_registers_no_hooks(self):
+        """Sem configuração, nenhum hook é registrado"""
+        with mock.patch.object(profiling, 'PROFILE_TOKEN', ''), \
+                mock.patch.object(profiling, 'PROFILE_SAMPLE_RATE', 0):
+            app = create_app(self.store)
+        self.assertEqual(dict(app.before_request_funcs), {})
+        self.assertEqual(dict(app.after_request_funcs), {})
+
+    def test_profile_with_admin_header(self):
+        """Requisição com o token gera um perfil recuperável"""
+        with mock.patch.object(profiling, 'PROFILE_TOKEN', 'secret'):
+            client = create_app(self.store).test_client()
+            response = client.get('/work', headers={'X-Profile': 'secret',
+                                                    'X-Profile-Mode': 'tracing'})
+            self.assertEqual(response.status_code, 200)
+            profile_id = response.headers['X-Profile-Id']
+
+            self.assertIsNone(client.get('/work').headers.get('X-Profile-Id'))
+
+        metadata = self.store.list()
+        self.assertEqual(len(metadata), 1)
+        self.assertEqual(metadata[0]['route'], '/work')
+        collapsed = self.store.get_collapsed(profile_id)
+        self.assertIn('work (', collapsed)
+        self.assertIn('<svg', render_flamegraph(collapsed))
+
+    def test_profiles_require_token(self):
+        """Só com amostragem os perfis são coletados, mas não podem ser consultados"""
+        from api.routes import app
+
+        client = app.test_client()
+        with mock.patch.object(profiling, 'PROFILE_TOKEN', ''):
+            self.assertEqual(client.get('/api/v1/profiles').status_code, 403)
+            self.assertEqual(client.get('/api/v1/profiles/abc', headers={'X-Profile': ''}).status_code, 403)
+        with mock.patch.object(profiling, 'PROFILE_TOKEN', 'secret'):
+            self.assertEqual(client.get('/api/v1/profiles', headers={'X-Profile': 'wrong'}).status_code, 403)
+            self.assertEqual(client.get('/api/v1/profiles', headers={'X-Profile': 'secret'}).status_code, 200)
+
+    def test_profiles_are_private(self):
+        """Os perfis vão para um diretório 0700; um diretório aberto é recusado"""
+        directory = os.path.join(self.tmpdir, 'profiles')
+        ProfileStore(directory).save('main 1', {})
+        self.assertEqual(stat.S_IMODE(os.stat(directory).st_mode), 0o700)
+        os.chmod(directory, 0o777)
+        with self.assertRaises(PermissionError):
+            ProfileStore(directory).save('main 1', {})
+
+    def test_invalid_profile_id(self):
+        """IDs fora do padrão não acessam o disco"""
+        self.assertIsNone(self.store.get_collapsed('../../etc/passwd'))
+
+
+if __name__ == '__main__':
+    unittest.main()
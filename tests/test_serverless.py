@@ -0,0 +1,73 @@
+"""
+Testes para o entry point serverless enxuto (index.py)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import index
+from api.routes import app
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamento de import + primeira requisição em um processo novo (ms)
+COLD_START_BUDGET_MS = float(os.environ.get('SERVERLESS_COLD_START_BUDGET_MS', 1000))
+
+COLD_START_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import index
+status = index.app.test_client().get('/api/v1/books').status_code
+elapsed_ms = (time.perf_counter() - start) * 1000.0
+heavy = [m for m in ('pandas', 'numpy', 'sklearn', 'flask_restx', 'prometheus_client') if m in sys.modules]
+print(json.dumps({'elapsed_ms': elapsed_ms, 'status': status, 'heavy': heavy}))
+'''
+
+
+class TestServerlessEntryPoint(unittest.TestCase):
+    """index.py serve o catálogo real com as mesmas respostas da API completa"""
+
+    def setUp(self):
+        self.client = index.app.test_client()
+        self.full_client = app.test_client()
+
+    def test_same_responses_as_full_api(self):
+        paths = [
+            '/api/v1/health',
+            '/api/v1/books',
+            '/api/v1/books/1',
+            '/api/v1/books/search?title=the&category=fiction',
+            '/api/v1/books/top-rated',
+            '/api/v1/books/price-range?min=10&max=20',
+            '/api/v1/books/price-range?min=abc',
+            '/api/v1/categories',
+            '/api/v1/stats/overview',
+            '/api/v1/stats/categories',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                expected = self.full_client.get(path)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.get_data(), expected.get_data())
+
+    def test_unknown_book_returns_404(self):
+        response = self.client.get('/api/v1/books/999999')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('message', response.get_json())
+
+    def test_cold_start_within_budget(self):
+        proc = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+        self.assertEqual(result['status'], 200)
+        self.assertEqual(result['heavy'], [])
+        self.assertLess(result['elapsed_ms'], COLD_START_BUDGET_MS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Testes para a coalescência de cálculos (single-flight)
+"""
+
+import threading
+import time
+import unittest
+
+from api.cache import QueryCache
+from api.models import BookRepository
+from api.singleflight import SingleFlight
+
+THREADS = 8
+
+
+def run_concurrently(func, threads: int = THREADS):
+    """Executa `func` em várias threads liberadas ao mesmo tempo"""
+    barrier = threading.Barrier(threads)
+    results, errors = [], []
+
+    def target():
+        barrier.wait()
+        try:
+            results.append(func())
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=target) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results, errors
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Um único cálculo por chave entre threads concorrentes"""
+
+    def test_concurrent_callers_share_result(self):
+        flight = SingleFlight()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return object()
+
+        results, errors = run_concurrently(lambda: flight.do('key', compute))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(result) for result in results}), 1)
+        self.assertEqual(flight.stats(), {'in_flight': 0, 'leaders': 1, 'shared': THREADS - 1})
+
+    def test_error_is_shared_and_not_cached(self):
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('falhou')
+
+        results, errors = run_concurrently(lambda: flight.do('key', fail))
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), THREADS)
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+
+        # A próxima chamada calcula de novo
+        self.assertEqual(flight.do('key', lambda: 42), 42)
+
+    def test_repository_cold_cache_computes_once(self):
+        repo = BookRepository('/nonexistent.csv', shared_cache_path='')
+        repo.cache = QueryCache()
+        calls = []
+        original = repo._get_stats_by_categories
+
+        def slow_stats():
+            calls.append(1)
+            time.sleep(0.1)
+            return original()
+
+        repo._get_stats_by_categories = slow_stats
+        results, errors = run_concurrently(repo.get_stats_by_categories)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), THREADS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Testes para o spec Swagger pré-serializado
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from api.routes import api, app, spec_cache
+from api.spec_cache import write_static_docs
+
+
+class TestSpecCache(unittest.TestCase):
+    """/swagger.json servido em cache com ETag"""
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_spec_matches_schema(self):
+        response = self.client.get('/swagger.json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertEqual(response.get_json(), json.loads(json.dumps(api.__schema__)))
+        self.assertIn('/api/v1/books', response.get_json()['paths'])
+
+    def test_etag_revalidation(self):
+        etag = self.client.get('/swagger.json').headers['ETag']
+
+        response = self.client.get('/swagger.json', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+        response = self.client.get('/swagger.json', headers={'If-None-Match': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_body_is_serialized_once(self):
+        self.client.get('/swagger.json')
+        body, _ = spec_cache.get()
+        self.assertIs(spec_cache.get()[0], body)
+
+    def test_write_static_docs(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            write_static_docs(app, api, output_dir)
+
+            with open(os.path.join(output_dir, 'swagger.json'), 'rb') as f:
+                self.assertEqual(f.read(), self.client.get('/swagger.json').get_data())
+            with open(os.path.join(output_dir, 'docs.html')) as f:
+                self.assertIn('/swagger.json', f.read())
+            self.assertTrue(os.path.exists(
+                os.path.join(output_dir, 'swaggerui', 'swagger-ui-bundle.js')
+            ))
+
+
+if __name__ == '__main__':
+    unittest.main()
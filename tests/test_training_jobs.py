@@ -0,0 +1,161 @@
+"""
+Testes para os jobs de treino em segundo plano
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from api import ml_routes
+from api.model_registry import ActiveModelWatcher, ModelRegistry
+from api.routes import admission_controller, app
+from api.training_jobs import JobNotFound, TrainingJobQueue, TrainingJobStore, run_training_job
+
+
+class TestTrainingJobStore(unittest.TestCase):
+    """Estado dos jobs em disco"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = TrainingJobStore(self.tmpdir.name, keep=2)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_create_update_get(self):
+        job = self.store.create('rating')
+        self.assertEqual(job['status'], 'queued')
+        self.store.update(job['job_id'], status='running')
+        self.assertEqual(self.store.get(job['job_id'])['status'], 'running')
+        with self.assertRaises(JobNotFound):
+            self.store.get('../ACTIVE')
+
+    def test_prune_keeps_unfinished_jobs(self):
+        running = self.store.create('rating')['job_id']
+        for _ in range(3):
+            job = self.store.create('price')
+            self.store.update(job['job_id'], status='succeeded')
+        self.store.create('price')
+        ids = [job['job_id'] for job in self.store.list_jobs(limit=10)]
+        self.assertEqual(len(ids), 3)
+        self.assertIn(running, ids)
+
+    def test_job_of_dead_process_is_interrupted(self):
+        dead = subprocess.Popen([sys.executable, '-c', ''])
+        dead.wait()
+        self.store.keep = 10
+        queued = self.store.create('rating')
+        self.store.update(queued['job_id'], owner_pid=dead.pid)
+        running = self.store.create('price')
+        self.store.update(running['job_id'], status='running', pid=dead.pid)
+        alive = self.store.create('rating')
+        self.store.update(alive['job_id'], status='running', pid=os.getpid())
+
+        for job_id in (queued['job_id'], running['job_id']):
+            job = self.store.get(job_id)
+            self.assertEqual(job['status'], 'failed')
+            self.assertEqual(job['progress']['stage'], 'interrupted')
+            self.assertTrue(job['finished_at'])
+        self.assertEqual(self.store.get(alive['job_id'])['status'], 'running')
+
+        # O processo de treino não começa um job já dado como interrompido
+        run_training_job(queued['job_id'], 'rating', None, self.store.root,
+                         os.path.join(self.tmpdir.name, 'registry'))
+        self.assertEqual(self.store.get(queued['job_id'])['status'], 'failed')
+
+    def test_run_training_job_publishes_model(self):
+        registry_dir = os.path.join(self.tmpdir.name, 'registry')
+        job = self.store.create('rating')
+        run_training_job(job['job_id'], 'rating', None, self.store.root, registry_dir)
+
+        job = self.store.get(job['job_id'])
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress']['stage'], 'done')
+        self.assertIn('fit_seconds', job['timings'])
+        self.assertIn('test_r2', job['metrics'])
+        self.assertEqual(ModelRegistry(registry_dir).active_version(), job['model_version'])
+
+    def test_run_training_job_reports_errors(self):
+        job = self.store.create('inexistente')
+        run_training_job(job['job_id'], 'inexistente', None, self.store.root,
+                         os.path.join(self.tmpdir.name, 'registry'))
+        job = self.store.get(job['job_id'])
+        self.assertEqual(job['status'], 'failed')
+        self.assertTrue(job['error'])
+
+
+class TestTrainingJobRoutes(unittest.TestCase):
+    """/ml/train enfileira no pool de processos; /ml/jobs/<id> acompanha"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        registry = ModelRegistry(os.path.join(self.tmpdir.name, 'registry'))
+        self.queue = TrainingJobQueue(TrainingJobStore(os.path.join(self.tmpdir.name, 'jobs')),
+                                      registry_dir=registry.root)
+        self.queue.listener = ml_routes.training_job_finished
+        self.patches = [
+            patch.object(ml_routes, 'training_queue', self.queue),
+            patch.object(ml_routes, 'model_registry', registry),
+            patch.object(ml_routes, 'active_model_watcher', ActiveModelWatcher(registry, interval=0)),
+            patch.object(ml_routes, 'ml_pipeline_instance', None),
+            patch.object(ml_routes, '_synced_model_version', None),
+        ]
+        for p in self.patches:
+            p.start()
+        admission_controller.buckets.clear()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.queue.shutdown()
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmpdir.cleanup()
+
+    def wait_for(self, job_id, timeout=120):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.client.get(f'/api/v1/ml/jobs/{job_id}').get_json()
+            if job['status'] in ('succeeded', 'failed'):
+                return job
+            time.sleep(0.2)
+        self.fail(f'job {job_id} não terminou')
+
+    def test_train_returns_job_and_publishes_model(self):
+        response = self.client.post('/api/v1/ml/train', json={'target': 'rating'})
+        self.assertEqual(response.status_code, 202)
+        job = response.get_json()
+        self.assertEqual(job['status_url'], f"/api/v1/ml/jobs/{job['job_id']}")
+
+        # Pedido repetido para o mesmo target reaproveita o job pendente
+        again = self.client.post('/api/v1/ml/train', json={'target': 'rating'}).get_json()
+        self.assertEqual(again['job_id'], job['job_id'])
+
+        job = self.wait_for(job['job_id'])
+        self.assertEqual(job['status'], 'succeeded', job.get('error'))
+        self.assertIn('total_seconds', job['timings'])
+
+        info = self.client.get('/api/v1/ml/model-info').get_json()
+        self.assertEqual(info['model_version'], job['model_version'])
+        listing = self.client.get('/api/v1/ml/jobs').get_json()
+        self.assertEqual(listing['jobs'][0]['job_id'], job['job_id'])
+
+    def test_abort_interrupts_pending_jobs(self):
+        jobs = [self.queue.submit(target)['job_id'] for target in ('rating', 'price')]
+        started = time.monotonic()
+        self.queue.abort()
+        self.assertLess(time.monotonic() - started, 10)
+        for job_id in jobs:
+            job = self.wait_for(job_id, timeout=30)
+            self.assertEqual(job['status'], 'failed')
+            self.assertIn('interrompido', job['error'])
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get('/api/v1/ml/jobs/desconhecido').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
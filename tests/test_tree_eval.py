@@ -0,0 +1,78 @@
+"""
+Testes para o FlatForest (avaliação do forest em tabelas de nós planas)
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from api.ml_pipeline import MLPipeline, forest_predict
+from api.tree_eval import FlatForest
+from tests.test_ml_pipeline import BOOKS
+
+
+class TestFlatForest(unittest.TestCase):
+    """Mesmas predições do scikit-learn, com menos memória"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.RandomState(0)
+        X = rng.rand(400, 9)
+        # Árvores profundas (target com ruído) exercitam a travessia completa
+        cls.model = RandomForestRegressor(n_estimators=20, random_state=42).fit(X, rng.rand(400) + X[:, 0])
+        cls.forest = FlatForest.from_sklearn(cls.model)
+        cls.X = rng.standard_normal((64, 9))
+
+    def test_matches_sklearn_exactly(self):
+        for rows in (1, 2, 7, 64):
+            X = self.X[:rows]
+            mean, spread = self.forest.predict(X, return_std=True)
+            self.assertTrue(np.array_equal(mean, self.model.predict(X)))
+            self.assertTrue(np.array_equal(spread, forest_predict(self.model, X, 1)[1]))
+
+    def test_chunked_matches_single_pass(self):
+        mean, spread = self.forest.predict(self.X, return_std=True)
+        chunked_mean, chunked_spread = self.forest.predict(self.X, return_std=True, chunk_rows=10)
+        self.assertTrue(np.array_equal(chunked_mean, mean))
+        self.assertTrue(np.array_equal(chunked_spread, spread))
+        self.assertTrue(np.array_equal(self.forest.predict(self.X, chunk_rows=10), mean))
+
+    def test_float32_boundaries(self):
+        # Valores exatamente sobre os limiares: a conversão float32 decide o lado
+        tree = self.model.estimators_[0].tree_
+        X = np.tile(self.X[:1], (8, 1))
+        internal = np.flatnonzero(tree.children_left != -1)[:8]
+        X[np.arange(len(internal)), tree.feature[internal]] = tree.threshold[internal]
+        self.assertTrue(np.array_equal(self.forest.predict(X), self.model.predict(X)))
+
+    def test_memory_mapped_roundtrip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.forest.save(directory)
+            loaded = FlatForest.load(directory, mmap_mode='r')
+            self.assertIsInstance(loaded.threshold, np.memmap)
+            self.assertTrue(np.array_equal(loaded.predict(self.X), self.forest.predict(self.X)))
+            del loaded
+
+    def test_smaller_than_sklearn_nodes(self):
+        sklearn_bytes = sum(
+            estimator.tree_.__getstate__()['nodes'].nbytes + estimator.tree_.value.nbytes
+            for estimator in self.model.estimators_
+        )
+        self.assertLess(self.forest.nbytes, sklearn_bytes / 2)
+
+    def test_rejects_wrong_feature_count(self):
+        with self.assertRaises(ValueError):
+            self.forest.predict(self.X[:, :4])
+
+    def test_pipeline_export(self):
+        pipeline = MLPipeline(BOOKS)
+        pipeline.train_model()
+        forest = pipeline.export_flat_forest()
+        X = pipeline.transformer.transform(BOOKS)
+        self.assertTrue(np.array_equal(forest.predict(X), pipeline.model.predict(X)))
+
+
+if __name__ == '__main__':
+    unittest.main()
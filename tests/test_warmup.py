@@ -0,0 +1,59 @@
+"""
+Testes para o warm-up e o endpoint de prontidão
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+
+from api.models import BookRepository
+from api.routes import app
+from api.warmup import WarmupState, run_warmup
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestWarmup(unittest.TestCase):
+    """Etapas de warm-up e estado de prontidão"""
+
+    def test_state_starts_ready_only_when_disabled(self):
+        self.assertTrue(WarmupState('off').ready)
+        self.assertFalse(WarmupState('worker').ready)
+        self.assertFalse(WarmupState('master').ready)
+
+    def test_run_warmup_records_steps(self):
+        state = run_warmup(['repository', 'query_cache', 'swagger', 'unknown'], WarmupState('worker'))
+
+        self.assertTrue(state.ready)
+        steps = state.to_dict()['steps']
+        self.assertEqual(steps['repository']['status'], 'done')
+        self.assertEqual(steps['query_cache']['status'], 'done')
+        self.assertEqual(steps['swagger']['status'], 'done')
+        # Etapas com falha não impedem a conclusão do warm-up
+        self.assertEqual(steps['unknown']['status'], 'failed')
+
+    def test_ready_endpoint(self):
+        client = app.test_client()
+        with patch('api.routes.warmup_state', WarmupState('worker')):
+            response = client.get('/api/v1/health/ready')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()['status'], 'warming_up')
+
+        with patch('api.routes.warmup_state', WarmupState('off')):
+            response = client.get('/api/v1/health/ready')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['status'], 'ready')
+
+    def test_book_index_is_rebuilt_after_reload(self):
+        repo = BookRepository('/nonexistent.csv', shared_cache_path='')
+        repo.build_indexes()
+        self.assertEqual(repo.get_book_by_id(1).title, 'Sample Book 1')
+
+        repo.csv_file_path = os.path.join(ROOT_DIR, 'data', 'books_compact.json')
+        repo.load_books()
+        self.assertEqual(repo.get_book_by_id(1).title, 'A Light in the Attic')
+        self.assertIsNone(repo.get_book_by_id(999999))
+
+
+if __name__ == '__main__':
+    unittest.main()